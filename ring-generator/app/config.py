@@ -37,6 +37,11 @@ def _default_blender_executable() -> Path:
     return Path("/usr/bin/blender")
 
 
+def _merge_keys(single: str, pool: str) -> list[str]:
+    keys = [single.strip()] + [k.strip() for k in pool.split(",")]
+    return list(dict.fromkeys(k for k in keys if k))
+
+
 class RingGenSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_prefix="RING_GEN_",
@@ -55,6 +60,11 @@ class RingGenSettings(BaseSettings):
     gemini_api_key: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEY", ""))
     gemini_model: str = Field(default_factory=lambda: os.getenv("GEMINI_MODEL", "gemini-3-pro-preview"))
 
+    # Optional key pools (comma-separated). Calls are spread across every key
+    # by least-loaded selection; throttled keys cool down out of rotation.
+    anthropic_api_keys: str = Field(default_factory=lambda: os.getenv("ANTHROPIC_API_KEYS", ""))
+    gemini_api_keys: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEYS", ""))
+
     # Blender
     blender_executable: Path = Field(default_factory=_default_blender_executable)
     blender_timeout_seconds: int = Field(default=300, ge=30, le=3600)
@@ -62,21 +72,89 @@ class RingGenSettings(BaseSettings):
     # Pipeline defaults
     max_error_retries: int = Field(default=3, ge=1, le=10)
     max_cost_per_request_usd: float = Field(default=5.0, ge=0.1, le=100.0)
+    # Fix rounds return only changed functions / a diff (falls back to full code)
+    patch_fixes: bool = True
+    # Fix rounds send only the failing function's slice when the traceback locates it
+    scoped_fixes: bool = True
+    # Generation and fix rounds share one message thread served from the prompt cache
+    conversational_fixes: bool = False
+    # Rewrite known Blender error patterns locally and re-run before asking the LLM
+    auto_fixes: bool = True
+    # "adaptive": escalate / expand context / abort on repeated errors; "static": legacy loop
+    retry_policy: str = "adaptive"
+    retry_escalate_after: int = Field(default=2, ge=1, le=10)
+    retry_escalation_llm: str = "claude-opus"
+    retry_abort_after: int = Field(default=3, ge=2, le=10)
+    # Run each build_* function under its own error capture to collect every failure in one run
+    isolate_functions: bool = False
+    # Scene-wide evaluated polygon budget; Subsurf levels / Bevel segments are capped
+    # on the heaviest objects before export until it fits (0 disables)
+    max_scene_polygons: int = Field(default=300_000, ge=0, le=10_000_000)
+    # Re-execute only the component functions a fix changed; the rest are appended
+    # from a per-session .blend library
+    incremental_builds: bool = False
+    # Tell the model the blender_lib/ring_helpers functions are preloaded (don't re-implement them)
+    helper_library_prompt: bool = False
+    # Fix prompts get a table of the meshes most related to the failing function / anomalous
+    # instead of the first 3000 chars of the spatial report (0 = legacy truncation)
+    spatial_context_chars: int = Field(default=1500, ge=0, le=20_000)
+    # Time each component function and the build / modifier / spatial report / export phases
+    # inside Blender; profile_top_n > 0 adds the cProfile top-N of build()
+    profile_blender: bool = False
+    profile_top_n: int = Field(default=15, ge=0, le=200)
+    # Upper bound for GenerateRequest.variants (concurrent generations under one job)
+    max_variants: int = Field(default=4, ge=1, le=8)
+    # Reuse cache: text-only prompts similar to an earlier successful one (TF-IDF cosine)
+    # return that session (>= reuse_threshold) or edit a copy of it (>= reuse_edit_threshold; 0 = off)
+    reuse_cache: bool = False
+    reuse_threshold: float = Field(default=0.95, ge=0.5, le=1.0)
+    reuse_edit_threshold: float = Field(default=0.8, ge=0.0, le=1.0)
+    reuse_index_file: str = "reuse_index.sqlite3"
 
     # Prompts
     master_prompt_path: Path = Field(
         default_factory=lambda: SERVICE_ROOT / "prompts" / "master_prompt.txt"
     )
+    # Send only core + request-relevant master prompt sections per call
+    filter_master_prompt: bool = True
+
+    # Batch tier (priority="batch"): initial generation calls are grouped into
+    # Message Batches requests.  Backend "local" is an offline stand-in.
+    batch_backend: str = "anthropic"
+    batch_max_size: int = Field(default=100, ge=1, le=10000)
+    batch_flush_seconds: int = Field(default=60, ge=1, le=3600)
+    batch_poll_interval_seconds: int = Field(default=30, ge=1, le=3600)
+    batch_workers: int = Field(default=1, ge=1, le=32)
+    batch_max_pending: int = Field(default=5000, ge=1, le=100000)
+    batch_local_latency_seconds: float = Field(default=2.0, ge=0.0, le=3600.0)
 
     # Storage
     storage_dir: Path = Field(default_factory=lambda: SERVICE_ROOT / "data")
     sessions_subdir: str = "sessions"
 
+    # Reference images: downscale / strip EXIF / re-encode per provider (needs Pillow)
+    normalize_images: bool = True
+    image_cache_subdir: str = "image_cache"
+    image_jpeg_quality: int = Field(default=85, ge=50, le=95)
+    # image_ref downloads and multipart / inline uploads, cached by sha256
+    artifact_cache_subdir: str = "artifact_cache"
+    max_reference_image_mb: int = Field(default=20, ge=1, le=200)
+    # https hosts an image_ref URL may point at (comma-separated; ".example.com"
+    # matches subdomains); azure:// references are always allowed
+    artifact_allowed_hosts: str = ""
+    # least recently used cached artifacts are pruned beyond this size
+    artifact_cache_max_mb: int = Field(default=2048, ge=16, le=1_000_000)
+
     # Concurrency
     max_concurrent_jobs: int = Field(default_factory=_default_concurrency, ge=1, le=32)
     max_queue_size: int = Field(default=64, ge=1, le=10000)
     sync_wait_timeout_seconds: int = Field(default=600, ge=60, le=3600)
 
+    # LLM connections: pre-create clients at startup and keep them warm with
+    # periodic lightweight pings (0 = warm once at startup only)
+    llm_warmup: bool = True
+    llm_keepalive_interval_seconds: int = Field(default=45, ge=0, le=3600)
+
     # Job lifecycle
     finished_job_ttl_seconds: int = Field(default=3600, ge=60, le=172800)
     cleanup_interval_seconds: int = Field(default=30, ge=5, le=3600)
@@ -94,13 +172,37 @@ class RingGenSettings(BaseSettings):
     def sessions_dir(self) -> Path:
         return self.storage_dir / self.sessions_subdir
 
+    @property
+    def image_cache_dir(self) -> Path:
+        return self.storage_dir / self.image_cache_subdir
+
+    @property
+    def artifact_cache_dir(self) -> Path:
+        return self.storage_dir / self.artifact_cache_subdir
+
+    @property
+    def reuse_index_path(self) -> Path:
+        return self.storage_dir / self.reuse_index_file
+
+    @property
+    def artifact_allowed_host_list(self) -> list[str]:
+        return [h.strip() for h in self.artifact_allowed_hosts.split(",") if h.strip()]
+
+    @property
+    def anthropic_key_pool(self) -> list[str]:
+        return _merge_keys(self.anthropic_api_key, self.anthropic_api_keys)
+
+    @property
+    def gemini_key_pool(self) -> list[str]:
+        return _merge_keys(self.gemini_api_key, self.gemini_api_keys)
+
     @property
     def claude_available(self) -> bool:
-        return bool(self.anthropic_api_key)
+        return bool(self.anthropic_key_pool)
 
     @property
     def gemini_available(self) -> bool:
-        return bool(self.gemini_api_key)
+        return bool(self.gemini_key_pool)
 
 
 settings = RingGenSettings()
@@ -0,0 +1,511 @@
+"""
+Deterministic fixes for recurring Blender errors — no LLM round trip.
+
+Many failures repeat across sessions and have one mechanical fix.  Each
+rule pairs an error signature (regex over the traceback / stderr) with an
+AST-guided rewrite of the generated code:
+
+  - ``ensure_lookup_table``  ``bm.verts[i]`` before the lookup table exists →
+                             ``bm.verts.ensure_lookup_table()`` inserted
+                             before every statement indexing a BMesh sequence
+  - ``removed_api``          attributes / operator keywords removed in Blender
+                             4.1+ (auto smooth, split normals) → statement
+                             dropped or keyword removed; renamed properties
+                             rewritten
+  - ``premature_free``       BMesh (or an element taken from it) used after
+                             ``bm.free()`` in the failing function → the free
+                             moves before ``bm`` is next rebound, else to the
+                             end of the function (dropped if bm is returned)
+  - ``zero_divisor``         ZeroDivisionError → every division on the failing
+                             line becomes ``(a / _d if (_d := b) else 0.0)``,
+                             evaluating ``b`` once
+  - ``missing_import``       NameError for math / bmesh / mathutils names →
+                             import added
+
+Rewrites touch only the affected statements (comments and formatting of
+the rest are preserved) and every result must parse.  The pipeline applies
+the fix, re-runs Blender, and only falls back to the LLM fix prompt when
+no rule matches or the failure does not move past the original location.
+"""
+
+from __future__ import annotations
+
+import ast
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from .blender_runner import SCENE_PRELUDE
+from .fix_context import parse_script_frames
+from .source_map import assemble
+
+_EXCEPTION_RE = re.compile(r"^(\w+(?:Error|Exception|Warning)): (.*)$", re.MULTILINE)
+
+
+@dataclass
+class AutoFixResult:
+    code: str
+    rules: list[str] = field(default_factory=list)
+
+
+def error_signature(error_text: str) -> str:
+    """Last exception line with numbers and quoted names normalised (for comparing attempts)."""
+    matches = _EXCEPTION_RE.findall(error_text)
+    if not matches:
+        return ""
+    kind, message = matches[-1]
+    message = re.sub(r"0x[0-9a-fA-F]+|\d+(\.\d+)?", "N", message)
+    return f"{kind}: {message.strip()}"
+
+
+def _line_map(old_code: str, new_code: str) -> dict[int, int]:
+    """1-based old line → new line (a rewritten line maps to the start of its replacement)."""
+    old, new = old_code.split("\n"), new_code.split("\n")
+    mapping: dict[int, int] = {}
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        for i in range(i1, i2):
+            mapping[i + 1] = (j1 + i - i1 if tag == "equal" else j1) + 1
+    return mapping
+
+
+def _failure_location(error_text: str, code: str, line_map: dict[int, int] | None = None) -> list[tuple[int, int]]:
+    """
+    Traceback frames as comparable (segment, line) pairs, outermost first:
+    prelude 0, LLM code 1 (optionally remapped), injected export code 2
+    (counted from the end of the code, so it is stable across rewrites).
+    """
+    code_end = len(assemble(code, SCENE_PRELUDE)[1].origins)
+    location: list[tuple[int, int]] = []
+    for frame in parse_script_frames(error_text, code):
+        if frame.line is not None:
+            location.append((1, (line_map or {}).get(frame.line, frame.line)))
+        elif frame.script_line > code_end:
+            location.append((2, frame.script_line - code_end))
+        else:
+            location.append((0, frame.script_line))
+    return location
+
+
+def failure_advanced(old_code: str, old_error: str, new_code: str, new_error: str) -> bool:
+    """
+    True when the rewritten code fails later than the original did: its
+    failure location (call chain, compared frame by frame in source order)
+    is past the original one, or it no longer fails inside the script at
+    all (timeout, export).  An error that merely reads differently at the
+    same place, or earlier, does not count.
+    """
+    old = _failure_location(old_error, old_code, _line_map(old_code, new_code))
+    if not old:
+        return False
+    new = _failure_location(new_error, new_code)
+    return not new or new > old
+
+
+# ---------------------------------------------------------------------------
+# AST / source helpers
+# ---------------------------------------------------------------------------
+
+def _statements(body: list[ast.stmt]) -> Iterator[ast.stmt]:
+    for stmt in body:
+        yield stmt
+        for attr in ("body", "orelse", "finalbody"):
+            yield from _statements(getattr(stmt, attr, []) or [])
+        for handler in getattr(stmt, "handlers", []) or []:
+            yield from _statements(handler.body)
+
+
+def _own_nodes(stmt: ast.stmt) -> Iterator[ast.AST]:
+    """Nodes of ``stmt`` excluding nested statement bodies."""
+    nested = {id(s) for attr in ("body", "orelse", "finalbody") for s in getattr(stmt, attr, []) or []}
+    nested |= {id(h) for h in getattr(stmt, "handlers", []) or []}
+    stack = [c for c in ast.iter_child_nodes(stmt) if id(c) not in nested]
+    while stack:
+        node = stack.pop()
+        yield node
+        if not isinstance(node, ast.stmt):
+            stack.extend(ast.iter_child_nodes(node))
+
+
+def _starts_line(lines: list[str], stmt: ast.stmt) -> bool:
+    text = lines[stmt.lineno - 1]
+    return not text[:stmt.col_offset].strip() and not text.lstrip().startswith("elif")
+
+
+def _replace_stmt(lines: list[str], stmt: ast.stmt, source: str) -> None:
+    indent = " " * stmt.col_offset
+    new = [indent + line for line in source.split("\n")]
+    lines[stmt.lineno - 1:stmt.end_lineno] = new
+
+
+def _failing_line(code: str, error_text: str) -> int | None:
+    for frame in reversed(parse_script_frames(error_text, code)):
+        if frame.line is not None:
+            return frame.line
+    return None
+
+
+def _compiles(code: str) -> bool:
+    """Full compile, not just a parse — catches e.g. misplaced walrus targets."""
+    try:
+        compile(code, "<auto_fix>", "exec")
+    except SyntaxError:
+        return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Rules — each returns rewritten code or None
+# ---------------------------------------------------------------------------
+
+_BMESH_SEQS = ("verts", "edges", "faces")
+
+
+def _bmesh_names(tree: ast.Module) -> set[str]:
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+            func = ast.unparse(node.value.func)
+            if func in ("bmesh.new", "bmesh.from_edit_mesh"):
+                names |= {t.id for t in node.targets if isinstance(t, ast.Name)}
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names |= {a.arg for a in node.args.args if a.arg.startswith("bm")}
+    return names
+
+
+def _fix_lookup_table(code: str, tree: ast.Module, match: re.Match[str], line: int | None) -> str | None:
+    bm_names = _bmesh_names(tree)
+    lines = code.split("\n")
+    inserts: dict[int, tuple[int, list[str]]] = {}
+    for stmt in _statements(tree.body):
+        for node in _own_nodes(stmt):
+            if not (
+                isinstance(node, ast.Subscript)
+                and isinstance(node.value, ast.Attribute)
+                and node.value.attr in _BMESH_SEQS
+                and isinstance(node.value.value, ast.Name)
+                and node.value.value.id in bm_names
+            ):
+                continue
+            if not _starts_line(lines, stmt):
+                continue
+            call = f"{ast.unparse(node.value)}.ensure_lookup_table()"
+            calls = inserts.setdefault(stmt.lineno, (stmt.col_offset, []))[1]
+            if call not in calls:
+                calls.append(call)
+
+    changed = False
+    for lineno in sorted(inserts, reverse=True):
+        col, calls = inserts[lineno]
+        previous = lines[lineno - 2].strip() if lineno > 1 else ""
+        new = [" " * col + c for c in sorted(calls) if c != previous]
+        if new:
+            lines[lineno - 1:lineno - 1] = new
+            changed = True
+    return "\n".join(lines) if changed else None
+
+
+# Removed in Blender 4.1+ (auto smooth became a modifier, split normals are automatic)
+_REMOVED_API = frozenset({
+    "use_auto_smooth", "auto_smooth_angle",
+    "calc_normals", "calc_normals_split", "free_normals_split", "create_normals_split",
+})
+# attr → (new attr, value map) for properties that were renamed
+_RENAMED_API: dict[str, tuple[str, dict[object, object]]] = {
+    "use_only_vertices": ("affect", {True: "VERTICES", False: "EDGES"}),
+}
+
+
+def _fix_removed_api(code: str, tree: ast.Module, match: re.Match[str], line: int | None) -> str | None:
+    name = match.group(1)
+    if name not in _REMOVED_API and name not in _RENAMED_API:
+        return None
+    lines = code.split("\n")
+    edits: list[tuple[ast.stmt, str]] = []
+    for stmt in _statements(tree.body):
+        if not _starts_line(lines, stmt) or not isinstance(stmt, (ast.Assign, ast.Expr)):
+            continue
+        if name in _RENAMED_API and isinstance(stmt, ast.Assign) and isinstance(stmt.value, ast.Constant):
+            target = stmt.targets[0]
+            if isinstance(target, ast.Attribute) and target.attr == name:
+                new_attr, values = _RENAMED_API[name]
+                value = values.get(stmt.value.value, stmt.value.value)
+                edits.append((stmt, f"{ast.unparse(target.value)}.{new_attr} = {value!r}"))
+            continue
+        if name not in _REMOVED_API:
+            continue
+        uses_attr = any(isinstance(n, ast.Attribute) and n.attr == name for n in _own_nodes(stmt))
+        if isinstance(stmt, ast.Assign) and any(
+            isinstance(t, ast.Attribute) and t.attr == name for t in stmt.targets
+        ):
+            edits.append((stmt, "pass"))
+        elif isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call) and uses_attr:
+            edits.append((stmt, "pass"))
+        else:
+            calls = [
+                n for n in _own_nodes(stmt)
+                if isinstance(n, ast.Call) and any(k.arg == name for k in n.keywords)
+            ]
+            for call in calls:
+                call.keywords = [k for k in call.keywords if k.arg != name]
+            if calls:
+                edits.append((stmt, ast.unparse(stmt)))
+
+    for stmt, source in sorted(edits, key=lambda e: e[0].lineno, reverse=True):
+        _replace_stmt(lines, stmt, source)
+    return "\n".join(lines) if edits else None
+
+
+def _enclosing_function(tree: ast.Module, line: int | None) -> list[ast.FunctionDef | ast.AsyncFunctionDef]:
+    """The innermost function around ``line``; every top-level function when the line is unknown."""
+    if line is None:
+        return [f for f in tree.body if isinstance(f, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    around = [
+        n for n in ast.walk(tree)
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and n.lineno <= line <= (n.end_lineno or n.lineno)
+    ]
+    return [max(around, key=lambda f: f.lineno)] if around else []
+
+
+def _target_names(target: ast.AST) -> set[str]:
+    return {n.id for n in ast.walk(target) if isinstance(n, ast.Name)}
+
+
+def _rebinds(stmt: ast.stmt, name: str) -> bool:
+    targets: list[ast.AST] = []
+    if isinstance(stmt, ast.Assign):
+        targets = list(stmt.targets)
+    elif isinstance(stmt, (ast.AnnAssign, ast.For, ast.AsyncFor)):
+        targets = [stmt.target]
+    return any(name in _target_names(t) for t in targets)
+
+
+def _derived_names(func: ast.AST, bm: str, before: int) -> set[str]:
+    """
+    Names bound before line ``before`` to elements of ``bm`` (transitively):
+    ``v = bm.verts[0]``, ``for f in bm.faces``, ``edge = v.link_edges[0]``.
+    """
+    bindings: list[tuple[set[str], ast.AST]] = []
+    for node in ast.walk(func):
+        if isinstance(node, ast.Assign) and node.lineno < before:
+            bindings.extend((_target_names(t), node.value) for t in node.targets)
+        elif isinstance(node, (ast.For, ast.AsyncFor)) and node.lineno < before:
+            bindings.append((_target_names(node.target), node.iter))
+
+    derived: set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for names, value in bindings:
+            if bm in names or names <= derived:
+                continue
+            if any(
+                (isinstance(n, ast.Attribute) and n.attr in _BMESH_SEQS
+                 and isinstance(n.value, ast.Name) and n.value.id == bm)
+                or (isinstance(n, ast.Name) and n.id in derived)
+                for n in ast.walk(value)
+            ):
+                derived |= names
+                changed = True
+    return derived
+
+
+def _first_rebind(func: ast.AST, name: str, after: int) -> ast.stmt | None:
+    stmts = [s for s in _statements(getattr(func, "body", [])) if s.lineno > after and _rebinds(s, name)]
+    return min(stmts, key=lambda s: s.lineno) if stmts else None
+
+
+def _read_after(func: ast.AST, name: str, after: int) -> bool:
+    """``name`` is read after line ``after`` and before it is next rebound."""
+    rebind = _first_rebind(func, name, after)
+    end = rebind.lineno if rebind is not None else float("inf")
+    return any(
+        isinstance(n, ast.Name) and n.id == name and isinstance(n.ctx, ast.Load) and after < n.lineno < end
+        for n in ast.walk(func)
+    )
+
+
+def _fix_premature_free(code: str, tree: ast.Module, match: re.Match[str], line: int | None) -> str | None:
+    lines = code.split("\n")
+    for func in _enclosing_function(tree, line):
+        frees = [
+            stmt for stmt in _statements(func.body)
+            if isinstance(stmt, ast.Expr)
+            and isinstance(stmt.value, ast.Call)
+            and isinstance(stmt.value.func, ast.Attribute)
+            and stmt.value.func.attr == "free"
+            and isinstance(stmt.value.func.value, ast.Name)
+            and _starts_line(lines, stmt)
+            and (line is None or (stmt.end_lineno or stmt.lineno) < line)
+        ]
+        # the free closest before the failing line first
+        for stmt in sorted(frees, key=lambda s: s.lineno, reverse=True):
+            bm = stmt.value.func.value.id
+            freed_at = stmt.end_lineno or stmt.lineno
+            # ``bm = bmesh.new()`` after the free starts a new BMesh: later uses are not of the freed one
+            rebind = _first_rebind(func, bm, freed_at)
+            live_until = rebind.lineno if rebind is not None else float("inf")
+            if not _read_after(func, bm, freed_at) and not any(
+                _read_after(func, name, freed_at) for name in _derived_names(func, bm, stmt.lineno)
+            ):
+                continue
+            returned = any(
+                isinstance(n, ast.Return) and n.value is not None and freed_at < n.lineno < live_until
+                and any(isinstance(x, ast.Name) and x.id == bm for x in ast.walk(n.value))
+                for n in ast.walk(func)
+            )
+            free_line = f"{bm}.free()"
+            # Remove the early free (keep the block non-empty), then re-add it
+            # before the rebinding or at the end of the function.
+            _replace_stmt(lines, stmt, "pass")
+            if rebind is not None and not returned:
+                if not _starts_line(lines, rebind):
+                    return None
+                lines.insert(rebind.lineno - 1, " " * rebind.col_offset + free_line)
+            elif not returned:
+                body_indent = " " * func.body[0].col_offset
+                last = func.body[-1]
+                if isinstance(last, ast.Return):
+                    lines.insert(last.lineno - 1, body_indent + free_line)
+                else:
+                    lines.insert(last.end_lineno or last.lineno, body_indent + free_line)
+            return "\n".join(lines)
+    return None
+
+
+class _GuardDivisions(ast.NodeTransformer):
+    """``a / b`` → ``a / _divisorN if (_divisorN := b) else 0.0`` (``b`` evaluated once)."""
+
+    def __init__(self, taken: set[str]) -> None:
+        self.count = 0
+        self._taken = taken
+
+    def _divisor_name(self) -> str:
+        n = 0
+        while f"_divisor{n}" in self._taken:
+            n += 1
+        name = f"_divisor{n}"
+        self._taken.add(name)
+        return name
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)):
+            return node
+        if isinstance(node.right, ast.Constant) and node.right.value:
+            return node
+        if isinstance(node.left, ast.Constant) and isinstance(node.left.value, str):
+            return node     # %-formatting
+        self.count += 1
+        name = self._divisor_name()
+        divisor = ast.NamedExpr(target=ast.Name(name, ast.Store()), value=node.right)
+        node.right = ast.Name(name, ast.Load())
+        return ast.IfExp(test=divisor, body=node, orelse=ast.Constant(0.0))
+
+
+def _fix_zero_divisor(code: str, tree: ast.Module, match: re.Match[str], line: int | None) -> str | None:
+    if line is None:
+        return None
+    lines = code.split("\n")
+    candidates = [
+        s for s in _statements(tree.body)
+        if s.lineno <= line <= (s.end_lineno or s.lineno)
+        and not isinstance(s, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        and not hasattr(s, "body")
+    ]
+    if not candidates or not _starts_line(lines, candidates[-1]):
+        return None
+    stmt = candidates[-1]
+    guard = _GuardDivisions({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)})
+    guarded = guard.visit(stmt)
+    if not guard.count:
+        return None
+    _replace_stmt(lines, stmt, ast.unparse(ast.fix_missing_locations(guarded)))
+    return "\n".join(lines)
+
+
+_IMPORTS = {
+    "math": "import math",
+    "bmesh": "import bmesh",
+    "bpy": "import bpy",
+    "random": "import random",
+    "mathutils": "import mathutils",
+    "Vector": "from mathutils import Vector",
+    "Matrix": "from mathutils import Matrix",
+    "Euler": "from mathutils import Euler",
+    "Quaternion": "from mathutils import Quaternion",
+}
+
+
+def _fix_missing_import(code: str, tree: ast.Module, match: re.Match[str], line: int | None) -> str | None:
+    statement = _IMPORTS.get(match.group(1))
+    if statement is None:
+        return None
+    return f"{statement}\n{code}"
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    signature: re.Pattern[str]
+    apply: Callable[[str, ast.Module, re.Match[str], int | None], str | None]
+
+
+RULES: tuple[Rule, ...] = (
+    Rule(
+        "ensure_lookup_table",
+        re.compile(r"IndexError: BMElemSeq\[index\]: outdated internal index table"),
+        _fix_lookup_table,
+    ),
+    Rule(
+        "removed_api",
+        re.compile(r"AttributeError: .*has no attribute '(\w+)'"),
+        _fix_removed_api,
+    ),
+    Rule(
+        "removed_api",
+        re.compile(r'TypeError: .*keyword "(\w+)" unrecognized'),
+        _fix_removed_api,
+    ),
+    Rule(
+        "premature_free",
+        re.compile(r"ReferenceError: BMesh data of type \w+ has been removed"),
+        _fix_premature_free,
+    ),
+    Rule(
+        "zero_divisor",
+        re.compile(r"ZeroDivisionError"),
+        _fix_zero_divisor,
+    ),
+    Rule(
+        "missing_import",
+        re.compile(r"NameError: name '(\w+)' is not defined"),
+        _fix_missing_import,
+    ),
+)
+
+
+def auto_fix(code: str, error_text: str) -> AutoFixResult | None:
+    """Apply every rule whose signature matches ``error_text``; None if nothing changed."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    line = _failing_line(code, error_text)
+    result = AutoFixResult(code=code)
+    for rule in RULES:
+        match = rule.signature.search(error_text)
+        if match is None or rule.name in result.rules:
+            continue
+        try:
+            fixed = rule.apply(result.code, tree, match, line)
+        except Exception:
+            fixed = None
+        if fixed is None or fixed == result.code or not _compiles(fixed):
+            continue
+        result.code = fixed
+        result.rules.append(rule.name)
+        tree = ast.parse(fixed)
+        line = None     # line numbers refer to the original code
+    return result if result.rules else None
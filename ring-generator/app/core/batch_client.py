@@ -0,0 +1,268 @@
+"""
+Batch tier for bulk ring generation.
+
+Jobs submitted with ``priority="batch"`` skip the interactive LLM path for
+their initial generation call: the job manager groups them into one
+Message Batches request, polls it, and hands each result to the normal
+Blender/fix loop as a prefetched response.  Batch pricing is half the
+interactive rate and batch traffic does not consume the interactive rate
+limits.
+
+Backends share a small synchronous interface (run in the thread-pool
+like every other LLM call):
+
+  - ``AnthropicBatchBackend`` — ``client.messages.batches`` create /
+    retrieve / results
+  - ``LocalBatchBackend`` — offline stand-in with the same behaviour;
+    responses come from a responder callable (a canned band script by
+    default) after a configurable latency, so the whole flow can be
+    exercised without network access
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+import time
+from dataclasses import dataclass
+from typing import Callable, Sequence
+
+from .code_processor import extract_code
+from .key_pool import get_key_pool
+from .llm_client import (
+    LLMResponse,
+    UsageInfo,
+    claude_pricing,
+    claude_user_content,
+)
+from .llm_connections import get_claude_client
+
+logger = logging.getLogger(__name__)
+
+BATCH_DISCOUNT = 0.5
+
+
+@dataclass
+class BatchItem:
+    custom_id: str
+    model: str
+    system: str
+    prompt: str
+    image_data: bytes | None = None
+    image_mime: str | None = None
+    max_tokens: int = 20000
+
+
+@dataclass
+class BatchItemResult:
+    custom_id: str
+    response: LLMResponse | None = None
+    error: str = ""
+
+
+def batch_usage(model: str, input_tokens: int, output_tokens: int) -> UsageInfo:
+    in_cost, out_cost = (c * BATCH_DISCOUNT for c in claude_pricing(model))
+    return UsageInfo(
+        model=model,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_cost_per_mtok=in_cost,
+        output_cost_per_mtok=out_cost,
+        cost_usd=round(input_tokens / 1_000_000 * in_cost + output_tokens / 1_000_000 * out_cost, 4),
+        tier="batch",
+    )
+
+
+class BatchBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def submit(self, items: list[BatchItem]) -> str:
+        """Create a batch; returns its id."""
+
+    @abstractmethod
+    def is_done(self, batch_id: str) -> bool:
+        """True once every request in the batch has ended."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> list[BatchItemResult]:
+        """Per-request results of an ended batch (may be retried if it raises)."""
+
+
+# ---------------------------------------------------------------------------
+# Anthropic Message Batches
+# ---------------------------------------------------------------------------
+
+class AnthropicBatchBackend(BatchBackend):
+    name = "anthropic"
+
+    def __init__(self, api_keys: str | Sequence[str]):
+        self.key_pool = get_key_pool("anthropic", api_keys)
+        # A batch can only be read back with a key from the workspace that created it.
+        self._batch_keys: dict[str, str] = {}
+        self._models: dict[str, dict[str, str]] = {}
+
+    def submit(self, items: list[BatchItem]) -> str:
+        api_key = self.key_pool.acquire()
+        try:
+            batch = get_claude_client(api_key).messages.batches.create(
+                requests=[
+                    {
+                        "custom_id": item.custom_id,
+                        "params": {
+                            "model": item.model,
+                            "max_tokens": item.max_tokens,
+                            "messages": [{
+                                "role": "user",
+                                "content": claude_user_content(
+                                    item.system, item.prompt, item.image_data, item.image_mime,
+                                ),
+                            }],
+                        },
+                    }
+                    for item in items
+                ],
+            )
+        finally:
+            self.key_pool.release(api_key)
+        self._batch_keys[batch.id] = api_key
+        self._models[batch.id] = {item.custom_id: item.model for item in items}
+        logger.info("[BATCH] Submitted %s with %d requests", batch.id, len(items))
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        client = get_claude_client(self._batch_keys[batch_id])
+        return client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> list[BatchItemResult]:
+        client = get_claude_client(self._batch_keys[batch_id])
+        models = self._models.get(batch_id, {})
+        out: list[BatchItemResult] = []
+        for entry in client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type != "succeeded":
+                error = getattr(getattr(result, "error", None), "error", None)
+                out.append(BatchItemResult(
+                    custom_id=entry.custom_id,
+                    error=f"{result.type}: {getattr(error, 'message', '') or ''}".rstrip(": "),
+                ))
+                continue
+            message = result.message
+            raw = "".join(block.text for block in message.content if block.type == "text")
+            usage = batch_usage(
+                models.get(entry.custom_id, message.model),
+                message.usage.input_tokens,
+                message.usage.output_tokens,
+            )
+            out.append(BatchItemResult(
+                custom_id=entry.custom_id,
+                response=LLMResponse(code=extract_code(raw), usage=usage, raw=raw),
+            ))
+        # forget the batch only once it has been read in full, so a failed
+        # read can be retried with the workspace key
+        self._batch_keys.pop(batch_id, None)
+        self._models.pop(batch_id, None)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Local stand-in (offline testing)
+# ---------------------------------------------------------------------------
+
+_CANNED_RING = '''import bpy
+import bmesh
+import math
+
+BAND_RADIUS = 0.0089
+BAND_WIDTH = 0.0025
+BAND_THICKNESS = 0.0016
+SEGMENTS = 64
+
+
+def build_band():
+    bm = bmesh.new()
+    rings = []
+    for i in range(SEGMENTS):
+        a = 2 * math.pi * i / SEGMENTS
+        ca, sa = math.cos(a), math.sin(a)
+        profile = [
+            (BAND_RADIUS, -BAND_WIDTH / 2),
+            (BAND_RADIUS + BAND_THICKNESS, -BAND_WIDTH / 2),
+            (BAND_RADIUS + BAND_THICKNESS, BAND_WIDTH / 2),
+            (BAND_RADIUS, BAND_WIDTH / 2),
+        ]
+        rings.append([bm.verts.new((r * ca, y, r * sa)) for r, y in profile])
+    for i in range(SEGMENTS):
+        a, b = rings[i], rings[(i + 1) % SEGMENTS]
+        for j in range(4):
+            bm.faces.new([a[j], b[j], b[(j + 1) % 4], a[(j + 1) % 4]])
+    mesh = bpy.data.meshes.new("Band")
+    bm.to_mesh(mesh)
+    bm.free()
+    obj = bpy.data.objects.new("Band", mesh)
+    bpy.context.collection.objects.link(obj)
+    return obj
+
+
+def build():
+    build_band()
+'''
+
+
+def canned_responder(item: BatchItem) -> str:
+    return f"```python\n{_CANNED_RING}```"
+
+
+class LocalBatchBackend(BatchBackend):
+    name = "local"
+
+    def __init__(
+        self,
+        responder: Callable[[BatchItem], str] | None = None,
+        latency_seconds: float = 2.0,
+    ):
+        self.responder = responder or canned_responder
+        self.latency_seconds = latency_seconds
+        self._batches: dict[str, tuple[float, list[BatchItem]]] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def submit(self, items: list[BatchItem]) -> str:
+        with self._lock:
+            self._counter += 1
+            batch_id = f"local_batch_{self._counter:05d}"
+            self._batches[batch_id] = (time.monotonic() + self.latency_seconds, list(items))
+        logger.info("[BATCH] Local stand-in accepted %s with %d requests", batch_id, len(items))
+        return batch_id
+
+    def is_done(self, batch_id: str) -> bool:
+        with self._lock:
+            ready_at, _ = self._batches[batch_id]
+        return time.monotonic() >= ready_at
+
+    def results(self, batch_id: str) -> list[BatchItemResult]:
+        with self._lock:
+            _, items = self._batches.pop(batch_id)
+        out: list[BatchItemResult] = []
+        for item in items:
+            try:
+                raw = self.responder(item)
+            except Exception as e:
+                out.append(BatchItemResult(custom_id=item.custom_id, error=f"errored: {e}"))
+                continue
+            usage = batch_usage(item.model, (len(item.system) + len(item.prompt)) // 4, len(raw) // 4)
+            out.append(BatchItemResult(
+                custom_id=item.custom_id,
+                response=LLMResponse(code=extract_code(raw), usage=usage, raw=raw),
+            ))
+        return out
+
+
+def make_batch_backend(name: str, anthropic_keys: str | Sequence[str], local_latency: float = 2.0) -> BatchBackend:
+    if name == "local":
+        return LocalBatchBackend(latency_seconds=local_latency)
+    if name == "anthropic":
+        return AnthropicBatchBackend(anthropic_keys)
+    raise ValueError(f"Unknown batch backend: {name!r} (expected 'anthropic' or 'local')")
+
@@ -2,12 +2,15 @@
 Blender headless execution.
 
 Mirrors the original run_blender() exactly:
-  - Scene clear
+  - Scene clear + preloaded helper library (blender_lib/ring_helpers.py)
   - Safety preprocessing
   - Strip __name__ guard
-  - Auto build() + export
+  - Auto build() + export (optionally with per-function fault isolation
+    and incremental per-function rebuilds)
+  - Evaluated-geometry budget (caps Subsurf levels / Bevel segments)
   - Spatial report generation
   - GLB export
+  - Optional profiling of component functions and of each phase
 
 Runs subprocess in a thread-pool so the async event loop stays free.
 """
@@ -15,6 +18,8 @@ Runs subprocess in a thread-pool so the async event loop stays free.
 from __future__ import annotations
 
 import asyncio
+import functools
+import json
 import logging
 import os
 import re
@@ -23,7 +28,18 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
-from .code_processor import preprocess_code, strip_main_guard
+from .code_processor import extract_modules
+from .incremental import INCREMENTAL_DIRNAME, function_hashes, incremental_code, incremental_report
+from .profiling import (
+    map_profile,
+    modifier_eval_code,
+    profile_begin,
+    profile_code,
+    profile_end,
+    profile_from_stream,
+    profile_report,
+)
+from .source_map import BlenderError, SourceMap, assemble, clean_error_lines, parse_blender_error
 
 logger = logging.getLogger(__name__)
 
@@ -41,13 +57,28 @@ class BlenderResult:
     elapsed: float = 0.0
     script_path: str = ""
     spatial_report: str = ""
+    # isolation mode: one {"function", "error", "traceback", "location"} per failed
+    # component function, traceback lines mapped back to the original code
+    function_errors: list[dict[str, Any]] = field(default_factory=list)
+    # budget, polygons_before / polygons_after, passes, reductions (empty when the guard is off)
+    geometry_budget: dict[str, Any] = field(default_factory=dict)
+    # incremental mode: reused / rebuilt / uncached function names
+    incremental: dict[str, list[str]] = field(default_factory=dict)
+    # last traceback, frames mapped back to the original code (None when there is none)
+    error: BlenderError | None = None
+    # profiling mode: per-function / per-phase seconds, cProfile top-N (partial after a timeout)
+    profile: dict[str, Any] = field(default_factory=dict)
 
 
 # ---------------------------------------------------------------------------
 # Scene clear — prepended to every script
 # ---------------------------------------------------------------------------
 
-_SCENE_CLEAR = """
+# Blender-side helper module directory (service root / blender_lib)
+BLENDER_LIB_DIR = Path(__file__).resolve().parents[2] / "blender_lib"
+
+# Public: fix_context / auto_fixer assemble the same script to map line numbers
+SCENE_PRELUDE = f"""
 # ========================= AUTO SCENE CLEAR =========================
 import bpy
 bpy.ops.object.select_all(action='SELECT')
@@ -60,21 +91,219 @@ for mat in list(bpy.data.materials):
     bpy.data.materials.remove(mat)
 print("[PIPELINE] Scene cleared")
 # ========================= END SCENE CLEAR =========================
+# ========================= PRELOADED HELPERS =========================
+import sys as _sys
+_sys.path.insert(0, r"{BLENDER_LIB_DIR}")
+try:
+    import ring_helpers as _rh
+    from ring_helpers import *
+    print(f"[PIPELINE] ring_helpers {{_rh.__version__}} preloaded")
+except ImportError as _he:
+    _rh = None
+    print(f"[PIPELINE] ring_helpers not available: {{_he}}")
+try:
+    import ring_components as _rc
+    from ring_components import *
+    print(f"[PIPELINE] ring_components {{_rc.__version__}} preloaded")
+except ImportError as _ce:
+    _rc = None
+    print(f"[PIPELINE] ring_components not available: {{_ce}}")
+# ========================= END PRELOADED HELPERS =========================
 
 """
 
 
-def _build_export_code(glb_output_path: str) -> str:
+# innermost frames kept per isolated function's traceback
+_FUNCTION_TRACEBACK_FRAMES = 4
+
+_TRACEBACK_FRAME_RE = re.compile(r'^\s*File "[^"]*ring_script\.py", line (\d+)(?:, in (\S+))?')
+
+
+def isolated_functions(code: str) -> list[str]:
+    """Component functions to isolate: ``build_*`` modules, else every module."""
+    modules = extract_modules(code)
+    return [m for m in modules if m.startswith("build_")] or modules
+
+
+def _isolation_code(functions: list[str]) -> str:
+    """
+    Wrap each component function so an exception is recorded and the
+    function returns None instead of aborting build(); the remaining
+    components still run and everything that succeeded is exported.
+    """
+    return f"""
+# ========================= FUNCTION ISOLATION =========================
+import functools as _ft, json as _json
+_FUNCTION_ERRORS = []
+
+def _isolate(_name, _fn):
+    @_ft.wraps(_fn)
+    def _isolated(*_a, **_kw):
+        try:
+            return _fn(*_a, **_kw)
+        except Exception as _fe:
+            _FUNCTION_ERRORS.append({{
+                "function": _name,
+                "error": f"{{type(_fe).__name__}}: {{_fe}}",
+                "traceback": "".join(_tb.format_exception(
+                    type(_fe), _fe, _fe.__traceback__, limit=-{_FUNCTION_TRACEBACK_FRAMES})),
+            }})
+            print(f"[PIPELINE] {{_name}}() failed: {{type(_fe).__name__}}: {{_fe}}")
+            _tb.print_exc()
+            return None
+    return _isolated
+
+for _fn_name in {functions!r}:
+    if callable(globals().get(_fn_name)):
+        globals()[_fn_name] = _isolate(_fn_name, globals()[_fn_name])
+print(f"[PIPELINE] Isolation mode: {len(functions)} component functions wrapped")
+"""
+
+
+def _function_errors_report() -> str:
+    return """
+print("===FUNCTION_ERRORS_START===")
+print(_json.dumps(_FUNCTION_ERRORS))
+print("===FUNCTION_ERRORS_END===")
+"""
+
+
+# depsgraph evaluations the geometry budget may spend on reductions
+_GEOMETRY_BUDGET_PASSES = 3
+
+
+def _geometry_budget_code(max_polygons: int) -> str:
+    """
+    Measure evaluated (post-modifier) geometry per mesh object and, while the
+    scene exceeds ``max_polygons``, lower Subsurf levels (to 0) / halve Bevel
+    segments (to 1) on the heaviest objects.  Each pass plans every step
+    from estimates (a Subsurf level is ~4x the faces) and re-evaluates the
+    depsgraph once, for at most ``_GEOMETRY_BUDGET_PASSES`` passes.
+    ``export_apply=True`` exports exactly this evaluated geometry, so the
+    GLB stays bounded.
+    """
+    return f"""
+# ========================= GEOMETRY BUDGET =========================
+import json as _json
+_GEOMETRY_BUDGET = {{"budget": {max_polygons}, "polygons_before": 0, "polygons_after": 0, "passes": 0, "reductions": []}}
+_EVALUATED = {{}}
+
+def _measure_evaluated():
+    _dg = bpy.context.evaluated_depsgraph_get()
+    _counts = {{}}
+    for _o in bpy.data.objects:
+        if _o.type == 'MESH':
+            _em = _o.evaluated_get(_dg).data
+            _counts[_o.name] = (len(_em.vertices), len(_em.polygons))
+    return _counts
+
+def _step_down(_name, _polys):
+    # one modifier setting lower; (step, estimated polygons after) or None
+    _o = bpy.data.objects[_name]
+    for _m in _o.modifiers:
+        if _m.type == 'SUBSURF' and max(_m.levels, _m.render_levels) > 0:
+            _old = max(_m.levels, _m.render_levels)
+            _m.levels = _m.render_levels = _old - 1
+            return {{"object": _name, "modifier": _m.name, "setting": "subsurf_levels", "from": _old, "to": _old - 1}}, _polys / 4
+    for _m in _o.modifiers:
+        if _m.type == 'BEVEL' and _m.segments > 1:
+            _old = _m.segments
+            _m.segments = max(1, _old // 2)
+            return ({{"object": _name, "modifier": _m.name, "setting": "bevel_segments", "from": _old, "to": _m.segments}},
+                    _polys * (_m.segments + 1) / (_old + 1))
+    return None
+
+def _plan_reductions(_counts):
+    # step down the heaviest objects until the estimated total fits; one entry per modifier
+    _estimate = {{_n: float(_c[1]) for _n, _c in _counts.items()}}
+    _steps = {{}}
+    while sum(_estimate.values()) > {max_polygons} and _estimate:
+        _name = max(_estimate, key=_estimate.get)
+        _result = _step_down(_name, _estimate[_name])
+        if _result is None:
+            del _estimate[_name]
+            continue
+        _step, _estimate[_name] = _result
+        _key = (_step["object"], _step["modifier"], _step["setting"])
+        if _key in _steps:
+            _steps[_key]["to"] = _step["to"]
+        else:
+            _steps[_key] = _step
+    return list(_steps.values())
+
+try:
+    _EVALUATED = _measure_evaluated()
+    _total = sum(c[1] for c in _EVALUATED.values())
+    _GEOMETRY_BUDGET["polygons_before"] = _total
+    while _total > {max_polygons} and _GEOMETRY_BUDGET["passes"] < {_GEOMETRY_BUDGET_PASSES}:
+        _steps = _plan_reductions(_EVALUATED)
+        if not _steps:
+            break
+        _GEOMETRY_BUDGET["passes"] += 1
+        _EVALUATED = _measure_evaluated()
+        _total = sum(c[1] for c in _EVALUATED.values())
+        for _step in _steps:
+            _step["pass"] = _GEOMETRY_BUDGET["passes"]
+            _step["polygons_after"] = _total
+        _GEOMETRY_BUDGET["reductions"].extend(_steps)
+    _GEOMETRY_BUDGET["polygons_after"] = _total
+    if _GEOMETRY_BUDGET["reductions"]:
+        print(f"[PIPELINE] Geometry budget: {{_GEOMETRY_BUDGET['polygons_before']}} -> {{_total}} polygons "
+              f"(budget {max_polygons}, {{len(_GEOMETRY_BUDGET['reductions'])}} reductions "
+              f"in {{_GEOMETRY_BUDGET['passes']}} passes)")
+except Exception as _ge:
+    print(f"[PIPELINE] Geometry budget check failed: {{_ge}}")
+print("===GEOMETRY_BUDGET_START===")
+print(_json.dumps(_GEOMETRY_BUDGET))
+print("===GEOMETRY_BUDGET_END===")
+"""
+
+
+def _geometry_budget_report() -> str:
+    """Spatial-report lines: evaluated counts and what the budget reduced."""
+    return """
+    print(f"GEOMETRY BUDGET: {_GEOMETRY_BUDGET['polygons_before']} -> {_GEOMETRY_BUDGET['polygons_after']} "
+          f"evaluated polygons (budget {_GEOMETRY_BUDGET['budget']})")
+    for _name, (_ev, _ep) in _EVALUATED.items():
+        print(f"  {_name}: {_ev} verts, {_ep} faces evaluated")
+    for _r in _GEOMETRY_BUDGET["reductions"]:
+        print(f"  REDUCED {_r['object']}.{_r['modifier']} {_r['setting']} {_r['from']} -> {_r['to']}")
+    print("---")
+"""
+
+
+def _build_export_code(
+    glb_output_path: str,
+    isolate: list[str] | None = None,
+    max_polygons: int = 0,
+    incremental: str = "",
+    profile: list[str] | None = None,
+    profile_top_n: int = 0,
+) -> str:
+    def _p(snippet: str) -> str:
+        return snippet if profile is not None else ""
+
     return f"""
 
 # ========================= AUTO BUILD + EXPORT =========================
 import bpy, os, traceback as _tb
 from mathutils import Vector
 
+# Compatibility shim: helpers the script defines itself shadow the preloaded ones.
+_own_helpers = [
+    _n for _m in (_rh, _rc) if _m is not None
+    for _n in _m.__all__ if globals().get(_n) is not getattr(_m, _n)
+]
+if _own_helpers:
+    print(f"[PIPELINE] Script defines its own helpers (preloaded versions shadowed): {{_own_helpers}}")
+
 _output = r"{glb_output_path}"
 os.makedirs(os.path.dirname(_output), exist_ok=True)
-
+{incremental}
+{_isolation_code(isolate) if isolate else ""}
+{_p(profile_code(profile or [], profile_top_n))}
 print("[PIPELINE] Running build()...")
+{_p(profile_begin("build"))}
 try:
     build()
     print("[PIPELINE] build() completed")
@@ -82,11 +311,17 @@ except Exception as _be:
     print(f"[PIPELINE] build() error: {{_be}}")
     _tb.print_exc()
     print("[PIPELINE] Attempting partial export...")
+{_p(profile_end("build"))}
 
+{_function_errors_report() if isolate else ""}
+{incremental_report() if incremental else ""}
+{_geometry_budget_code(max_polygons) if max_polygons else ""}
+{_p(modifier_eval_code())}
 _obj_count = len([o for o in bpy.data.objects if o.type == 'MESH'])
 print(f"[PIPELINE] Scene has {{_obj_count}} mesh objects")
 
 # ========================= SPATIAL REPORT GENERATION =========================
+{_p(profile_begin("spatial_report"))}
 print("===SPATIAL_REPORT_START===")
 try:
     for _obj in bpy.data.objects:
@@ -117,9 +352,11 @@ try:
             print(f"  Parent: {{_parent}}")
             print(f"  Modifiers: {{_mods}}")
             print("---")
+{_geometry_budget_report() if max_polygons else ""}
 except Exception as _spatial_err:
     print(f"Spatial report generation failed: {{_spatial_err}}")
 print("===SPATIAL_REPORT_END===")
+{_p(profile_end("spatial_report"))}
 # ========================= END SPATIAL REPORT =========================
 
 if _obj_count == 0:
@@ -127,6 +364,7 @@ if _obj_count == 0:
 else:
     bpy.ops.object.select_all(action='SELECT')
     print(f"[PIPELINE] Exporting GLB to: {{_output}}")
+    {_p(profile_begin("export"))}
     try:
         bpy.ops.export_scene.gltf(
             filepath=_output,
@@ -142,6 +380,8 @@ else:
     except Exception as _e:
         print(f"[PIPELINE] Export FAILED: {{_e}}")
         _tb.print_exc()
+    {_p(profile_end("export"))}
+{_p(profile_report())}
 """
 
 
@@ -151,6 +391,105 @@ def _extract_spatial_report(stdout: str) -> str:
     return ""
 
 
+def _extract_json_block(stdout: str, marker: str) -> Any:
+    start, end = f"==={marker}_START===", f"==={marker}_END==="
+    if start not in stdout or end not in stdout:
+        return None
+    block = stdout.split(start)[1].split(end)[0]
+    try:
+        return json.loads(block.strip())
+    except ValueError:
+        logger.warning("Could not parse %s block", marker)
+        return None
+
+
+def _extract_function_errors(stdout: str) -> list[dict[str, Any]]:
+    return _extract_json_block(stdout, "FUNCTION_ERRORS") or []
+
+
+def _extract_geometry_budget(stdout: str) -> dict[str, Any]:
+    return _extract_json_block(stdout, "GEOMETRY_BUDGET") or {}
+
+
+def _extract_incremental(stdout: str) -> dict[str, list[str]]:
+    return _extract_json_block(stdout, "INCREMENTAL") or {}
+
+
+def _extract_profile(stdout: str) -> dict[str, Any]:
+    return _extract_json_block(stdout, "PROFILE") or {}
+
+
+def _map_function_errors(errors: list[dict[str, Any]], code: str, source_map: SourceMap) -> None:
+    """Rewrite each isolated function's traceback to original-code lines (as ``parse_blender_error``)."""
+    for err in errors:
+        mapped = parse_blender_error(err.get("traceback", ""), code, source_map)
+        if mapped is None:
+            continue
+        err["traceback"] = "\n".join([*mapped.frame_lines(), mapped.headline])
+        location = mapped.location
+        err["location"] = location.to_dict() if location else {}
+
+
+def _innermost_frame(traceback_text: str) -> str:
+    """``line N in fn(): source`` for the last script frame of a traceback, or ""."""
+    lines = traceback_text.rstrip().split("\n")
+    for i in range(len(lines) - 1, -1, -1):
+        match = _TRACEBACK_FRAME_RE.match(lines[i])
+        if not match:
+            continue
+        source = lines[i + 1].strip() if i + 1 < len(lines) and not _TRACEBACK_FRAME_RE.match(lines[i + 1]) else ""
+        where = f" in {match.group(2)}()" if match.group(2) else ""
+        return f"line {match.group(1)}{where}: {source}".rstrip(": ")
+    return ""
+
+
+def _tail_lines(text: str, limit: int) -> str:
+    """Whole trailing lines of ``text`` within ``limit`` chars (innermost frames are last)."""
+    lines = text.rstrip().split("\n")
+    start = len(lines)
+    size = 0
+    while start > 0 and size + len(lines[start - 1]) + 1 <= limit:
+        start -= 1
+        size += len(lines[start]) + 1
+    # never start at the source line of a raw frame whose ``File`` line did not fit
+    if 0 < start < len(lines) - 1 and lines[start - 1].lstrip().startswith("File "):
+        start += 1
+    return "\n".join(lines[start:])
+
+
+def format_function_errors(errors: list[dict[str, Any]], max_chars: int = 2000) -> str:
+    """
+    Per-function error table for fix prompts, within ``max_chars``.  Every
+    function's exception and innermost frame come first; the tracebacks
+    share what is left of the budget (innermost lines kept).
+    """
+    header = f"{len(errors)} component function(s) failed in this run — fix ALL of them:"
+    summaries: list[str] = []
+    for err in errors:
+        summary = f"--- {err['function']}() ---\n{err['error']}"
+        location = err.get("location")
+        if location:
+            where = f"line {location['line']} in {location['function'] or '?'}(): {location['source']}"
+        else:
+            where = _innermost_frame(err.get("traceback", ""))
+        if where:
+            summary += f"\nat {where}"
+        summaries.append(summary)
+
+    used = len(header) + sum(len(s) + 2 for s in summaries)
+    while summaries and used > max_chars:
+        used -= len(summaries.pop()) + 2
+    if len(summaries) < len(errors):
+        return "\n\n".join([header, *summaries, f"... and {len(errors) - len(summaries)} more function(s)"])
+
+    share = (max_chars - used) // max(len(errors), 1) - 1
+    blocks = [header]
+    for summary, err in zip(summaries, errors):
+        traceback = _tail_lines(err.get("traceback", ""), share) if share > 0 else ""
+        blocks.append(f"{summary}\n{traceback}" if traceback else summary)
+    return "\n\n".join(blocks)
+
+
 # ---------------------------------------------------------------------------
 # Synchronous runner (offloaded to thread-pool by caller)
 # ---------------------------------------------------------------------------
@@ -160,17 +499,52 @@ def run_blender_sync(
     glb_output_path: str,
     blender_executable: str,
     timeout: int = 300,
+    isolate_functions: bool = False,
+    max_polygons: int = 0,
+    incremental: bool = False,
+    profile: bool = False,
+    profile_top_n: int = 0,
 ) -> BlenderResult:
-    """Execute a Blender script headlessly. Returns structured result."""
+    """
+    Execute a Blender script headlessly. Returns structured result.
+
+    ``max_polygons`` > 0 enables the evaluated-geometry budget guard before
+    export; what it reduced is returned in ``geometry_budget``.
+
+    With ``incremental`` component functions whose content hash and
+    arguments match an earlier run of this session are appended from the
+    session's ``.blend`` library instead of being re-executed.
+
+    With ``isolate_functions`` every component function runs under its own
+    error capture; a run with any failed function is not successful even
+    when the partial export produced a GLB.
+
+    With ``profile`` component functions and the build / modifier / spatial
+    report / export phases are timed (plus the cProfile top ``profile_top_n``
+    of build() when > 0); after a timeout ``profile`` holds what finished
+    and what was still running.
+    """
     import subprocess
 
     session_dir = os.path.dirname(glb_output_path)
     script_path = os.path.join(session_dir, "ring_script.py")
 
-    script_code = preprocess_code(script_code)
-    script_code = strip_main_guard(script_code)
-
-    full_script = _SCENE_CLEAR + script_code + _build_export_code(glb_output_path)
+    original_code = script_code
+    assembled, source_map = assemble(original_code, SCENE_PRELUDE)
+    script_code = assembled[len(SCENE_PRELUDE):]
+
+    isolate = isolated_functions(script_code) if isolate_functions else None
+    inc_code = ""
+    if incremental:
+        hashes = function_hashes(script_code, isolated_functions(script_code))
+        if hashes:
+            inc_code = incremental_code(os.path.join(session_dir, INCREMENTAL_DIRNAME), hashes)
+    profiled = None
+    if profile:
+        profiled = [f for f in isolated_functions(script_code) if f != "build"]
+    full_script = assembled + _build_export_code(
+        glb_output_path, isolate, max_polygons, inc_code, profiled, profile_top_n,
+    )
 
     os.makedirs(session_dir, exist_ok=True)
     with open(script_path, 'w') as f:
@@ -188,18 +562,26 @@ def run_blender_sync(
         stderr = result.stderr or ""
 
         pipeline_lines = [l for l in stdout.split('\n') if '[PIPELINE]' in l]
-        error_lines = [
-            l for l in (stdout + '\n' + stderr).split('\n')
-            if 'Error' in l or 'Traceback' in l or 'error' in l.lower()
-        ]
+        error_lines = clean_error_lines(stdout + '\n' + stderr, limit=50)
+        error = parse_blender_error(stdout + '\n' + stderr, original_code, source_map)
 
         spatial_report = _extract_spatial_report(stdout)
+        function_errors = _extract_function_errors(stdout)
+        _map_function_errors(function_errors, original_code, source_map)
+        geometry_budget = _extract_geometry_budget(stdout)
+        incremental_info = _extract_incremental(stdout)
+        profile_info = _extract_profile(stdout)
+        if profile and not profile_info:
+            # killed / crashed before the report: rebuild what finished from the stream
+            profile_info = profile_from_stream(stdout)
+            profile_info["timed_out"] = False
+        map_profile(profile_info, source_map)
 
         glb_exists = os.path.isfile(glb_output_path)
         glb_size = os.path.getsize(glb_output_path) if glb_exists else 0
 
         # GLB must be at least 1KB to have real geometry (172 bytes = empty)
-        success = glb_exists and glb_size > 1024
+        success = glb_exists and glb_size > 1024 and not function_errors
 
         return BlenderResult(
             success=success,
@@ -213,14 +595,28 @@ def run_blender_sync(
             elapsed=elapsed,
             script_path=script_path,
             spatial_report=spatial_report,
+            function_errors=function_errors,
+            geometry_budget=geometry_budget,
+            incremental=incremental_info,
+            error=error,
+            profile=profile_info,
         )
 
-    except subprocess.TimeoutExpired:
+    except subprocess.TimeoutExpired as e:
         logger.error("Blender TIMEOUT (%ds)", timeout)
+        partial = e.stdout or ""
+        if isinstance(partial, bytes):
+            partial = partial.decode("utf-8", errors="replace")
+        profile_info = profile_from_stream(partial) if profile else {}
+        running = [r["name"] for r in profile_info.get("running", []) if r["name"] != "build"]
+        if running:
+            logger.error("Blender TIMEOUT while running %s()", running[-1])
         return BlenderResult(
             success=False,
+            stdout=partial if profile else "",
             error_lines=["TimeoutExpired"],
             elapsed=time.time() - t0,
+            profile=profile_info,
         )
     except Exception as e:
         logger.error("Blender EXCEPTION: %s", e)
@@ -235,19 +631,58 @@ def run_blender_sync(
 # Async wrapper
 # ---------------------------------------------------------------------------
 
+# Process-wide cap on concurrent Blender subprocesses (sized from
+# max_concurrent_jobs), so variants and edits cannot exceed the worker count.
+_blender_slots = 0
+_blender_semaphore: asyncio.Semaphore | None = None
+_blender_semaphore_loop: asyncio.AbstractEventLoop | None = None
+
+
+def configure_blender_slots(max_concurrent_jobs: int) -> None:
+    """Limit concurrent Blender runs (0 = unlimited)."""
+    global _blender_slots, _blender_semaphore
+    _blender_slots = max(0, max_concurrent_jobs)
+    _blender_semaphore = None
+
+
+def _blender_slot() -> asyncio.Semaphore | None:
+    global _blender_semaphore, _blender_semaphore_loop
+    if not _blender_slots:
+        return None
+    loop = asyncio.get_running_loop()
+    if _blender_semaphore is None or _blender_semaphore_loop is not loop:
+        _blender_semaphore = asyncio.Semaphore(_blender_slots)
+        _blender_semaphore_loop = loop
+    return _blender_semaphore
+
+
 async def run_blender(
     script_code: str,
     glb_output_path: str,
     blender_executable: str,
     timeout: int = 300,
+    isolate_functions: bool = False,
+    max_polygons: int = 0,
+    incremental: bool = False,
+    profile: bool = False,
+    profile_top_n: int = 0,
 ) -> BlenderResult:
-    """Async wrapper — offloads blocking subprocess to thread-pool."""
+    """Async wrapper — waits for a Blender slot, then offloads the subprocess to the thread-pool."""
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(
-        None,
+    call = functools.partial(
         run_blender_sync,
         script_code,
         glb_output_path,
         blender_executable,
         timeout,
+        isolate_functions,
+        max_polygons,
+        incremental,
+        profile,
+        profile_top_n,
     )
+    slot = _blender_slot()
+    if slot is None:
+        return await loop.run_in_executor(None, call)
+    async with slot:
+        return await loop.run_in_executor(None, call)
@@ -33,15 +33,20 @@ _MAIN_GUARD_RE = re.compile(
 )
 
 
-def preprocess_code(code: str) -> str:
-    """Inject _safe_face helper and wrap bm.faces.new([...]) calls."""
-    lines = code.split('\n')
+def safety_insert_index(code: str) -> int:
+    """0-based line index at which ``_SAFE_HELPER`` is injected (after the last import)."""
     last_import = 0
-    for i, line in enumerate(lines):
+    for i, line in enumerate(code.split('\n')):
         stripped = line.strip()
         if stripped.startswith('import ') or stripped.startswith('from '):
             last_import = i
-    lines.insert(last_import + 1, _SAFE_HELPER)
+    return last_import + 1
+
+
+def preprocess_code(code: str) -> str:
+    """Inject _safe_face helper and wrap bm.faces.new([...]) calls."""
+    lines = code.split('\n')
+    lines.insert(safety_insert_index(code), _SAFE_HELPER)
     code = '\n'.join(lines)
 
     code = _FACES_NEW_RE.sub(r'_safe_face(\1, \2)', code)
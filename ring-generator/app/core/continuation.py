@@ -0,0 +1,71 @@
+"""
+Truncation detection and continuation stitching for long LLM replies.
+
+A ring script longer than the output limit is cut off mid-function.  Sent
+to Blender as-is it fails with a SyntaxError and costs a full fix round
+(whole script re-sent and regenerated).  Instead ``llm_client`` detects
+the cut and asks the model to continue:
+
+  - truncation = provider stop reason says the token limit was hit
+    (Claude ``max_tokens``, Gemini ``MAX_TOKENS``), or the reply has an
+    unclosed code fence and did not end cleanly (stop reason missing or
+    other than a normal end of turn)
+  - the partial reply is trimmed back to its last complete line and sent
+    back as the assistant turn, followed by a short "continue" instruction
+  - the continuation is appended after dropping a re-opened fence and any
+    lines that repeat the end of the partial reply
+
+At most ``MAX_CONTINUATIONS`` rounds are made; if the reply is still
+truncated the stitched text is returned and the normal fix loop takes over.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+MAX_CONTINUATIONS = 2
+_MAX_OVERLAP_LINES = 40
+_MIN_SINGLE_LINE_OVERLAP = 20
+_CLEAN_STOPS = frozenset({"end_turn", "stop"})
+_OPEN_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*[ \t]*\n")
+
+CONTINUE_PROMPT = """Your previous reply was cut off by the output token limit. Continue it EXACTLY where it stops:
+start with the next line after the last complete line above, do NOT repeat anything already written,
+do NOT restart the script and do NOT open a new code fence. Close the code fence when the code is complete."""
+
+
+def has_unclosed_fence(raw: str) -> bool:
+    return raw.count("```") % 2 == 1
+
+
+def is_truncated(raw: str, stop_reason: Any) -> bool:
+    """``stop_reason`` is Claude's ``stop_reason`` or Gemini's ``finish_reason`` (enum or str)."""
+    reason = str(stop_reason or "").lower()
+    if "max_tokens" in reason:
+        return True
+    return has_unclosed_fence(raw) and reason.rsplit(".", 1)[-1] not in _CLEAN_STOPS
+
+
+def trim_partial(raw: str) -> str:
+    """Cut a truncated reply back to its last complete line (keeps the newline)."""
+    cut = raw.rfind("\n")
+    return raw[:cut + 1] if cut >= 0 else raw
+
+
+def stitch(partial: str, continuation: str) -> str:
+    """Append ``continuation`` to ``partial`` without a re-opened fence or repeated lines."""
+    if has_unclosed_fence(partial):
+        continuation = _OPEN_FENCE_RE.sub("", continuation, count=1)
+
+    head = partial.rstrip("\n").split("\n")
+    tail = continuation.lstrip("\n").split("\n")
+    for n in range(min(_MAX_OVERLAP_LINES, len(head), len(tail)), 0, -1):
+        if head[-n:] != tail[:n]:
+            continue
+        # A single short repeated line (e.g. a closing bracket) may be legitimate code.
+        if n > 1 or len(tail[0].strip()) >= _MIN_SINGLE_LINE_OVERLAP:
+            tail = tail[n:]
+        break
+
+    return "\n".join(head) + "\n" + "\n".join(tail)
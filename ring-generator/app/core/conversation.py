@@ -0,0 +1,105 @@
+"""
+Message thread for the conversational fix mode.
+
+Instead of a fresh single-turn request per fix (master prompt + whole
+script + error every time), generation and all fix rounds share one
+thread:
+
+    system     master prompt (selection for the generation request)
+    user       generation request (+ reference image)
+    assistant  generated code
+    user       Blender error of attempt 1
+    assistant  fix
+    user       Blender error of attempt 2
+    ...
+
+The prefix never changes, so it is served from the provider's prompt
+cache and each fix pays full price only for the new error turn plus the
+model's output:
+
+  - Claude: explicit ``cache_control`` breakpoints on the system prompt
+    and on the last two user turns (the previous breakpoint is where the
+    last request's cache write ended, the new one extends it); 3 of the
+    4 allowed breakpoints
+  - Gemini: implicit caching of repeated prefixes; no markup needed
+"""
+
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.genai import types as genai_types
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+_CACHED_USER_TURNS = 2
+
+
+@dataclass
+class Turn:
+    role: str                       # "user" | "assistant"
+    text: str
+    image_data: bytes | None = None
+    image_mime: str | None = None
+
+
+@dataclass
+class FixConversation:
+    system: str
+    turns: list[Turn] = field(default_factory=list)
+
+    def add_user(self, text: str, image_data: bytes | None = None, image_mime: str | None = None) -> None:
+        self.turns.append(Turn("user", text, image_data, image_mime))
+
+    def add_assistant(self, text: str) -> None:
+        self.turns.append(Turn("assistant", text))
+
+    def pop(self) -> Turn:
+        return self.turns.pop()
+
+    # ------------------------------------------------------------------
+    # Provider payloads
+    # ------------------------------------------------------------------
+
+    def claude_payload(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """(system blocks, messages) with cache breakpoints."""
+        system = [{"type": "text", "text": self.system, "cache_control": _CACHE_CONTROL}]
+        user_indexes = [i for i, t in enumerate(self.turns) if t.role == "user"]
+        cached = set(user_indexes[-_CACHED_USER_TURNS:])
+
+        messages: list[dict[str, Any]] = []
+        for i, turn in enumerate(self.turns):
+            content: list[dict[str, Any]] = []
+            if turn.image_data and turn.image_mime:
+                content.append({
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": turn.image_mime,
+                        "data": base64.b64encode(turn.image_data).decode("utf-8"),
+                    },
+                })
+            block: dict[str, Any] = {"type": "text", "text": turn.text}
+            if i in cached:
+                block["cache_control"] = _CACHE_CONTROL
+            content.append(block)
+            messages.append({"role": turn.role, "content": content})
+        return system, messages
+
+    def gemini_contents(self) -> list[genai_types.Content]:
+        contents: list[genai_types.Content] = []
+        for turn in self.turns:
+            parts: list[genai_types.Part] = []
+            if turn.image_data and turn.image_mime:
+                parts.append(genai_types.Part.from_bytes(data=turn.image_data, mime_type=turn.image_mime))
+            parts.append(genai_types.Part(text=turn.text))
+            contents.append(genai_types.Content(role="user" if turn.role == "user" else "model", parts=parts))
+        return contents
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "turns": len(self.turns),
+            "roles": [t.role for t in self.turns],
+            "chars": len(self.system) + sum(len(t.text) for t in self.turns),
+        }
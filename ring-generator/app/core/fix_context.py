@@ -0,0 +1,203 @@
+"""
+Function-scoped fix context built from Blender traceback locations.
+
+The script Blender runs is not the script the LLM wrote: ``SCENE_PRELUDE``
+is prepended and ``_SAFE_HELPER`` is injected after the last import, so
+traceback line numbers point into the assembled ``ring_script.py``.  This
+module maps them back to the original code and extracts only what a fix
+round needs:
+
+  - the failing function (innermost traceback frame in the LLM code)
+  - the other functions on the call chain and the failing function's
+    direct callees
+  - the top-level variables those functions read (shared dimensions)
+  - the imports
+
+Everything else is summarised as a one-line-per-definition outline.  The
+model replies with replacement functions only, applied by
+``code_patcher``.  When no usable frame is found (syntax errors, timeouts,
+errors outside the LLM code) or the slice would not be meaningfully
+smaller than the script, ``build_fix_context`` returns ``None`` and the
+caller uses the full-script prompt.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from dataclasses import dataclass, field
+
+from .blender_runner import SCENE_PRELUDE
+from .source_map import assemble
+
+_FRAME_RE = re.compile(r'File "([^"]*ring_script\.py)", line (\d+)(?:, in (\S+))?')
+_MAX_SLICE_RATIO = 0.7
+
+
+@dataclass
+class TracebackFrame:
+    script_line: int
+    line: int | None          # 1-based line in the original code (None = injected code)
+    function: str = ""
+
+
+@dataclass
+class FixContext:
+    failing_function: str
+    failing_line: int
+    functions: list[str] = field(default_factory=list)
+    variables: list[str] = field(default_factory=list)
+    slice_code: str = ""
+    outline: str = ""
+    frames: list[TracebackFrame] = field(default_factory=list)
+    full_chars: int = 0
+
+    @property
+    def slice_chars(self) -> int:
+        return len(self.slice_code) + len(self.outline)
+
+
+# ---------------------------------------------------------------------------
+# Line mapping
+# ---------------------------------------------------------------------------
+
+def script_line_to_code_line(code: str, script_line: int) -> int | None:
+    """Map a 1-based ``ring_script.py`` line to the original code, or None."""
+    return assemble(code, SCENE_PRELUDE)[1].code_line(script_line)
+
+
+def parse_script_frames(traceback_text: str, code: str) -> list[TracebackFrame]:
+    """Frames pointing into ring_script.py, outermost first."""
+    source_map = assemble(code, SCENE_PRELUDE)[1]
+    return [
+        TracebackFrame(
+            script_line=int(m.group(2)),
+            line=source_map.code_line(int(m.group(2))),
+            function=m.group(3) or "",
+        )
+        for m in _FRAME_RE.finditer(traceback_text)
+    ]
+
+
+def remap_traceback(traceback_text: str, code: str) -> str:
+    """Rewrite ring_script.py line numbers to original-code line numbers."""
+    source_map = assemble(code, SCENE_PRELUDE)[1]
+
+    def _sub(m: re.Match[str]) -> str:
+        line = source_map.code_line(int(m.group(2)))
+        if line is None:
+            return m.group(0)
+        suffix = f", in {m.group(3)}" if m.group(3) else ""
+        return f'File "script.py", line {line}{suffix}'
+
+    return _FRAME_RE.sub(_sub, traceback_text)
+
+
+# ---------------------------------------------------------------------------
+# Slice extraction
+# ---------------------------------------------------------------------------
+
+def _called_names(node: ast.AST) -> set[str]:
+    return {
+        n.func.id for n in ast.walk(node)
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name)
+    }
+
+
+def _read_names(node: ast.AST) -> set[str]:
+    return {
+        n.id for n in ast.walk(node)
+        if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)
+    }
+
+
+def _top_level_name(node: ast.stmt) -> str | None:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return node.target.id
+    return None
+
+
+def _outline_entry(node: ast.stmt) -> str:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return f"def {node.name}({ast.unparse(node.args)}): ...  # lines {node.lineno}-{node.end_lineno}"
+    if isinstance(node, ast.ClassDef):
+        return f"class {node.name}: ...  # lines {node.lineno}-{node.end_lineno}"
+    name = _top_level_name(node)
+    return f"{name} = ...  # line {node.lineno}" if name else ""
+
+
+def build_fix_context(code: str, traceback_text: str) -> FixContext | None:
+    """Extract the function-scoped slice of ``code`` for the given traceback."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+
+    frames = [f for f in parse_script_frames(traceback_text, code) if f.line is not None]
+    if not frames:
+        return None
+
+    functions = {
+        n.name: n for n in tree.body
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+
+    def _enclosing(line: int) -> str | None:
+        for name, node in functions.items():
+            if node.lineno <= line <= (node.end_lineno or node.lineno):
+                return name
+        return None
+
+    chain = [name for name in (_enclosing(f.line) for f in frames) if name]
+    if not chain:
+        return None
+    failing = chain[-1]
+    failing_line = next(f.line for f in reversed(frames) if _enclosing(f.line) == failing)
+
+    selected = set(chain) - {"build"} if failing != "build" else {"build"}
+    selected |= _called_names(functions[failing]) & functions.keys()
+
+    read = set().union(*(_read_names(functions[name]) for name in selected))
+    variables: list[str] = []
+    slice_nodes: list[ast.stmt] = []
+    outline_nodes: list[ast.stmt] = []
+    for node in tree.body:
+        name = _top_level_name(node)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            slice_nodes.append(node)
+        elif name in selected:
+            slice_nodes.append(node)
+        elif name and name not in functions and name in read:
+            slice_nodes.append(node)
+            variables.append(name)
+        elif name:
+            outline_nodes.append(node)
+
+    lines = code.split("\n")
+    parts: list[str] = []
+    prev_end = -1
+    for node in slice_nodes:
+        if parts and node.lineno > prev_end + 1:
+            parts.append("")
+        parts.extend(lines[node.lineno - 1:node.end_lineno])
+        prev_end = node.end_lineno or node.lineno
+    slice_code = "\n".join(parts)
+    outline = "\n".join(filter(None, (_outline_entry(n) for n in outline_nodes)))
+
+    context = FixContext(
+        failing_function=failing,
+        failing_line=failing_line,
+        functions=[n.name for n in tree.body if getattr(n, "name", None) in selected],
+        variables=variables,
+        slice_code=slice_code,
+        outline=outline,
+        frames=frames,
+        full_chars=len(code),
+    )
+    if context.slice_chars > _MAX_SLICE_RATIO * len(code):
+        return None
+    return context
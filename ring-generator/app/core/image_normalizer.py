@@ -0,0 +1,188 @@
+"""
+Reference image normalisation before the image is sent to an LLM.
+
+Reference images are often full-resolution phone photos (12 MP, several
+MB, EXIF-rotated).  Both providers downscale server-side anyway, so the
+extra pixels only cost upload time and image tokens.  Each image is:
+
+  - EXIF-transposed, then re-encoded without metadata (EXIF/GPS stripped)
+  - downscaled to the provider's optimal size (Claude: long edge 1568 px
+    and ~1.15 MP; Gemini: long edge 1536 px, i.e. 2×2 768 px tiles)
+  - encoded as JPEG, or PNG when it has transparency
+
+Results are cached on disk by (sha256 of the original bytes, provider),
+so the same reference uploaded for several sessions is processed once.
+
+Pillow is optional: without it images pass through unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# provider → (max long edge px, max total pixels or None)
+_PROVIDER_LIMITS: dict[str, tuple[int, int | None]] = {
+    "anthropic": (1568, 1_150_000),
+    "gemini": (1536, None),
+}
+
+
+def provider_for(llm_name: str) -> str:
+    """Provider key for an ``llm_name`` (routing mirrors ``call_llm``)."""
+    return "gemini" if llm_name == "gemini" else "anthropic"
+
+
+@dataclass
+class NormalizedImage:
+    data: bytes
+    mime: str
+    sha256: str
+    provider: str
+    original_bytes: int
+    original_mime: str
+    width: int = 0
+    height: int = 0
+    original_width: int = 0
+    original_height: int = 0
+    normalized: bool = False
+    cached: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        meta = asdict(self)
+        meta.pop("data")
+        meta["bytes"] = len(self.data)
+        return meta
+
+
+class ImageNormalizer:
+    def __init__(self, cache_dir: Path | None = None, jpeg_quality: int = 85):
+        self.cache_dir = cache_dir
+        self.jpeg_quality = jpeg_quality
+
+    def normalize(self, data: bytes, mime: str | None, provider: str) -> NormalizedImage:
+        """Return provider-ready image bytes; never raises on bad input."""
+        mime = mime or "image/jpeg"
+        sha = hashlib.sha256(data).hexdigest()
+
+        cached = self._cache_get(sha, provider)
+        if cached is not None:
+            return cached
+
+        try:
+            result = self._process(data, mime, sha, provider)
+        except ImportError:
+            logger.warning("Pillow not installed — reference image sent unchanged")
+            return self._passthrough(data, mime, sha, provider)
+        except Exception as e:
+            logger.warning("Image normalisation failed (%s) — sent unchanged", e)
+            return self._passthrough(data, mime, sha, provider)
+
+        logger.info(
+            "[IMAGE] %dx%d %s (%d KB) → %dx%d %s (%d KB) for %s",
+            result.original_width, result.original_height, mime, len(data) // 1024,
+            result.width, result.height, result.mime, len(result.data) // 1024, provider,
+        )
+        self._cache_put(result)
+        return result
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+
+    def _process(self, data: bytes, mime: str, sha: str, provider: str) -> NormalizedImage:
+        from PIL import Image, ImageOps
+
+        max_edge, max_pixels = _PROVIDER_LIMITS.get(provider, _PROVIDER_LIMITS["anthropic"])
+
+        with Image.open(io.BytesIO(data)) as opened:
+            img = ImageOps.exif_transpose(opened)
+            orig_w, orig_h = img.size
+
+            scale = min(1.0, max_edge / max(orig_w, orig_h))
+            if max_pixels:
+                scale = min(scale, math.sqrt(max_pixels / (orig_w * orig_h)))
+            if scale < 1.0:
+                size = (max(1, round(orig_w * scale)), max(1, round(orig_h * scale)))
+                img = img.resize(size, Image.Resampling.LANCZOS)
+
+            has_alpha = img.mode in ("RGBA", "LA", "PA") or (
+                img.mode == "P" and "transparency" in img.info
+            )
+            out = io.BytesIO()
+            if has_alpha:
+                img.convert("RGBA").save(out, format="PNG", optimize=True)
+                out_mime = "image/png"
+            else:
+                img.convert("RGB").save(out, format="JPEG", quality=self.jpeg_quality, optimize=True)
+                out_mime = "image/jpeg"
+
+            return NormalizedImage(
+                data=out.getvalue(),
+                mime=out_mime,
+                sha256=sha,
+                provider=provider,
+                original_bytes=len(data),
+                original_mime=mime,
+                width=img.width,
+                height=img.height,
+                original_width=orig_w,
+                original_height=orig_h,
+                normalized=True,
+            )
+
+    @staticmethod
+    def _passthrough(data: bytes, mime: str, sha: str, provider: str) -> NormalizedImage:
+        return NormalizedImage(
+            data=data,
+            mime=mime,
+            sha256=sha,
+            provider=provider,
+            original_bytes=len(data),
+            original_mime=mime,
+        )
+
+    # ------------------------------------------------------------------
+    # Disk cache — <cache_dir>/<sha[:2]>/<sha>_<provider>.{bin,json}
+    # ------------------------------------------------------------------
+
+    def _cache_paths(self, sha: str, provider: str) -> tuple[Path, Path] | None:
+        if self.cache_dir is None:
+            return None
+        base = self.cache_dir / sha[:2] / f"{sha}_{provider}"
+        return base.with_suffix(".bin"), base.with_suffix(".json")
+
+    def _cache_get(self, sha: str, provider: str) -> NormalizedImage | None:
+        paths = self._cache_paths(sha, provider)
+        if paths is None or not paths[0].exists() or not paths[1].exists():
+            return None
+        try:
+            meta = json.loads(paths[1].read_text())
+            meta.pop("bytes", None)
+            meta["cached"] = True
+            return NormalizedImage(data=paths[0].read_bytes(), **meta)
+        except Exception as e:
+            logger.warning("Image cache entry %s unreadable: %s", paths[0].name, e)
+            return None
+
+    def _cache_put(self, image: NormalizedImage) -> None:
+        paths = self._cache_paths(image.sha256, image.provider)
+        if paths is None:
+            return
+        data_path, meta_path = paths
+        try:
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = data_path.with_suffix(".tmp")
+            tmp.write_bytes(image.data)
+            tmp.replace(data_path)
+            meta_path.write_text(json.dumps(image.to_dict()))
+        except OSError as e:
+            logger.warning("Could not cache normalised image: %s", e)
@@ -0,0 +1,237 @@
+"""
+Incremental rebuilds between fix attempts.
+
+A fix round usually changes one component function, yet every attempt
+rebuilds the whole ring.  In incremental mode each component function
+gets a content hash covering everything it can depend on statically:
+
+  - its own source (``ast.unparse`` — comments / formatting don't count)
+  - the top-level helper functions it calls, transitively
+  - every top-level statement that binds or mutates a name those
+    functions read (shared dimensions, tuple unpacking, ``+=``, loops,
+    ``CONFIG["x"] = ...``, ``PARTS.append(...)``)
+  - the imports
+
+Inside Blender the function is wrapped: the runtime key is that hash plus
+the call arguments.  On a miss the function runs and the objects it
+created are written to ``<session>/incremental/<function>_<key>.blend``
+the moment it returns; on a hit those objects are appended from the
+library instead and its return value (objects, a list of objects or a
+plain value) is restored.  Calls that can't be keyed or restored
+(non-plain arguments, other return types) always run.
+
+Functions that use ``global``, or read a name some other function rebinds
+with ``global``, share mutable state with the rest of the script and are
+never cached.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+
+INCREMENTAL_DIRNAME = "incremental"
+
+
+def _target_names(target: ast.AST) -> set[str]:
+    """Names an assignment target binds or mutates: tuple elements, ``CONFIG["x"]`` / ``obj.attr`` bases."""
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return {name for elt in target.elts for name in _target_names(elt)}
+    while isinstance(target, (ast.Subscript, ast.Attribute, ast.Starred)):
+        target = target.value
+    return {target.id} if isinstance(target, ast.Name) else set()
+
+
+def _bound_names(node: ast.stmt) -> set[str]:
+    """
+    Every module-level name ``node`` binds or mutates: definitions, assignment
+    targets (tuple unpacking, augmented, subscript / attribute bases), loop
+    and ``with`` targets, and receivers of top-level method calls
+    (``PARTS.append(...)``).  Nested function / class bodies are not walked.
+    """
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return {node.name}
+    names: set[str] = set()
+    stack: list[ast.AST] = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(current.name)
+            continue
+        if isinstance(current, (ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)):
+            continue
+        targets: list[ast.AST] = []
+        if isinstance(current, ast.Assign):
+            targets = list(current.targets)
+        elif isinstance(current, (ast.AugAssign, ast.AnnAssign, ast.For, ast.AsyncFor)):
+            targets = [current.target]
+        elif isinstance(current, (ast.With, ast.AsyncWith)):
+            targets = [item.optional_vars for item in current.items if item.optional_vars is not None]
+        elif isinstance(current, ast.NamedExpr):
+            targets = [current.target]
+        elif isinstance(current, ast.Expr) and isinstance(current.value, ast.Call) \
+                and isinstance(current.value.func, ast.Attribute):
+            targets = [current.value.func.value]
+        elif isinstance(current, ast.ExceptHandler) and current.name:
+            names.add(current.name)
+        for target in targets:
+            names |= _target_names(target)
+        stack.extend(ast.iter_child_nodes(current))
+    return names
+
+
+def _loaded_names(node: ast.AST) -> set[str]:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load)}
+
+
+def _global_names(node: ast.AST) -> set[str]:
+    return {
+        name for n in ast.walk(node) if isinstance(n, (ast.Global, ast.Nonlocal))
+        for name in n.names
+    }
+
+
+def function_hashes(code: str, functions: list[str]) -> dict[str, str]:
+    """Content hash per cacheable function in ``functions`` (empty on a syntax error)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {}
+
+    # name → every top-level statement that binds or mutates it, in order
+    definitions: dict[str, list[ast.stmt]] = {}
+    imports: list[str] = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(ast.unparse(node))
+            continue
+        for name in _bound_names(node):
+            definitions.setdefault(name, []).append(node)
+    import_digest = "\n".join(imports)
+    rebound = _global_names(tree)
+
+    hashes: dict[str, str] = {}
+    for function in functions:
+        if function not in definitions:
+            continue
+        closure: dict[str, list[ast.stmt]] = {}
+        pending = [function]
+        while pending:
+            name = pending.pop()
+            if name in closure or name not in definitions:
+                continue
+            closure[name] = definitions[name]
+            for node in definitions[name]:
+                pending.extend(_loaded_names(node) - closure.keys())
+        if any(_global_names(node) for nodes in closure.values() for node in nodes) or rebound & set(closure):
+            continue
+        digest = hashlib.sha256(import_digest.encode("utf-8"))
+        for name in sorted(closure):
+            source = "\n".join(ast.unparse(node) for node in closure[name])
+            digest.update(f"\n# {name}\n{source}".encode("utf-8"))
+        hashes[function] = digest.hexdigest()[:16]
+    return hashes
+
+
+def incremental_code(cache_dir: str, hashes: dict[str, str]) -> str:
+    """Injected code: wrap each hashed function with the library cache."""
+    return f"""
+# ========================= INCREMENTAL BUILD =========================
+import functools as _ft, hashlib as _hl, json as _json
+_INC_DIR = r"{cache_dir}"
+_INC_HASHES = {hashes!r}
+_INC_MANIFEST_PATH = os.path.join(_INC_DIR, "manifest.json")
+_INC_REPORT = {{"reused": [], "rebuilt": [], "uncached": []}}
+os.makedirs(_INC_DIR, exist_ok=True)
+try:
+    with open(_INC_MANIFEST_PATH) as _mf:
+        _INC_MANIFEST = _json.load(_mf)
+except (OSError, ValueError):
+    _INC_MANIFEST = {{}}
+
+def _inc_plain(_v):
+    if isinstance(_v, (list, tuple)):
+        return all(_inc_plain(_x) for _x in _v)
+    if isinstance(_v, dict):
+        return all(isinstance(_k, str) and _inc_plain(_x) for _k, _x in _v.items())
+    return isinstance(_v, (int, float, str, bool, type(None)))
+
+def _inc_encode(_ret, _new):
+    if _ret is None:
+        return {{"kind": "none"}}
+    if isinstance(_ret, bpy.types.Object) and _ret.name in _new:
+        return {{"kind": "object", "names": [_ret.name]}}
+    if (isinstance(_ret, (list, tuple)) and _ret
+            and all(isinstance(_o, bpy.types.Object) and _o.name in _new for _o in _ret)):
+        return {{"kind": "objects", "names": [_o.name for _o in _ret]}}
+    if _inc_plain(_ret):
+        return {{"kind": "value", "value": _ret}}
+    return None
+
+def _inc_load(_entry):
+    with bpy.data.libraries.load(_entry["blend"], link=False) as (_src, _dst):
+        _dst.objects = [_n for _n in _entry["objects"] if _n in _src.objects]
+    _loaded = dict(zip(_entry["objects"], _dst.objects))
+    for _o in _loaded.values():
+        if not _o.users_scene:
+            bpy.context.scene.collection.objects.link(_o)
+    _ret = _entry["returns"]
+    if _ret["kind"] == "object":
+        return _loaded[_ret["names"][0]]
+    if _ret["kind"] == "objects":
+        return [_loaded[_n] for _n in _ret["names"]]
+    return _ret.get("value")
+
+def _incremental(_name, _fn):
+    @_ft.wraps(_fn)
+    def _cached(*_a, **_kw):
+        if not (_inc_plain(_a) and _inc_plain(_kw)):
+            _INC_REPORT["uncached"].append(_name)
+            return _fn(*_a, **_kw)
+        _key = _hl.sha256(
+            (_INC_HASHES[_name] + _json.dumps([_a, _kw], sort_keys=True)).encode()
+        ).hexdigest()[:16]
+        _entry = _INC_MANIFEST.get(f"{{_name}}:{{_key}}")
+        if _entry and os.path.isfile(_entry["blend"]):
+            try:
+                _ret = _inc_load(_entry)
+                _INC_REPORT["reused"].append(_name)
+                print(f"[PIPELINE] {{_name}}() reused from library")
+                return _ret
+            except Exception as _le:
+                print(f"[PIPELINE] {{_name}}() library load failed, rebuilding: {{_le}}")
+        _before = set(bpy.data.objects.keys())
+        _ret = _fn(*_a, **_kw)
+        _new = [_o for _o in bpy.data.objects if _o.name not in _before]
+        _enc = _inc_encode(_ret, {{_o.name for _o in _new}})
+        if _enc is None:
+            _INC_REPORT["uncached"].append(_name)
+            return _ret
+        _blend = os.path.join(_INC_DIR, f"{{_name}}_{{_key}}.blend")
+        bpy.data.libraries.write(_blend, set(_new), fake_user=True)
+        _INC_MANIFEST[f"{{_name}}:{{_key}}"] = {{
+            "blend": _blend, "objects": [_o.name for _o in _new], "returns": _enc,
+        }}
+        _INC_REPORT["rebuilt"].append(_name)
+        return _ret
+    return _cached
+
+for _fn_name in _INC_HASHES:
+    if callable(globals().get(_fn_name)):
+        globals()[_fn_name] = _incremental(_fn_name, globals()[_fn_name])
+print(f"[PIPELINE] Incremental build: {{len(_INC_HASHES)}} cacheable functions")
+"""
+
+
+def incremental_report() -> str:
+    """Injected after build(): persist the manifest and print what was reused."""
+    return """
+try:
+    with open(_INC_MANIFEST_PATH, "w") as _mf:
+        _json.dump(_INC_MANIFEST, _mf)
+except OSError as _me:
+    print(f"[PIPELINE] Could not write incremental manifest: {_me}")
+print("===INCREMENTAL_START===")
+print(_json.dumps(_INC_REPORT))
+print("===INCREMENTAL_END===")
+"""
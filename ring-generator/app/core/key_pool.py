@@ -0,0 +1,259 @@
+"""
+API-key pool with least-loaded selection and throttle cool-down.
+
+Provider rate limits are enforced per key, so a single key caps fleet
+throughput.  A ``KeyPool`` spreads calls across every configured key:
+
+  - each key tracks its in-flight calls and, for Anthropic, the
+    rate-limit headroom reported on its last response
+  - ``acquire()`` picks the least-loaded key that is not cooling down
+  - ``mark_throttled()`` takes a key out of rotation until its
+    cool-down expires (``retry-after`` when the provider sends one)
+
+Pools are lazy singletons per (provider, key set), mirroring the client
+cache in ``llm_client``.  All methods are thread-safe because LLM calls
+run in the default thread-pool executor.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Sequence
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_COOLDOWN_SECONDS = 30.0
+_MAX_COOLDOWN_SECONDS = 300.0
+
+
+@dataclass
+class KeyState:
+    key: str
+    in_flight: int = 0
+    total_calls: int = 0
+    throttle_count: int = 0
+    cooldown_until: float = 0.0
+    requests_remaining: int | None = None
+    requests_limit: int | None = None
+    tokens_remaining: int | None = None
+    tokens_limit: int | None = None
+    last_used: float = 0.0
+
+    @property
+    def headroom(self) -> float:
+        """Fraction (0..1) of the rate-limit window still available; 1.0 if unknown."""
+        fractions: list[float] = []
+        if self.requests_remaining is not None and self.requests_limit:
+            fractions.append(self.requests_remaining / self.requests_limit)
+        if self.tokens_remaining is not None and self.tokens_limit:
+            fractions.append(self.tokens_remaining / self.tokens_limit)
+        return min(fractions) if fractions else 1.0
+
+    def cooling_down(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        return {
+            "key": mask_key(self.key),
+            "in_flight": self.in_flight,
+            "total_calls": self.total_calls,
+            "throttle_count": self.throttle_count,
+            "cooldown_remaining": round(max(0.0, self.cooldown_until - now), 1),
+            "headroom": round(self.headroom, 3),
+            "requests_remaining": self.requests_remaining,
+            "tokens_remaining": self.tokens_remaining,
+        }
+
+
+def mask_key(key: str) -> str:
+    return f"...{key[-4:]}" if len(key) > 8 else "***"
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> int | None:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class KeyPool:
+    def __init__(self, provider: str, keys: Sequence[str]):
+        unique = list(dict.fromkeys(k for k in keys if k))
+        if not unique:
+            raise RuntimeError(f"No API keys configured for {provider}")
+        self.provider = provider
+        self._states = {k: KeyState(key=k) for k in unique}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def acquire(self) -> str:
+        """
+        Reserve the least-loaded key.  Keys in cool-down are skipped; if every
+        key is cooling down the one that frees up soonest is used anyway so
+        callers never deadlock (the provider's own backoff still applies).
+        """
+        with self._lock:
+            now = time.monotonic()
+            states = list(self._states.values())
+            available = [s for s in states if not s.cooling_down(now)]
+            if available:
+                state = min(
+                    available,
+                    key=lambda s: (s.in_flight, -s.headroom, s.last_used),
+                )
+            else:
+                state = min(states, key=lambda s: s.cooldown_until)
+                logger.warning(
+                    "All %s keys throttled; using %s (cool-down %.1fs left)",
+                    self.provider, mask_key(state.key), state.cooldown_until - now,
+                )
+            state.in_flight += 1
+            state.total_calls += 1
+            state.last_used = now
+            return state.key
+
+    def release(self, key: str, headers: Mapping[str, str] | None = None) -> None:
+        with self._lock:
+            state = self._states.get(key)
+            if not state:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            if headers:
+                self._update_headroom(state, headers)
+
+    def mark_throttled(self, key: str, retry_after: float | None = None) -> None:
+        with self._lock:
+            state = self._states.get(key)
+            if not state:
+                return
+            state.throttle_count += 1
+            cooldown = retry_after if retry_after and retry_after > 0 else _DEFAULT_COOLDOWN_SECONDS
+            cooldown = min(cooldown, _MAX_COOLDOWN_SECONDS)
+            state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+            logger.warning(
+                "%s key %s throttled — out of rotation for %.0fs",
+                self.provider, mask_key(key), cooldown,
+            )
+
+    def has_alternative(self, key: str) -> bool:
+        """True if some other key is currently usable."""
+        with self._lock:
+            now = time.monotonic()
+            return any(
+                s.key != key and not s.cooling_down(now) for s in self._states.values()
+            )
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [s.to_dict(now) for s in self._states.values()]
+
+    @staticmethod
+    def _update_headroom(state: KeyState, headers: Mapping[str, str]) -> None:
+        """
+        Only Anthropic's ``anthropic-ratelimit-*`` headers are parsed.  Gemini
+        responses carry no equivalent through the SDK, so Gemini keys keep
+        full headroom and are balanced by in-flight count and cool-downs.
+        """
+        lowered = {k.lower(): v for k, v in headers.items()}
+        requests_remaining = _int_header(lowered, "anthropic-ratelimit-requests-remaining")
+        if requests_remaining is not None:
+            state.requests_remaining = requests_remaining
+            state.requests_limit = _int_header(lowered, "anthropic-ratelimit-requests-limit")
+        tokens_remaining = _int_header(lowered, "anthropic-ratelimit-tokens-remaining")
+        if tokens_remaining is not None:
+            state.tokens_remaining = tokens_remaining
+            state.tokens_limit = _int_header(lowered, "anthropic-ratelimit-tokens-limit")
+
+
+# ---------------------------------------------------------------------------
+# Pool registry — lazy singleton per (provider, key set)
+# ---------------------------------------------------------------------------
+
+_pools: dict[tuple[str, tuple[str, ...]], KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def normalise_keys(keys: str | Sequence[str]) -> tuple[str, ...]:
+    """Accept a single key, a comma-separated string, or a sequence of keys."""
+    if isinstance(keys, str):
+        keys = keys.split(",")
+    return tuple(dict.fromkeys(k.strip() for k in keys if k and k.strip()))
+
+
+def get_key_pool(provider: str, keys: str | Sequence[str]) -> KeyPool:
+    key_tuple = normalise_keys(keys)
+    with _pools_lock:
+        pool = _pools.get((provider, key_tuple))
+        if pool is None:
+            pool = KeyPool(provider, key_tuple)
+            _pools[(provider, key_tuple)] = pool
+        return pool
+
+
+def pools_snapshot() -> dict[str, list[dict[str, Any]]]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    snapshot: dict[str, list[dict[str, Any]]] = {}
+    for pool in pools:
+        snapshot.setdefault(pool.provider, []).extend(pool.snapshot())
+    return snapshot
+
+
+# SDK exception classes that mean "slow down" regardless of the status field
+_THROTTLE_TYPES = frozenset({"RateLimitError", "OverloadedError", "ResourceExhausted", "TooManyRequests"})
+# Anthropic error-body types; a mid-stream overload arrives as a 200 APIStatusError
+_THROTTLE_ERROR_BODIES = frozenset({"overloaded_error", "rate_limit_error"})
+
+
+def _status_code(exc: Exception) -> int | None:
+    for status in (
+        getattr(exc, "status_code", None),
+        getattr(exc, "code", None),
+        getattr(getattr(exc, "response", None), "status_code", None),
+    ):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def _error_body_type(exc: Exception) -> str | None:
+    body = getattr(exc, "body", None)
+    error = body.get("error") if isinstance(body, dict) else None
+    return error.get("type") if isinstance(error, dict) else None
+
+
+def is_throttle_error(exc: Exception) -> bool:
+    """
+    Rate-limit (429) or overload (529) responses from either provider,
+    judged by the HTTP status, the structured error body or the SDK
+    exception type — never by the message text, which can quote "429"
+    from unrelated content.
+    """
+    if _status_code(exc) in (429, 529):
+        return True
+    if _error_body_type(exc) in _THROTTLE_ERROR_BODIES:
+        return True
+    if getattr(exc, "status", None) == "RESOURCE_EXHAUSTED":   # google-genai APIError
+        return True
+    return any(cls.__name__ in _THROTTLE_TYPES for cls in type(exc).__mro__)
+
+
+def retry_after_seconds(exc: Exception) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
@@ -10,16 +10,20 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import functools
 import logging
 import time
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, replace
+from typing import Any, Sequence
 
-import anthropic
-from google import genai
 from google.genai import types as genai_types
 
 from .code_processor import extract_code
+from .conversation import FixConversation
+from .continuation import CONTINUE_PROMPT, MAX_CONTINUATIONS, is_truncated, stitch, trim_partial
+from .key_pool import KeyPool, get_key_pool, is_throttle_error, retry_after_seconds
+from .llm_connections import get_claude_client, get_gemini_client
+from .llm_metrics import CallTiming, StreamTimer, llm_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -32,157 +36,359 @@ class UsageInfo:
     input_cost_per_mtok: float = 0.0
     output_cost_per_mtok: float = 0.0
     cost_usd: float = 0.0
+    prompt_sections: tuple[str, ...] = ()
+    prompt_tokens_saved: int = 0
+    tier: str = "interactive"
+    timing: CallTiming | None = None
+    continuations: int = 0
+    # Prompt-cache tokens (not included in input_tokens) and their price multipliers
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cache_read_multiplier: float = 0.1
+    cache_write_multiplier: float = 1.25
 
     def to_dict(self) -> dict[str, Any]:
         return {
             "model": self.model,
+            "tier": self.tier,
             "input_tokens": self.input_tokens,
             "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
             "input_cost_per_mtok": self.input_cost_per_mtok,
             "output_cost_per_mtok": self.output_cost_per_mtok,
             "cost_usd": self.cost_usd,
+            "prompt_sections": list(self.prompt_sections),
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+            "timing": self.timing.to_dict() if self.timing else None,
+            "continuations": self.continuations,
         }
 
 
+    def price(self) -> "UsageInfo":
+        """Return a copy with ``cost_usd`` computed from tokens and rates."""
+        in_rate = self.input_cost_per_mtok / 1_000_000
+        cost = (
+            self.input_tokens * in_rate
+            + self.cache_read_tokens * in_rate * self.cache_read_multiplier
+            + self.cache_write_tokens * in_rate * self.cache_write_multiplier
+            + self.output_tokens * self.output_cost_per_mtok / 1_000_000
+        )
+        return replace(self, cost_usd=round(cost, 4))
+
+
+def _add_continuation_usage(usage: UsageInfo, extra: UsageInfo) -> UsageInfo:
+    return replace(
+        usage,
+        input_tokens=usage.input_tokens + extra.input_tokens,
+        output_tokens=usage.output_tokens + extra.output_tokens,
+        cache_read_tokens=usage.cache_read_tokens + extra.cache_read_tokens,
+        cache_write_tokens=usage.cache_write_tokens + extra.cache_write_tokens,
+        cost_usd=round(usage.cost_usd + extra.cost_usd, 4),
+        continuations=usage.continuations + 1,
+    )
+
+
 @dataclass
 class LLMResponse:
     code: str
     usage: UsageInfo
     elapsed_seconds: float = 0.0
+    raw: str = ""
 
 
 # ---------------------------------------------------------------------------
-# Client pool — lazy singleton per API key to avoid re-creating on every call
+# Claude (sync, runs in thread-pool)
 # ---------------------------------------------------------------------------
 
-_claude_clients: dict[str, anthropic.Anthropic] = {}
-_gemini_clients: dict[str, genai.Client] = {}
-
+def claude_model_for(llm_name: str) -> str:
+    return "claude-sonnet-4-6" if llm_name == "claude-sonnet" else "claude-opus-4-6"
 
-def _get_claude_client(api_key: str) -> anthropic.Anthropic:
-    if api_key not in _claude_clients:
-        _claude_clients[api_key] = anthropic.Anthropic(api_key=api_key)
-    return _claude_clients[api_key]
 
+def claude_pricing(model: str) -> tuple[float, float]:
+    """(input, output) USD per million tokens at interactive rates."""
+    return (3.0, 15.0) if "sonnet" in model else (15.0, 75.0)
 
-def _get_gemini_client(api_key: str) -> genai.Client:
-    if api_key not in _gemini_clients:
-        _gemini_clients[api_key] = genai.Client(api_key=api_key)
-    return _gemini_clients[api_key]
 
+def claude_user_content(
+    system: str,
+    prompt: str,
+    image_data: bytes | None = None,
+    image_mime: str | None = None,
+) -> Any:
+    raw_prompt = f"{system}\n\n---\n\nUser Request: {prompt}"
+    if image_data and image_mime:
+        b64 = base64.b64encode(image_data).decode("utf-8")
+        return [
+            {"type": "image", "source": {"type": "base64", "media_type": image_mime, "data": b64}},
+            {"type": "text", "text": raw_prompt},
+        ]
+    return raw_prompt
+
+
+def _claude_usage(model: str, usage: Any) -> UsageInfo:
+    in_cost, out_cost = claude_pricing(model)
+    return UsageInfo(
+        model=model,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        input_cost_per_mtok=in_cost,
+        output_cost_per_mtok=out_cost,
+        cache_read_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+        cache_write_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    ).price()
+
+
+def _continue_claude(
+    key_pool: KeyPool,
+    model: str,
+    max_tokens: int,
+    request: dict[str, Any],
+    raw: str,
+    stop_reason: Any,
+    usage: UsageInfo,
+) -> tuple[str, UsageInfo]:
+    """Continue a truncated reply (see ``continuation``); never raises."""
+    while usage.continuations < MAX_CONTINUATIONS and is_truncated(raw, stop_reason):
+        partial = trim_partial(raw)
+        logger.warning(
+            "Claude reply truncated (%s, %d chars) — continuation %d/%d",
+            stop_reason or "unclosed fence", len(raw), usage.continuations + 1, MAX_CONTINUATIONS,
+        )
+        api_key = key_pool.acquire()
+        headers: Any = None
+        try:
+            with get_claude_client(api_key).messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                **{
+                    **request,
+                    "messages": request["messages"] + [
+                        {"role": "assistant", "content": partial.rstrip()},
+                        {"role": "user", "content": CONTINUE_PROMPT},
+                    ],
+                },
+            ) as stream:
+                headers = getattr(getattr(stream, "response", None), "headers", None)
+                text = "".join(stream.text_stream)
+                final = stream.get_final_message()
+        except Exception as e:
+            logger.warning("Claude continuation failed (%s) — keeping the truncated reply", e)
+            break
+        finally:
+            key_pool.release(api_key, headers)
+        raw = stitch(partial, text)
+        stop_reason = final.stop_reason
+        usage = _add_continuation_usage(usage, _claude_usage(model, final.usage))
+    return raw, usage
 
-# ---------------------------------------------------------------------------
-# Claude (sync, runs in thread-pool)
-# ---------------------------------------------------------------------------
 
 def _call_claude_sync(
-    api_key: str,
+    key_pool: KeyPool,
     system: str,
     prompt: str,
     image_data: bytes | None = None,
     image_mime: str | None = None,
     model: str = "claude-opus-4-6",
     max_tokens: int = 20000,
+    conversation: FixConversation | None = None,
 ) -> LLMResponse:
-    client = _get_claude_client(api_key)
-    logger.info("Calling Claude (%s, image=%s)...", model, "yes" if image_data else "no")
+    """With a ``conversation`` the thread (and its cache breakpoints) replaces system/prompt/image."""
+    logger.info(
+        "Calling Claude (%s, image=%s, keys=%d%s)...",
+        model, "yes" if image_data else "no", len(key_pool),
+        f", thread of {len(conversation.turns)} turns" if conversation else "",
+    )
     t0 = time.time()
+    timer = StreamTimer()
 
-    raw_prompt = f"{system}\n\n---\n\nUser Request: {prompt}"
-
-    if image_data and image_mime:
-        b64 = base64.b64encode(image_data).decode("utf-8")
-        user_content: Any = [
-            {"type": "image", "source": {"type": "base64", "media_type": image_mime, "data": b64}},
-            {"type": "text", "text": raw_prompt},
-        ]
+    if conversation is not None:
+        system_blocks, messages = conversation.claude_payload()
+        request: dict[str, Any] = {"system": system_blocks, "messages": messages}
     else:
-        user_content = raw_prompt
+        user_content = claude_user_content(system, prompt, image_data, image_mime)
+        request = {"messages": [{"role": "user", "content": user_content}]}
 
     max_retries = 3
     for attempt in range(1, max_retries + 1):
+        api_key = key_pool.acquire()
+        headers: Any = None
+        timer.begin_attempt()
         try:
+            client = get_claude_client(api_key)
             raw = ""
             usage_info = UsageInfo(model=model)
             with client.messages.stream(
                 model=model,
                 max_tokens=max_tokens,
-                messages=[{"role": "user", "content": user_content}],
+                **request,
             ) as stream:
+                headers = getattr(getattr(stream, "response", None), "headers", None)
                 for text in stream.text_stream:
+                    timer.chunk()
                     raw += text
                 final = stream.get_final_message()
+                stop_reason = getattr(final, "stop_reason", None)
                 if final and hasattr(final, 'usage') and final.usage:
-                    if "sonnet" in model:
-                        in_cost, out_cost = 3.0, 15.0
-                    else:
-                        in_cost, out_cost = 15.0, 75.0
-                    cost = round(
-                        final.usage.input_tokens / 1_000_000 * in_cost
-                        + final.usage.output_tokens / 1_000_000 * out_cost,
-                        4,
-                    )
-                    usage_info = UsageInfo(
-                        model=model,
-                        input_tokens=final.usage.input_tokens,
-                        output_tokens=final.usage.output_tokens,
-                        input_cost_per_mtok=in_cost,
-                        output_cost_per_mtok=out_cost,
-                        cost_usd=cost,
-                    )
+                    usage_info = _claude_usage(model, final.usage)
                     logger.info(
-                        "Claude (%s) tokens: in=%d, out=%d, cost=$%.4f",
-                        model, usage_info.input_tokens, usage_info.output_tokens, cost,
+                        "Claude (%s) tokens: in=%d, out=%d, cache read=%d write=%d, cost=$%.4f",
+                        model, usage_info.input_tokens, usage_info.output_tokens,
+                        usage_info.cache_read_tokens, usage_info.cache_write_tokens, usage_info.cost_usd,
                     )
 
+            usage_info = replace(usage_info, timing=timer.finish(usage_info.output_tokens))
+            llm_metrics.record(model, usage_info.timing)
+            raw, usage_info = _continue_claude(
+                key_pool, model, max_tokens, request, raw, stop_reason, usage_info,
+            )
             elapsed = time.time() - t0
-            logger.info("Claude responded: %.1fs, %d chars", elapsed, len(raw))
-            return LLMResponse(code=extract_code(raw), usage=usage_info, elapsed_seconds=elapsed)
+            logger.info(
+                "Claude responded: %.1fs, %d chars (ttft=%ss, %s tok/s, max gap %.1fs)",
+                elapsed, len(raw), usage_info.timing.ttft_seconds,
+                usage_info.timing.output_tokens_per_second, usage_info.timing.max_gap_seconds,
+            )
+            return LLMResponse(code=extract_code(raw), usage=usage_info, elapsed_seconds=elapsed, raw=raw)
 
         except Exception as e:
-            err_str = str(e).lower()
-            err_repr = repr(e).lower()
-            is_overloaded = (
-                'overloaded' in err_str
-                or 'overloaded' in err_repr
-                or '529' in err_str
-                or getattr(e, 'status_code', None) == 529
-                or (isinstance(e, anthropic.APIStatusError) and getattr(e, 'status_code', 0) == 529)
-            )
-            if is_overloaded and attempt < max_retries:
+            if is_throttle_error(e) and attempt < max_retries:
+                key_pool.mark_throttled(api_key, retry_after_seconds(e))
+                if key_pool.has_alternative(api_key):
+                    logger.warning(
+                        "Claude throttled (attempt %d/%d), switching key...", attempt, max_retries,
+                    )
+                    continue
                 wait = attempt * 15
                 logger.warning("Claude overloaded (attempt %d/%d), retrying in %ds...", attempt, max_retries, wait)
-                time.sleep(wait)
-                continue
-            raise
+            else:
+                llm_metrics.record_error(model)
+                raise
+        finally:
+            key_pool.release(api_key, headers)
+        # back off only after the throttled key is released, so it is not counted in flight
+        time.sleep(wait)
+
+
+def _prime_claude_sync(key_pool: KeyPool, model: str, system: str) -> UsageInfo:
+    """One-token request that writes ``system`` to the prompt cache (same block as a thread's)."""
+    system_blocks, _ = FixConversation(system=system).claude_payload()
+    api_key = key_pool.acquire()
+    try:
+        message = get_claude_client(api_key).messages.create(
+            model=model,
+            max_tokens=1,
+            system=system_blocks,
+            messages=[{"role": "user", "content": "Reply with OK."}],
+        )
+    finally:
+        key_pool.release(api_key, None)
+    usage = _claude_usage(model, message.usage)
+    logger.info(
+        "Claude (%s) cache primed: write=%d read=%d, cost=$%.4f",
+        model, usage.cache_write_tokens, usage.cache_read_tokens, usage.cost_usd,
+    )
+    return usage
 
 
 # ---------------------------------------------------------------------------
 # Gemini (sync, runs in thread-pool)
 # ---------------------------------------------------------------------------
 
+def _gemini_usage(model: str, um: Any) -> UsageInfo:
+    # prompt_token_count includes implicitly cached tokens, billed at 25%.
+    cached = getattr(um, "cached_content_token_count", 0) or 0
+    return UsageInfo(
+        model=model,
+        input_tokens=(getattr(um, "prompt_token_count", 0) or 0) - cached,
+        output_tokens=getattr(um, "candidates_token_count", 0) or 0,
+        input_cost_per_mtok=1.25,
+        output_cost_per_mtok=10.0,
+        cache_read_tokens=cached,
+        cache_read_multiplier=0.25,
+    ).price()
+
+
+def _stream_gemini(
+    client: Any,
+    gemini_model: str,
+    contents: Any,
+    config: genai_types.GenerateContentConfig,
+    timer: StreamTimer | None = None,
+) -> tuple[str, Any, Any]:
+    """Stream one Gemini request; returns (text, usage_metadata, finish_reason)."""
+    raw = ""
+    um = None
+    finish_reason = None
+    for chunk in client.models.generate_content_stream(
+        model=gemini_model,
+        contents=contents,
+        config=config,
+    ):
+        if chunk.text:
+            if timer:
+                timer.chunk()
+            raw += chunk.text
+        if chunk.usage_metadata:
+            um = chunk.usage_metadata
+        if chunk.candidates and chunk.candidates[0].finish_reason:
+            finish_reason = chunk.candidates[0].finish_reason
+    return raw, um, finish_reason
+
+
+def _continue_gemini(
+    key_pool: KeyPool,
+    gemini_model: str,
+    config: genai_types.GenerateContentConfig,
+    history: list[genai_types.Content],
+    raw: str,
+    finish_reason: Any,
+    usage: UsageInfo,
+) -> tuple[str, UsageInfo]:
+    """Continue a truncated reply (see ``continuation``); never raises."""
+    while usage.continuations < MAX_CONTINUATIONS and is_truncated(raw, finish_reason):
+        partial = trim_partial(raw)
+        logger.warning(
+            "Gemini reply truncated (%s, %d chars) — continuation %d/%d",
+            finish_reason or "unclosed fence", len(raw), usage.continuations + 1, MAX_CONTINUATIONS,
+        )
+        api_key = key_pool.acquire()
+        try:
+            text, um, finish_reason = _stream_gemini(
+                get_gemini_client(api_key),
+                gemini_model,
+                history + [
+                    genai_types.Content(role="model", parts=[genai_types.Part(text=partial)]),
+                    genai_types.Content(role="user", parts=[genai_types.Part(text=CONTINUE_PROMPT)]),
+                ],
+                config,
+            )
+        except Exception as e:
+            logger.warning("Gemini continuation failed (%s) — keeping the truncated reply", e)
+            break
+        finally:
+            key_pool.release(api_key)
+        raw = stitch(partial, text)
+        usage = _add_continuation_usage(usage, _gemini_usage(gemini_model, um))
+    return raw, usage
+
+
 def _call_gemini_sync(
-    api_key: str,
+    key_pool: KeyPool,
     gemini_model: str,
     system: str,
     prompt: str,
     image_data: bytes | None = None,
     image_mime: str | None = None,
+    conversation: FixConversation | None = None,
 ) -> LLMResponse:
-    client = _get_gemini_client(api_key)
-    logger.info("Calling Gemini (%s, image=%s)...", gemini_model, "yes" if image_data else "no")
+    """With a ``conversation`` the thread replaces system/prompt/image (implicit caching)."""
+    logger.info(
+        "Calling Gemini (%s, image=%s, keys=%d%s)...",
+        gemini_model, "yes" if image_data else "no", len(key_pool),
+        f", thread of {len(conversation.turns)} turns" if conversation else "",
+    )
     t0 = time.time()
 
-    raw_prompt = f"{system}\n\n---\n\nUser Request: {prompt}"
-
-    if image_data and image_mime:
-        contents: Any = [
-            genai_types.Part.from_bytes(data=image_data, mime_type=image_mime),
-            raw_prompt,
-        ]
-    else:
-        contents = raw_prompt
-
     config = genai_types.GenerateContentConfig(
         maxOutputTokens=65536,
         temperature=1.0,
@@ -190,32 +396,67 @@ def _call_gemini_sync(
         thinkingConfig=genai_types.ThinkingConfig(thinkingBudget=10000),
     )
 
-    response = client.models.generate_content(
-        model=gemini_model,
-        contents=contents,
-        config=config,
-    )
-    raw = response.text
+    if conversation is not None:
+        config.system_instruction = conversation.system
+        history = conversation.gemini_contents()
+        contents: Any = history
+    else:
+        raw_prompt = f"{system}\n\n---\n\nUser Request: {prompt}"
+        if image_data and image_mime:
+            contents = [
+                genai_types.Part.from_bytes(data=image_data, mime_type=image_mime),
+                raw_prompt,
+            ]
+            user_parts = [contents[0], genai_types.Part(text=raw_prompt)]
+        else:
+            contents = raw_prompt
+            user_parts = [genai_types.Part(text=raw_prompt)]
+        history = [genai_types.Content(role="user", parts=user_parts)]
+
+    timer = StreamTimer()
+
+    # Gemini has no built-in retry here; only rotate to another key on throttling.
+    # Streamed (rather than generate_content) so time-to-first-token is measurable.
+    for attempt in range(1, len(key_pool) + 1):
+        api_key = key_pool.acquire()
+        timer.begin_attempt()
+        try:
+            raw, um, finish_reason = _stream_gemini(
+                get_gemini_client(api_key), gemini_model, contents, config, timer,
+            )
+            break
+        except Exception as e:
+            if is_throttle_error(e):
+                key_pool.mark_throttled(api_key, retry_after_seconds(e))
+                if attempt < len(key_pool) and key_pool.has_alternative(api_key):
+                    logger.warning("Gemini throttled (attempt %d), switching key...", attempt)
+                    continue
+            llm_metrics.record_error(gemini_model)
+            raise
+        finally:
+            key_pool.release(api_key)
 
     usage_info = UsageInfo(model=gemini_model)
-    if hasattr(response, 'usage_metadata') and response.usage_metadata:
-        um = response.usage_metadata
-        input_tok = getattr(um, 'prompt_token_count', 0) or 0
-        output_tok = getattr(um, 'candidates_token_count', 0) or 0
-        cost = round(input_tok / 1_000_000 * 1.25 + output_tok / 1_000_000 * 10.0, 4)
-        usage_info = UsageInfo(
-            model=gemini_model,
-            input_tokens=input_tok,
-            output_tokens=output_tok,
-            input_cost_per_mtok=1.25,
-            output_cost_per_mtok=10.0,
-            cost_usd=cost,
+    if um:
+        usage_info = _gemini_usage(gemini_model, um)
+        logger.info(
+            "Gemini tokens: in=%d, out=%d, cached=%d, cost=$%.4f",
+            usage_info.input_tokens, usage_info.output_tokens,
+            usage_info.cache_read_tokens, usage_info.cost_usd,
         )
-        logger.info("Gemini tokens: in=%d, out=%d, cost=$%.4f", input_tok, output_tok, cost)
 
+    usage_info = replace(usage_info, timing=timer.finish(usage_info.output_tokens))
+    llm_metrics.record(gemini_model, usage_info.timing)
+    raw, usage_info = _continue_gemini(
+        key_pool, gemini_model, config, history, raw, finish_reason, usage_info,
+    )
     elapsed = time.time() - t0
-    logger.info("Gemini responded: %.1fs, %d chars", elapsed, len(raw))
-    return LLMResponse(code=extract_code(raw), usage=usage_info, elapsed_seconds=elapsed)
+    logger.info(
+        "Gemini responded: %.1fs, %d chars (ttft=%ss, %s tok/s, max gap %.1fs)",
+        elapsed, len(raw), usage_info.timing.ttft_seconds,
+        usage_info.timing.output_tokens_per_second, usage_info.timing.max_gap_seconds,
+    )
+    return LLMResponse(code=extract_code(raw), usage=usage_info, elapsed_seconds=elapsed, raw=raw)
 
 
 # ---------------------------------------------------------------------------
@@ -226,8 +467,8 @@ async def call_llm(
     llm_name: str,
     system_prompt: str,
     user_prompt: str,
-    anthropic_api_key: str = "",
-    gemini_api_key: str = "",
+    anthropic_api_key: str | Sequence[str] = "",
+    gemini_api_key: str | Sequence[str] = "",
     gemini_model: str = "gemini-3-pro-preview",
     image_data: bytes | None = None,
     image_mime: str | None = None,
@@ -235,6 +476,9 @@ async def call_llm(
     """
     Async wrapper that offloads the blocking LLM call to a thread-pool.
     Returns (code, usage_info) exactly like the original call_llm().
+
+    API keys may be a single key or a pool (list / comma-separated string);
+    each call is routed to the least-loaded key of the provider's pool.
     """
     loop = asyncio.get_running_loop()
 
@@ -244,7 +488,7 @@ async def call_llm(
         return await loop.run_in_executor(
             None,
             _call_gemini_sync,
-            gemini_api_key,
+            get_key_pool("gemini", gemini_api_key),
             gemini_model,
             system_prompt,
             user_prompt,
@@ -254,17 +498,77 @@ async def call_llm(
     else:
         if not anthropic_api_key:
             raise RuntimeError("ANTHROPIC_API_KEY not set")
-        if llm_name == "claude-sonnet":
-            model = "claude-sonnet-4-6"
-        else:
-            model = "claude-opus-4-6"
+        model = claude_model_for(llm_name)
         return await loop.run_in_executor(
             None,
             _call_claude_sync,
-            anthropic_api_key,
+            get_key_pool("anthropic", anthropic_api_key),
             system_prompt,
             user_prompt,
             image_data,
             image_mime,
             model,
         )
+
+
+async def prime_prompt_cache(
+    llm_name: str,
+    system_prompt: str,
+    anthropic_api_key: str | Sequence[str] = "",
+) -> UsageInfo | None:
+    """
+    Write the system prompt to Claude's prompt cache before concurrent
+    threads that share it start (concurrent first requests all miss).
+    Gemini caches repeated prefixes implicitly — returns None.
+    """
+    if llm_name == "gemini":
+        return None
+    if not anthropic_api_key:
+        raise RuntimeError("ANTHROPIC_API_KEY not set")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        _prime_claude_sync,
+        get_key_pool("anthropic", anthropic_api_key),
+        claude_model_for(llm_name),
+        system_prompt,
+    )
+
+
+async def call_llm_conversation(
+    llm_name: str,
+    conversation: FixConversation,
+    anthropic_api_key: str | Sequence[str] = "",
+    gemini_api_key: str | Sequence[str] = "",
+    gemini_model: str = "gemini-3-pro-preview",
+) -> LLMResponse:
+    """``call_llm`` for a multi-turn thread; the reply answers the last user turn."""
+    loop = asyncio.get_running_loop()
+
+    if llm_name == "gemini":
+        if not gemini_api_key:
+            raise RuntimeError("GEMINI_API_KEY not set")
+        return await loop.run_in_executor(
+            None,
+            functools.partial(
+                _call_gemini_sync,
+                get_key_pool("gemini", gemini_api_key),
+                gemini_model,
+                conversation.system,
+                "",
+                conversation=conversation,
+            ),
+        )
+    if not anthropic_api_key:
+        raise RuntimeError("ANTHROPIC_API_KEY not set")
+    return await loop.run_in_executor(
+        None,
+        functools.partial(
+            _call_claude_sync,
+            get_key_pool("anthropic", anthropic_api_key),
+            conversation.system,
+            "",
+            model=claude_model_for(llm_name),
+            conversation=conversation,
+        ),
+    )
@@ -0,0 +1,202 @@
+"""
+LLM client construction, connection pooling and keep-alive warmup.
+
+Clients are shared singletons per API key (one per key so each key pool
+entry keeps its own connections).  Every client gets a tuned httpx pool:
+
+  - pool limits sized to ``max_concurrent_jobs``
+  - a long keep-alive expiry (httpx defaults to 5 s, which drops the
+    connection between a generation call and the following fix call)
+  - HTTP/2 when the optional ``h2`` package is installed
+
+``ConnectionWarmer`` runs in the FastAPI lifespan: it creates the clients
+for every configured key up front and pings each provider with a free,
+lightweight request (model list / model lookup) at startup and then
+periodically, so DNS, TCP and TLS setup never land inside a user request.
+Its snapshot feeds the warm/cold state in ``/health``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+import anthropic
+import httpx
+from google import genai
+from google.genai import types as genai_types
+
+from .key_pool import mask_key, normalise_keys
+
+logger = logging.getLogger(__name__)
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_KEEPALIVE_EXPIRY_SECONDS = 300.0
+_PING_TIMEOUT_SECONDS = 15.0
+
+_pool_size = 4
+_claude_clients: dict[str, anthropic.Anthropic] = {}
+_gemini_clients: dict[str, genai.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def configure_connection_pool(max_concurrent_jobs: int) -> None:
+    """Size connection pools for clients created after this call."""
+    global _pool_size
+    _pool_size = max(4, max_concurrent_jobs)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=_pool_size,
+        max_keepalive_connections=_pool_size,
+        keepalive_expiry=_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def get_claude_client(api_key: str) -> anthropic.Anthropic:
+    with _clients_lock:
+        client = _claude_clients.get(api_key)
+        if client is None:
+            client = anthropic.Anthropic(
+                api_key=api_key,
+                http_client=anthropic.DefaultHttpxClient(limits=_limits(), http2=_HTTP2_AVAILABLE),
+            )
+            _claude_clients[api_key] = client
+        return client
+
+
+def get_gemini_client(api_key: str) -> genai.Client:
+    with _clients_lock:
+        client = _gemini_clients.get(api_key)
+        if client is None:
+            client = genai.Client(
+                api_key=api_key,
+                http_options=genai_types.HttpOptions(
+                    client_args={"limits": _limits(), "http2": _HTTP2_AVAILABLE},
+                ),
+            )
+            _gemini_clients[api_key] = client
+        return client
+
+
+# ---------------------------------------------------------------------------
+# Warmup + keep-alive pings
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _PingState:
+    provider: str
+    key: str
+    last_ok: float = 0.0
+    last_attempt: float = 0.0
+    latency_ms: float | None = None
+    error: str = ""
+    pings: int = 0
+    pending: bool = False
+
+
+class ConnectionWarmer:
+    def __init__(
+        self,
+        anthropic_keys: str | Sequence[str],
+        gemini_keys: str | Sequence[str],
+        gemini_model: str,
+        interval_seconds: int = 45,
+    ):
+        self.gemini_model = gemini_model
+        self.interval_seconds = interval_seconds
+        self._states = [
+            _PingState(provider="anthropic", key=k) for k in normalise_keys(anthropic_keys)
+        ] + [
+            _PingState(provider="gemini", key=k) for k in normalise_keys(gemini_keys)
+        ]
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if not self._states:
+            return
+        self._task = asyncio.create_task(self._loop(), name="llm-keepalive")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.gather(
+                *(loop.run_in_executor(None, self._ping, state) for state in self._states),
+                return_exceptions=True,
+            )
+            if self.interval_seconds <= 0:
+                return
+            await asyncio.sleep(self.interval_seconds)
+
+    def _ping(self, state: _PingState) -> None:
+        state.last_attempt = time.time()
+        state.pending = True
+        t0 = time.perf_counter()
+        try:
+            if state.provider == "anthropic":
+                client = get_claude_client(state.key)
+                client.with_options(timeout=_PING_TIMEOUT_SECONDS, max_retries=0).models.list(limit=1)
+            else:
+                client = get_gemini_client(state.key)
+                client.models.get(
+                    model=self.gemini_model,
+                    config={"http_options": {"timeout": int(_PING_TIMEOUT_SECONDS * 1000)}},
+                )
+        except Exception as e:
+            if not state.error:
+                logger.warning("%s keep-alive ping failed (%s): %s", state.provider, mask_key(state.key), e)
+            state.error = str(e)[:200]
+            # An HTTP error status still means the connection is up and warm.
+            if getattr(e, "status_code", None) is None and getattr(e, "code", None) is None:
+                return
+        else:
+            state.error = ""
+        finally:
+            state.pending = False
+        state.latency_ms = round((time.perf_counter() - t0) * 1000, 1)
+        state.last_ok = time.time()
+        state.pings += 1
+        if state.pings == 1:
+            logger.info("%s connection warm (%s, %.0f ms)", state.provider, mask_key(state.key), state.latency_ms)
+
+    def _is_warm(self, state: _PingState, now: float) -> bool:
+        if not state.last_ok:
+            return False
+        window = max(self.interval_seconds * 2, 60) if self.interval_seconds > 0 else _KEEPALIVE_EXPIRY_SECONDS
+        return now - state.last_ok < min(window, _KEEPALIVE_EXPIRY_SECONDS)
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.time()
+        providers: dict[str, Any] = {}
+        for state in self._states:
+            entry = providers.setdefault(state.provider, {"state": "cold", "keys": []})
+            warm = self._is_warm(state, now)
+            entry["keys"].append({
+                "key": mask_key(state.key),
+                "warm": warm,
+                "last_ping_age_s": round(now - state.last_ok, 1) if state.last_ok else None,
+                "latency_ms": state.latency_ms,
+                "error": state.error or None,
+            })
+            if warm:
+                entry["state"] = "warm"
+            elif entry["state"] == "cold" and (state.pending or not state.last_attempt):
+                entry["state"] = "warming"
+        return {
+            "http2": _HTTP2_AVAILABLE,
+            "pool_size": _pool_size,
+            "keepalive_interval_s": self.interval_seconds,
+            "providers": providers,
+        }
@@ -6,28 +6,58 @@ Ring generation pipeline — orchestrates the full flow:
   3. Run Blender with auto-retry (LLM-assisted error fixing)
   4. Return structured result with GLB, code, cost summary
 
+``generate_variants`` runs N of these for one request concurrently,
+sharing the prepared call (decoded image) and the cached master prompt.
+``edit_ring`` applies a natural-language change to an existing session
+as a patch and appends a new version.  ``reuse_session`` / ``seed_edit``
+serve a near-duplicate request from an earlier session (reuse cache).
+
 This is the core logic that must remain 1:1 with the original
 vibe-designing-3d /api/generate endpoint.
 """
 
 from __future__ import annotations
 
+import asyncio
 import base64
-import json
 import logging
+import mimetypes
 import os
+import shutil
+import tempfile
 import uuid
 import time
+from dataclasses import dataclass, replace
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Callable
 
-from ..schemas import CostSummary, GenerateRequest, GenerateResult, RetryEntry
-from .blender_runner import BlenderResult, run_blender
+from ..schemas import CostSummary, EditRequest, GenerateRequest, GenerateResult, RetryEntry
+from .auto_fixer import auto_fix, failure_advanced
+from .blender_runner import BlenderResult, format_function_errors, run_blender
+from .code_patcher import apply_patch
 from .code_processor import extract_modules
-from .llm_client import LLMResponse, UsageInfo, call_llm
-from .prompt_builder import build_fix_prompt, build_generation_prompt
+from .conversation import FixConversation
+from .llm_client import LLMResponse, UsageInfo, call_llm, call_llm_conversation, prime_prompt_cache
+from .fix_context import build_fix_context, remap_traceback
+from .image_normalizer import ImageNormalizer, provider_for
+from .prompt_builder import (
+    THREAD_FULL_CODE_PROMPT,
+    build_edit_prompt,
+    build_fix_prompt,
+    build_generation_prompt,
+    build_reuse_instruction,
+    build_scoped_fix_prompt,
+    build_thread_fix_prompt,
+    build_variant_note,
+)
+from .profiling import format_profile
+from .prompt_index import MasterPromptIndex, PromptSelection
+from .retry_policy import AttemptOutcome, RetryPolicy, make_outcome
+from .spatial_context import select_spatial_context
+from shared.artifact_resolver import resolve_artifact_path
 from shared.artifact_uploader import upload_file
+from shared.session_store import append_version, init_history, load_session, save_session
 
 logger = logging.getLogger(__name__)
 
@@ -40,12 +70,111 @@ def _compute_cost_summary(usage_list: list[UsageInfo]) -> CostSummary:
     return CostSummary(
         total_input_tokens=sum(u.input_tokens for u in usage_list),
         total_output_tokens=sum(u.output_tokens for u in usage_list),
+        total_cache_read_tokens=sum(u.cache_read_tokens for u in usage_list),
+        total_cache_write_tokens=sum(u.cache_write_tokens for u in usage_list),
         total_usd=round(sum(u.cost_usd for u in usage_list), 4),
         calls=len(usage_list),
+        prompt_tokens_saved=sum(u.prompt_tokens_saved for u in usage_list),
         details=[u.to_dict() for u in usage_list],
     )
 
 
+def _compute_timings(
+    usage_list: list[UsageInfo],
+    retry_log: list[RetryEntry],
+    started: float,
+) -> dict[str, float]:
+    """Where the wall time of a generation went (LLM vs Blender vs rest)."""
+    timed = [u.timing for u in usage_list if u.timing]
+    return {
+        "total_seconds": round(time.perf_counter() - started, 2),
+        "llm_seconds": round(sum(t.total_seconds for t in timed), 2),
+        "llm_retry_wait_seconds": round(sum(t.retry_wait_seconds for t in timed), 2),
+        "blender_seconds": round(sum(e.blender_seconds for e in retry_log), 2),
+    }
+
+
+def _select_system_prompt(
+    system_prompt: str,
+    prompt_index: MasterPromptIndex | None,
+    kind: str,
+    **context: str,
+) -> tuple[str, PromptSelection | None]:
+    if prompt_index is None:
+        return system_prompt, None
+    selection = prompt_index.select(kind, **context)
+    logger.info(
+        "[PROMPT] %s: %d sections, ~%d/%d tokens (saved ~%d)",
+        kind, len(selection.sections), selection.selected_tokens,
+        selection.full_tokens, selection.saved_tokens,
+    )
+    return selection.text, selection
+
+
+def _tag_usage(usage: UsageInfo, selection: PromptSelection | None) -> UsageInfo:
+    if selection is None:
+        return usage
+    return replace(
+        usage,
+        prompt_sections=tuple(selection.sections),
+        prompt_tokens_saved=selection.saved_tokens,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Local rule-based fixes (before the LLM)
+# ---------------------------------------------------------------------------
+
+_MAX_AUTO_FIX_PASSES = 3
+
+
+async def _apply_auto_fixes(
+    code: str,
+    result: BlenderResult,
+    glb_path: str,
+    blender_executable: str,
+    blender_timeout: int,
+    isolate_functions: bool = False,
+    max_polygons: int = 0,
+    incremental: bool = False,
+    profile: bool = False,
+    profile_top_n: int = 0,
+) -> tuple[str, BlenderResult, list[str], float]:
+    """
+    Rewrite known error patterns and re-run Blender.  A fix is kept when the
+    run succeeds or its failure moves past the original location (see
+    ``failure_advanced``); returns (code, result, rules, blender_seconds).
+    """
+    fired: list[str] = []
+    seconds = 0.0
+    for _ in range(_MAX_AUTO_FIX_PASSES):
+        error_text = f"{result.stderr}\n{result.stdout}"
+        fix = auto_fix(code, error_text)
+        if fix is None:
+            break
+        logger.info("[AUTO-FIX] %s — re-running Blender", ", ".join(fix.rules))
+        rerun = await run_blender(
+            fix.code, glb_path, blender_executable, blender_timeout,
+            isolate_functions, max_polygons, incremental, profile, profile_top_n,
+        )
+        seconds += rerun.elapsed
+        if not rerun.success and not failure_advanced(
+            code, error_text, fix.code, f"{rerun.stderr}\n{rerun.stdout}",
+        ):
+            logger.info("[AUTO-FIX] %s did not get past the failing line — discarded", ", ".join(fix.rules))
+            break
+        code, result = fix.code, rerun
+        fired.extend(fix.rules)
+        if result.success:
+            logger.info("[AUTO-FIX] Fixed locally (%s)", ", ".join(fired))
+            break
+    return code, result, fired, seconds
+
+
+# error block budget of a fix prompt (function-error tables are built to fit)
+_FIX_ERROR_CHARS = 2000
+
+
 # ---------------------------------------------------------------------------
 # Retry loop — identical to original run_with_retry()
 # ---------------------------------------------------------------------------
@@ -57,23 +186,106 @@ async def _run_with_retry(
     system_prompt: str,
     blender_executable: str,
     blender_timeout: int,
-    anthropic_api_key: str,
-    gemini_api_key: str,
+    anthropic_api_key: str | list[str],
+    gemini_api_key: str | list[str],
     gemini_model: str,
     max_retries: int = 3,
     max_cost_usd: float = 5.0,
     spent_so_far: float = 0.0,
     progress_callback: Callable[[str, int, int], None] | None = None,
+    patch_mode: bool = False,
+    prompt_index: MasterPromptIndex | None = None,
+    user_prompt: str = "",
+    scoped_fixes: bool = False,
+    conversation: FixConversation | None = None,
+    auto_fixes: bool = False,
+    retry_policy: RetryPolicy | None = None,
+    isolate_functions: bool = False,
+    max_polygons: int = 0,
+    incremental: bool = False,
+    spatial_context_chars: int = 0,
+    profile: bool = False,
+    profile_top_n: int = 0,
 ) -> tuple[str, BlenderResult, list[RetryEntry], list[UsageInfo]]:
     """
     Run Blender on code. On error, send code+error to LLM to fix.
     Up to max_retries. Enforces budget. Returns (code, result, retry_log, extra_usage).
+
+    With a ``conversation`` every fix is a new user turn (error only) in the
+    generation thread, so the cached prefix is not re-sent at full price.
+    With ``auto_fixes`` known error patterns are rewritten locally and
+    Blender re-run before any LLM fix.
+    ``retry_policy`` picks the fix model and context per attempt (or aborts);
+    its decision is stored on each failed attempt's entry.
+    With ``isolate_functions`` each component function runs under its own
+    error capture, so one Blender run reports every failing function and
+    the fix round gets the whole per-function error table.
+    ``max_polygons`` > 0 caps evaluated geometry before every export.
+    With ``incremental`` attempts after the first re-execute only the
+    component functions a fix changed; the rest come from the session library.
+    ``spatial_context_chars`` > 0 replaces the truncated spatial report with
+    a table of the meshes most related to the failing function / anomalous.
+    With ``profile`` every attempt records per-function / per-phase timings;
+    a failed attempt's fix prompt names the slowest (or timed-out) function.
+
+    With scoped fixes the LLM sees only the failing function's slice of the
+    script (when the traceback locates one) and returns replacement functions.
+    In patch mode the LLM returns only the changed functions (or a diff);
+    if the patch cannot be applied the fix is re-requested as full code.
     """
     retry_log: list[RetryEntry] = []
     extra_usage: list[UsageInfo] = []
     code = initial_code
     cumulative_cost = spent_so_far
     last_spatial_report: str | None = None
+    policy = retry_policy or RetryPolicy()
+    outcomes: list[AttemptOutcome] = []
+    fix_llm = llm_name
+    fix_context = "scoped"
+
+    async def _fix_call(prompt: str, error_text: str) -> LLMResponse:
+        nonlocal cumulative_cost
+        fix_system, selection = _select_system_prompt(
+            system_prompt, prompt_index, "fix",
+            request_text=user_prompt, error_text=error_text, code=code,
+        )
+        resp = await call_llm(
+            fix_llm,
+            fix_system,
+            prompt,
+            anthropic_api_key=anthropic_api_key,
+            gemini_api_key=gemini_api_key,
+            gemini_model=gemini_model,
+        )
+        resp.usage = _tag_usage(resp.usage, selection)
+        extra_usage.append(resp.usage)
+        cumulative_cost += resp.usage.cost_usd
+        return resp
+
+    async def _thread_call(prompt: str) -> LLMResponse:
+        nonlocal cumulative_cost
+        assert conversation is not None
+        conversation.add_user(prompt)
+        try:
+            resp = await call_llm_conversation(
+                fix_llm,
+                conversation,
+                anthropic_api_key=anthropic_api_key,
+                gemini_api_key=gemini_api_key,
+                gemini_model=gemini_model,
+            )
+        except Exception:
+            conversation.pop()   # keep user/assistant alternation intact
+            raise
+        conversation.add_assistant(resp.raw)
+        extra_usage.append(resp.usage)
+        cumulative_cost += resp.usage.cost_usd
+        logger.info(
+            "[THREAD] %d turns, in=%d cache read=%d write=%d, out=%d, $%.4f",
+            len(conversation.turns), resp.usage.input_tokens, resp.usage.cache_read_tokens,
+            resp.usage.cache_write_tokens, resp.usage.output_tokens, resp.usage.cost_usd,
+        )
+        return resp
 
     for attempt in range(1, max_retries + 1):
         logger.info(
@@ -83,7 +295,18 @@ async def _run_with_retry(
         if progress_callback:
             progress_callback("blender", attempt, max_retries)
 
-        result = await run_blender(code, glb_path, blender_executable, blender_timeout)
+        result = await run_blender(
+            code, glb_path, blender_executable, blender_timeout,
+            isolate_functions, max_polygons, incremental, profile, profile_top_n,
+        )
+        blender_seconds = result.elapsed
+        auto_rules: list[str] = []
+        if auto_fixes and not result.success:
+            code, result, auto_rules, extra_seconds = await _apply_auto_fixes(
+                code, result, glb_path, blender_executable, blender_timeout,
+                isolate_functions, max_polygons, incremental, profile, profile_top_n,
+            )
+            blender_seconds += extra_seconds
 
         if result.spatial_report:
             last_spatial_report = result.spatial_report
@@ -94,6 +317,11 @@ async def _run_with_retry(
             code_length=len(code),
             error_text="",
             timestamp=datetime.now().isoformat(),
+            blender_seconds=round(blender_seconds, 2),
+            auto_fix_rules=auto_rules,
+            fix_mode="auto" if auto_rules and result.success else "",
+            reused_functions=result.incremental.get("reused", []),
+            profile=result.profile,
         )
 
         if result.success:
@@ -101,13 +329,38 @@ async def _run_with_retry(
             logger.info("[ATTEMPT %d] SUCCESS", attempt)
             return code, result, retry_log, extra_usage
 
-        error_text = '\n'.join(result.error_lines[:20])
-        stderr_tail = result.stderr[-1500:]
-        if stderr_tail:
-            error_text += '\n' + stderr_tail
+        profile_text = format_profile(result.profile) if result.profile else ""
+        if result.function_errors:
+            error_text = format_function_errors(
+                result.function_errors,
+                _FIX_ERROR_CHARS - (len(profile_text) + 2 if profile_text else 0),
+            )
+            entry.function_errors = [
+                {"function": e["function"], "error": e["error"]} for e in result.function_errors
+            ]
+        elif result.error is not None:
+            error_text = result.error.format()
+            entry.error_location = result.error.to_dict()["location"] or {}
+        else:
+            error_text = '\n'.join(result.error_lines[:20])
+            stderr_tail = result.stderr[-1500:]
+            if stderr_tail:
+                error_text += '\n' + stderr_tail
+        if profile_text:
+            # before the error so error_signature() still sees the exception last
+            error_text = f"{profile_text}\n\n{error_text}"
         entry.error_text = error_text[:3000]
         retry_log.append(entry)
 
+        spatial_context = last_spatial_report
+        if last_spatial_report and spatial_context_chars:
+            failing = [e["function"] for e in result.function_errors]
+            if not failing and result.error is not None and result.error.location is not None:
+                failing = [result.error.location.function]
+            spatial_context = select_spatial_context(
+                last_spatial_report, code, failing, spatial_context_chars,
+            )
+
         if attempt < max_retries:
             if cumulative_cost >= max_cost_usd:
                 logger.warning(
@@ -116,23 +369,109 @@ async def _run_with_retry(
                 )
                 break
 
+            outcomes.append(make_outcome(attempt, code, error_text, fix_llm, fix_context))
+            decision = policy.decide(outcomes, fix_llm, can_escalate=bool(anthropic_api_key))
+            entry.decision = decision.to_dict()
+            logger.info(
+                "[POLICY] %s: %s with %s, %s context (%s)",
+                decision.policy, decision.action, decision.llm_name, decision.context,
+                "; ".join(decision.reasons),
+            )
+            if decision.action == "abort":
+                logger.warning("[ATTEMPT %d] Retry policy aborted the fix loop", attempt)
+                break
+            fix_llm, fix_context = decision.llm_name, decision.context
+
             logger.info("[ATTEMPT %d] FAILED — asking LLM to fix...", attempt)
             if progress_callback:
                 progress_callback("fixing", attempt, max_retries)
 
             try:
-                fix_prompt = build_fix_prompt(code, error_text[:2000], spatial_report=last_spatial_report)
-                llm_resp = await call_llm(
-                    llm_name,
-                    system_prompt,
-                    fix_prompt,
-                    anthropic_api_key=anthropic_api_key,
-                    gemini_api_key=gemini_api_key,
-                    gemini_model=gemini_model,
+                if conversation is not None:
+                    llm_resp = await _thread_call(build_thread_fix_prompt(
+                        error_text[:_FIX_ERROR_CHARS], spatial_report=spatial_context, patch_mode=patch_mode,
+                    ))
+                    if not patch_mode:
+                        code = llm_resp.code
+                        entry.fix_mode = "thread:full"
+                        continue
+                    patch = apply_patch(code, llm_resp.raw)
+                    if patch.success:
+                        code = patch.code
+                        entry.fix_mode = f"thread:patch:{patch.mode}"
+                        continue
+                    logger.warning(
+                        "[ATTEMPT %d] Thread patch not applicable (%s) — requesting full code",
+                        attempt, patch.error,
+                    )
+                    if cumulative_cost >= max_cost_usd:
+                        logger.warning("[BUDGET] No budget left for full-code fallback")
+                        break
+                    llm_resp = await _thread_call(THREAD_FULL_CODE_PROMPT.format(error=patch.error))
+                    code = llm_resp.code
+                    entry.fix_mode = "thread:patch_failed:full"
+                    continue
+
+                context = None
+                # A slice around one function cannot carry fixes for several.
+                if scoped_fixes and fix_context == "scoped" and len(result.function_errors) <= 1:
+                    context = build_fix_context(code, f"{result.stderr}\n{result.stdout}")
+                if context is not None:
+                    logger.info(
+                        "[ATTEMPT %d] Scoped fix: %s() line %d, slice %d/%d chars (%s)",
+                        attempt, context.failing_function, context.failing_line,
+                        context.slice_chars, context.full_chars, ", ".join(context.functions),
+                    )
+                    fix_prompt = build_scoped_fix_prompt(
+                        context, remap_traceback(error_text, code)[:_FIX_ERROR_CHARS],
+                        spatial_report=spatial_context,
+                    )
+                    llm_resp = await _fix_call(fix_prompt, error_text)
+                    patch = apply_patch(code, llm_resp.raw)
+                    if patch.success:
+                        code = patch.code
+                        entry.fix_mode = f"scoped:{patch.mode}"
+                        continue
+                    logger.warning(
+                        "[ATTEMPT %d] Scoped fix not applicable (%s) — using whole-script prompt",
+                        attempt, patch.error,
+                    )
+                    if cumulative_cost >= max_cost_usd:
+                        logger.warning("[BUDGET] No budget left for whole-script fallback")
+                        break
+
+                fix_prompt = build_fix_prompt(
+                    code, error_text[:_FIX_ERROR_CHARS],
+                    spatial_report=spatial_context,
+                    patch_mode=patch_mode,
                 )
-                code = llm_resp.code
-                extra_usage.append(llm_resp.usage)
-                cumulative_cost += llm_resp.usage.cost_usd
+                llm_resp = await _fix_call(fix_prompt, error_text)
+                if not patch_mode:
+                    code = llm_resp.code
+                    entry.fix_mode = "full"
+                else:
+                    patch = apply_patch(code, llm_resp.raw)
+                    if patch.success:
+                        logger.info(
+                            "[ATTEMPT %d] Patch applied (%s): replaced=%s added=%s, %d output tokens",
+                            attempt, patch.mode, patch.replaced, patch.added, llm_resp.usage.output_tokens,
+                        )
+                        code = patch.code
+                        entry.fix_mode = f"patch:{patch.mode}"
+                    else:
+                        logger.warning(
+                            "[ATTEMPT %d] Patch not applicable (%s) — requesting full code",
+                            attempt, patch.error,
+                        )
+                        if cumulative_cost >= max_cost_usd:
+                            logger.warning("[BUDGET] No budget left for full-code fallback")
+                            break
+                        fix_prompt = build_fix_prompt(
+                            code, error_text[:_FIX_ERROR_CHARS], spatial_report=spatial_context,
+                        )
+                        llm_resp = await _fix_call(fix_prompt, error_text)
+                        code = llm_resp.code
+                        entry.fix_mode = "patch_failed:full"
             except Exception as e:
                 logger.error("LLM fix call failed: %s", e)
                 break
@@ -142,6 +481,74 @@ async def _run_with_retry(
     return code, result, retry_log, extra_usage
 
 
+# ---------------------------------------------------------------------------
+# Generation call preparation (shared with the batch tier)
+# ---------------------------------------------------------------------------
+
+# reference images in the artifact cache: <sha256>.img (the mime type travels in the reference)
+REFERENCE_IMAGE_SUFFIX = ".img"
+
+
+@dataclass
+class GenerationCall:
+    system: str
+    prompt: str
+    selection: PromptSelection | None = None
+    image_data: bytes | None = None
+    image_mime: str | None = None
+    raw_image: bytes | None = None
+    raw_image_mime: str | None = None
+    reference_image: dict[str, Any] | None = None
+
+
+async def _load_image_ref(request: GenerateRequest, cache_dir: Path | None) -> tuple[bytes, str]:
+    """Bytes and mime type of ``request.image_ref`` (CAS reference or URL), via the artifact cache."""
+    ref = request.image_ref
+    path = await resolve_artifact_path(
+        ref, cache_dir or Path(tempfile.gettempdir()) / "ring_gen_artifacts",
+        REFERENCE_IMAGE_SUFFIX, allow_local=False,
+    )
+    mime = (ref.get("type") if isinstance(ref, dict) else None) or request.image_mime
+    if not mime and isinstance(ref, str):
+        mime = mimetypes.guess_type(ref.split("?", 1)[0])[0]
+    return path.read_bytes(), mime or "image/jpeg"
+
+
+async def prepare_generation_call(
+    request: GenerateRequest,
+    system_prompt: str,
+    prompt_index: MasterPromptIndex | None = None,
+    image_normalizer: ImageNormalizer | None = None,
+    artifact_cache_dir: Path | None = None,
+) -> GenerationCall:
+    """Build the system prompt, user prompt and image for the initial generation call."""
+    prompt = request.prompt or ""
+    gen_prompt = build_generation_prompt(prompt) if prompt else "Generate a classic solitaire diamond ring."
+    gen_system, gen_selection = _select_system_prompt(
+        system_prompt, prompt_index, "generate", request_text=gen_prompt,
+    )
+    call = GenerationCall(system=gen_system, prompt=gen_prompt, selection=gen_selection)
+
+    if request.image_b64:
+        call.raw_image = base64.b64decode(request.image_b64)
+        call.raw_image_mime = request.image_mime or "image/jpeg"
+    elif request.image_ref is not None:
+        call.raw_image, call.raw_image_mime = await _load_image_ref(request, artifact_cache_dir)
+    if call.raw_image is not None:
+        call.image_data, call.image_mime = call.raw_image, call.raw_image_mime
+
+        # Downscale / strip EXIF / re-encode for the target provider
+        if image_normalizer is not None:
+            loop = asyncio.get_running_loop()
+            normalized = await loop.run_in_executor(
+                None, image_normalizer.normalize, call.raw_image, call.raw_image_mime,
+                provider_for(request.llm_name),
+            )
+            call.image_data, call.image_mime = normalized.data, normalized.mime
+            call.reference_image = normalized.to_dict()
+    return call
+
+
 # ---------------------------------------------------------------------------
 # Full pipeline
 # ---------------------------------------------------------------------------
@@ -152,16 +559,37 @@ async def generate_ring(
     sessions_dir: Path,
     blender_executable: str,
     blender_timeout: int,
-    anthropic_api_key: str,
-    gemini_api_key: str,
+    anthropic_api_key: str | list[str],
+    gemini_api_key: str | list[str],
     gemini_model: str,
     max_retries: int = 3,
     max_cost_usd: float = 5.0,
     progress_callback: Callable[[str, int, int], None] | None = None,
+    patch_mode: bool = False,
+    prompt_index: MasterPromptIndex | None = None,
+    scoped_fixes: bool = False,
+    image_normalizer: ImageNormalizer | None = None,
+    artifact_cache_dir: Path | None = None,
+    prefetched_response: LLMResponse | None = None,
+    conversational_fixes: bool = False,
+    auto_fixes: bool = False,
+    retry_policy: RetryPolicy | None = None,
+    isolate_functions: bool = False,
+    max_polygons: int = 0,
+    incremental: bool = False,
+    spatial_context_chars: int = 0,
+    profile: bool = False,
+    profile_top_n: int = 0,
+    prepared_call: GenerationCall | None = None,
 ) -> GenerateResult:
     """
     End-to-end ring generation: prompt → LLM → Blender → retry loop → GLB.
+
+    ``prefetched_response`` (batch tier, variants) replaces the initial LLM call;
+    ``prepared_call`` replaces ``prepare_generation_call`` (variants).
+    With ``conversational_fixes`` generation and fixes share one cached thread.
     """
+    started = time.perf_counter()
     llm_name = request.llm_name
     prompt = request.prompt or ""
     session_id = request.request_id or f"s_{uuid.uuid4().hex[:10]}_{int(time.time())}"
@@ -170,51 +598,67 @@ async def generate_ring(
     session_dir.mkdir(parents=True, exist_ok=True)
     glb_path = str(session_dir / "model.glb")
 
-    # Decode image if provided
-    image_data: bytes | None = None
-    image_mime: str | None = None
-    if request.image_b64:
-        image_data = base64.b64decode(request.image_b64)
-        image_mime = request.image_mime or "image/jpeg"
-        ext = image_mime.split("/")[-1] if image_mime else "jpg"
+    call = prepared_call or await prepare_generation_call(
+        request, system_prompt, prompt_index, image_normalizer, artifact_cache_dir,
+    )
+    if call.raw_image is not None:
+        ext = call.raw_image_mime.split("/")[-1] if call.raw_image_mime else "jpg"
         img_path = session_dir / f"reference.{ext}"
-        img_path.write_bytes(image_data)
+        img_path.write_bytes(call.raw_image)
 
     effective_retries = request.max_retries if request.max_retries is not None else max_retries
     effective_budget = request.max_cost_usd if request.max_cost_usd is not None else max_cost_usd
 
     # Step 1: Call LLM for code generation
-    logger.info("[STEP 1] Calling %s for code generation...", llm_name.upper())
     if progress_callback:
         progress_callback("llm_started", 0, effective_retries)
 
-    gen_prompt = build_generation_prompt(prompt) if prompt else "Generate a classic solitaire diamond ring."
+    conversation: FixConversation | None = None
+    if conversational_fixes:
+        conversation = FixConversation(system=call.system)
+        conversation.add_user(f"User Request: {call.prompt}", call.image_data, call.image_mime)
 
-    try:
-        llm_resp = await call_llm(
-            llm_name,
-            system_prompt,
-            gen_prompt,
-            anthropic_api_key=anthropic_api_key,
-            gemini_api_key=gemini_api_key,
-            gemini_model=gemini_model,
-            image_data=image_data,
-            image_mime=image_mime,
-        )
-    except Exception as e:
-        logger.error("[STEP 1] FAILED: %s", e)
-        return GenerateResult(
-            success=False,
-            session_id=session_id,
-            llm_used=llm_name,
-            cost_summary=CostSummary(),
-        )
+    if prefetched_response is not None:
+        logger.info("[STEP 1] Using prefetched %s response (%s tier)", llm_name.upper(), prefetched_response.usage.tier)
+        llm_resp = prefetched_response
+    else:
+        logger.info("[STEP 1] Calling %s for code generation...", llm_name.upper())
+        try:
+            if conversation is not None:
+                llm_resp = await call_llm_conversation(
+                    llm_name,
+                    conversation,
+                    anthropic_api_key=anthropic_api_key,
+                    gemini_api_key=gemini_api_key,
+                    gemini_model=gemini_model,
+                )
+            else:
+                llm_resp = await call_llm(
+                    llm_name,
+                    call.system,
+                    call.prompt,
+                    anthropic_api_key=anthropic_api_key,
+                    gemini_api_key=gemini_api_key,
+                    gemini_model=gemini_model,
+                    image_data=call.image_data,
+                    image_mime=call.image_mime,
+                )
+        except Exception as e:
+            logger.error("[STEP 1] FAILED: %s", e)
+            return GenerateResult(
+                success=False,
+                session_id=session_id,
+                llm_used=llm_name,
+                cost_summary=CostSummary(),
+            )
 
     if progress_callback:
         progress_callback("llm_done", 0, effective_retries)
 
     initial_code = llm_resp.code
-    total_usage: list[UsageInfo] = [llm_resp.usage]
+    if conversation is not None:
+        conversation.add_assistant(llm_resp.raw)
+    total_usage: list[UsageInfo] = [_tag_usage(llm_resp.usage, call.selection)]
     modules = extract_modules(initial_code)
     logger.info(
         "[STEP 1] Done. %d chars, %d lines, modules: %s",
@@ -239,9 +683,29 @@ async def generate_ring(
         max_cost_usd=effective_budget,
         spent_so_far=initial_cost,
         progress_callback=progress_callback,
+        patch_mode=patch_mode,
+        prompt_index=prompt_index,
+        user_prompt=prompt,
+        scoped_fixes=scoped_fixes,
+        conversation=conversation,
+        auto_fixes=auto_fixes,
+        retry_policy=retry_policy,
+        isolate_functions=isolate_functions,
+        max_polygons=max_polygons,
+        incremental=incremental,
+        spatial_context_chars=spatial_context_chars,
+        profile=profile,
+        profile_top_n=profile_top_n,
     )
     total_usage.extend(retry_usage)
+    if result.geometry_budget.get("reductions"):
+        logger.info(
+            "[STEP 2] Geometry budget reduced %d → %d polygons (%d modifier caps)",
+            result.geometry_budget["polygons_before"], result.geometry_budget["polygons_after"],
+            len(result.geometry_budget["reductions"]),
+        )
     cost_summary = _compute_cost_summary(total_usage)
+    timings = _compute_timings(total_usage, retry_log, started)
     modules = extract_modules(code)
 
     skip_validation = "opus" in llm_name.lower()
@@ -251,26 +715,19 @@ async def generate_ring(
         "session_id": session_id,
         "prompt": prompt,
         "llm_name": llm_name,
-        "code": code,
         "modules": modules,
-        "version": 1,
-        "current_version": 1,
         "edits": [],
-        "version_history": [
-            {
-                "version": 1,
-                "code": code,
-                "modules": modules,
-                "timestamp": datetime.now().isoformat(),
-                "description": "Initial generation",
-                "cost": cost_summary.total_usd,
-            }
-        ],
         "created": datetime.now().isoformat(),
         "retry_log": [e.model_dump() for e in retry_log],
         "cost": cost_summary.total_usd,
+        "llm_calls": cost_summary.details,
+        "timings": timings,
+        "fix_thread": conversation.to_dict() if conversation is not None else None,
         "spatial_report": result.spatial_report,
+        "geometry_budget": result.geometry_budget,
+        "profile": result.profile,
         "skip_validation": skip_validation,
+        "reference_image": call.reference_image,
         "blender_result": {
             "success": result.success,
             "returncode": result.returncode,
@@ -280,8 +737,15 @@ async def generate_ring(
             "error_lines": result.error_lines,
         },
     }
-    session_json = session_dir / "session.json"
-    session_json.write_text(json.dumps(session_data, indent=2))
+    # version 1 goes to the version log; session.json keeps code-free history entries
+    init_history(
+        session_dir, session_data, code,
+        modules=modules,
+        timestamp=datetime.now().isoformat(),
+        description="Initial generation",
+        cost=cost_summary.total_usd,
+    )
+    save_session(session_dir, session_data)
 
     if not result.success:
         logger.error("[STEP 2] FAILED after all retries")
@@ -294,6 +758,8 @@ async def generate_ring(
             cost_summary=cost_summary,
             llm_used=llm_name,
             spatial_report=result.spatial_report,
+            timings=timings,
+            geometry_budget=result.geometry_budget,
         )
 
     logger.info(
@@ -320,4 +786,451 @@ async def generate_ring(
         llm_used=llm_name,
         blender_elapsed=result.elapsed,
         glb_size=result.glb_size,
+        timings=timings,
+        geometry_budget=result.geometry_budget,
     )
+
+
+# ---------------------------------------------------------------------------
+# Variants — N generations of one request sharing the cached prefix
+# ---------------------------------------------------------------------------
+
+def _merge_cost_summaries(summaries: list[CostSummary]) -> CostSummary:
+    return CostSummary(
+        total_input_tokens=sum(s.total_input_tokens for s in summaries),
+        total_output_tokens=sum(s.total_output_tokens for s in summaries),
+        total_cache_read_tokens=sum(s.total_cache_read_tokens for s in summaries),
+        total_cache_write_tokens=sum(s.total_cache_write_tokens for s in summaries),
+        total_usd=round(sum(s.total_usd for s in summaries), 4),
+        calls=sum(s.calls for s in summaries),
+        prompt_tokens_saved=sum(s.prompt_tokens_saved for s in summaries),
+        details=[d for s in summaries for d in s.details],
+    )
+
+
+async def generate_variants(
+    request: GenerateRequest,
+    system_prompt: str,
+    sessions_dir: Path,
+    blender_executable: str,
+    blender_timeout: int,
+    anthropic_api_key: str | list[str],
+    gemini_api_key: str | list[str],
+    gemini_model: str,
+    progress_callback: Callable[[str, int, int], None] | None = None,
+    prompt_index: MasterPromptIndex | None = None,
+    image_normalizer: ImageNormalizer | None = None,
+    artifact_cache_dir: Path | None = None,
+    **options: Any,
+) -> GenerateResult:
+    """
+    ``request.variants`` generations of one request, run concurrently.
+
+    The generation call is prepared once (system prompt selection, decoded
+    and normalised image).  For Claude the master prompt is written to the
+    prompt cache by a one-token request first, so every variant's
+    generation thread reads it at the cache price instead of paying for it
+    in full; variant 1 gets the plain request, the others a note asking
+    for a distinct interpretation.  Each variant then runs its own Blender
+    / fix loop (sessions ``<id>_v1`` … ``<id>_vN``); the LLM calls run in
+    parallel, the Blender runs share the process-wide Blender slots
+    (``configure_blender_slots``) with every other job.
+
+    Returns the first successful variant (else variant 1) with every
+    variant in ``variants`` and the cost / wall time of the whole job.
+    ``options`` are passed on to ``generate_ring``.
+    """
+    started = time.perf_counter()
+    count = request.variants
+    llm_name = request.llm_name
+    base_id = request.request_id or f"s_{uuid.uuid4().hex[:10]}_{int(time.time())}"
+    max_retries = options.get("max_retries", 3)
+
+    if progress_callback:
+        progress_callback("llm_started", 0, max_retries)
+    call = await prepare_generation_call(request, system_prompt, prompt_index, image_normalizer, artifact_cache_dir)
+
+    shared_usage: list[UsageInfo] = []
+    try:
+        primed = await prime_prompt_cache(llm_name, call.system, anthropic_api_key)
+        if primed is not None:
+            shared_usage.append(_tag_usage(primed, call.selection))
+    except Exception as e:
+        logger.warning("[VARIANTS] Prompt cache priming failed (%s) — variants may miss the cache", e)
+
+    # Job progress follows the variant that is furthest along.
+    furthest = [-1]
+
+    def _forward(stage: str, attempt: int, total: int) -> None:
+        if progress_callback is None or stage == "llm_started":
+            return
+        if stage == "llm_done":
+            if furthest[0] < 0:
+                furthest[0] = 0
+                progress_callback(stage, attempt, total)
+        elif attempt >= furthest[0]:
+            furthest[0] = attempt
+            progress_callback(stage, attempt, total)
+
+    async def _variant(index: int) -> GenerateResult:
+        variant_call = replace(call, prompt=call.prompt + build_variant_note(index, count))
+        variant_request = request.model_copy(update={"request_id": f"{base_id}_v{index + 1}", "variants": 1})
+        thread = FixConversation(system=variant_call.system)
+        thread.add_user(f"User Request: {variant_call.prompt}", variant_call.image_data, variant_call.image_mime)
+        try:
+            response = await call_llm_conversation(
+                llm_name,
+                thread,
+                anthropic_api_key=anthropic_api_key,
+                gemini_api_key=gemini_api_key,
+                gemini_model=gemini_model,
+            )
+        except Exception as e:
+            logger.error("[VARIANTS] Variant %d generation failed: %s", index + 1, e)
+            return GenerateResult(
+                success=False, session_id=variant_request.request_id or "", llm_used=llm_name,
+                cost_summary=CostSummary(), variant=index + 1,
+            )
+        result = await generate_ring(
+            request=variant_request,
+            system_prompt=system_prompt,
+            sessions_dir=sessions_dir,
+            blender_executable=blender_executable,
+            blender_timeout=blender_timeout,
+            anthropic_api_key=anthropic_api_key,
+            gemini_api_key=gemini_api_key,
+            gemini_model=gemini_model,
+            progress_callback=_forward,
+            prompt_index=prompt_index,
+            image_normalizer=image_normalizer,
+            prefetched_response=response,
+            prepared_call=variant_call,
+            **options,
+        )
+        result.variant = index + 1
+        return result
+
+    results = list(await asyncio.gather(*(_variant(i) for i in range(count))))
+
+    primary = next((r for r in results if r.success), results[0])
+    cost_summary = _merge_cost_summaries(
+        [_compute_cost_summary(shared_usage)] + [r.cost_summary for r in results]
+    )
+    succeeded = sum(1 for r in results if r.success)
+    logger.info(
+        "=== VARIANTS COMPLETE: %s | %d/%d succeeded | cost=$%.4f ===",
+        base_id, succeeded, count, cost_summary.total_usd,
+    )
+    return primary.model_copy(update={
+        "variants": results,
+        "cost_summary": cost_summary,
+        "timings": {**primary.timings, "total_seconds": round(time.perf_counter() - started, 2)},
+    })
+
+
+# ---------------------------------------------------------------------------
+# Edits — natural-language change to an existing session
+# ---------------------------------------------------------------------------
+
+async def edit_ring(
+    session_id: str,
+    edit: EditRequest,
+    system_prompt: str,
+    sessions_dir: Path,
+    blender_executable: str,
+    blender_timeout: int,
+    anthropic_api_key: str | list[str],
+    gemini_api_key: str | list[str],
+    gemini_model: str,
+    max_retries: int = 3,
+    max_cost_usd: float = 5.0,
+    patch_mode: bool = True,
+    prompt_index: MasterPromptIndex | None = None,
+    conversational_fixes: bool = False,
+    **options: Any,
+) -> GenerateResult:
+    """
+    Apply ``edit.instruction`` to the current code of a session.
+
+    The edit is one more turn of the generation thread — master prompt,
+    the original request, the current code as the model's reply, then the
+    edit — so the master prompt is read from the prompt cache, and the
+    model returns only the changed functions (or a diff).  A patch that
+    cannot be applied is re-requested as full code in the same thread.
+    The result goes through the usual Blender / fix loop (``options`` as
+    for ``generate_ring``); on success the session gets a new version
+    (``model_v<N>.glb``, copied to ``model.glb``), and every edit — failed
+    ones included — is recorded in ``edits``.
+
+    A failed LLM call returns an unsuccessful result (session code
+    unchanged), as in ``generate_ring``.  Raises ``FileNotFoundError`` for
+    an unknown session and ``ValueError`` when it has no code to edit.
+    """
+    started = time.perf_counter()
+    session_dir = sessions_dir / session_id
+    session = load_session(session_dir)
+    if not session:
+        raise FileNotFoundError(f"Session not found: {session_id}")
+    code = session.get("code") or ""
+    if not code.strip():
+        raise ValueError(f"Session {session_id} has no code to edit")
+
+    llm_name = edit.llm_name or session.get("llm_name") or "claude"
+    version = int(session.get("current_version") or session.get("version") or 1) + 1
+    effective_retries = edit.max_retries if edit.max_retries is not None else max_retries
+    effective_budget = edit.max_cost_usd if edit.max_cost_usd is not None else max_cost_usd
+
+    # Same system prompt selection as the generation call, so it is served from the cache.
+    prompt = session.get("prompt") or ""
+    gen_prompt = build_generation_prompt(prompt) if prompt else "Generate a classic solitaire diamond ring."
+    system, selection = _select_system_prompt(system_prompt, prompt_index, "generate", request_text=gen_prompt)
+    thread = FixConversation(system=system)
+    thread.add_user(f"User Request: {gen_prompt}")
+    thread.add_assistant(f"```python\n{code}\n```")
+    thread.add_user(build_edit_prompt(edit.instruction))
+
+    logger.info("[EDIT] %s v%d: %s", session_id, version, edit.instruction[:120])
+    usage: list[UsageInfo] = []
+
+    async def _thread_call() -> LLMResponse:
+        resp = await call_llm_conversation(
+            llm_name,
+            thread,
+            anthropic_api_key=anthropic_api_key,
+            gemini_api_key=gemini_api_key,
+            gemini_model=gemini_model,
+        )
+        thread.add_assistant(resp.raw)
+        usage.append(_tag_usage(resp.usage, selection))
+        return resp
+
+    try:
+        resp = await _thread_call()
+        patch = apply_patch(code, resp.raw)
+        if patch.success:
+            new_code, edit_mode = patch.code, f"patch:{patch.mode}"
+        else:
+            logger.warning("[EDIT] Patch not applicable (%s) — requesting full code", patch.error)
+            thread.add_user(THREAD_FULL_CODE_PROMPT.format(error=patch.error))
+            new_code, edit_mode = (await _thread_call()).code, "patch_failed:full"
+    except Exception as e:
+        logger.error("[EDIT] %s: LLM call failed: %s", session_id, e)
+        cost_summary = _compute_cost_summary(usage)
+        session.setdefault("edits", []).append({
+            "version": None,
+            "instruction": edit.instruction,
+            "llm_name": llm_name,
+            "success": False,
+            "edit_mode": "llm_failed",
+            "error": str(e)[:500],
+            "timestamp": datetime.now().isoformat(),
+            "cost": cost_summary.total_usd,
+        })
+        session["cost"] = round(session.get("cost", 0.0) + cost_summary.total_usd, 4)
+        save_session(session_dir, session)
+        return GenerateResult(
+            success=False,
+            session_id=session_id,
+            code=code,
+            modules=extract_modules(code),
+            cost_summary=cost_summary,
+            llm_used=llm_name,
+            version=version - 1,
+        )
+
+    glb_path = session_dir / f"model_v{version}.glb"
+    new_code, result, retry_log, retry_usage = await _run_with_retry(
+        llm_name=llm_name,
+        initial_code=new_code,
+        glb_path=str(glb_path),
+        system_prompt=system_prompt,
+        blender_executable=blender_executable,
+        blender_timeout=blender_timeout,
+        anthropic_api_key=anthropic_api_key,
+        gemini_api_key=gemini_api_key,
+        gemini_model=gemini_model,
+        max_retries=effective_retries,
+        max_cost_usd=effective_budget,
+        spent_so_far=sum(u.cost_usd for u in usage),
+        patch_mode=patch_mode,
+        prompt_index=prompt_index,
+        user_prompt=edit.instruction,
+        conversation=thread if conversational_fixes else None,
+        **options,
+    )
+    usage.extend(retry_usage)
+    cost_summary = _compute_cost_summary(usage)
+    timings = _compute_timings(usage, retry_log, started)
+    modules = extract_modules(new_code)
+    now = datetime.now().isoformat()
+
+    session.setdefault("edits", []).append({
+        "version": version if result.success else None,
+        "instruction": edit.instruction,
+        "llm_name": llm_name,
+        "success": result.success,
+        "edit_mode": edit_mode,
+        "timestamp": now,
+        "cost": cost_summary.total_usd,
+        "timings": timings,
+        "retry_log": [e.model_dump() for e in retry_log],
+    })
+    session["cost"] = round(session.get("cost", 0.0) + cost_summary.total_usd, 4)
+    if result.success:
+        shutil.copyfile(glb_path, session_dir / "model.glb")
+        session.update({
+            "modules": modules,
+            "spatial_report": result.spatial_report,
+            "geometry_budget": result.geometry_budget,
+        })
+        append_version(
+            session_dir, session, new_code,
+            modules=modules,
+            timestamp=now,
+            description=edit.instruction,
+            cost=cost_summary.total_usd,
+        )
+    save_session(session_dir, session)
+
+    if not result.success:
+        logger.error("[EDIT] %s: edit failed after all retries — session unchanged", session_id)
+        return GenerateResult(
+            success=False,
+            session_id=session_id,
+            code=new_code,
+            modules=modules,
+            retry_log=retry_log,
+            cost_summary=cost_summary,
+            llm_used=llm_name,
+            spatial_report=result.spatial_report,
+            timings=timings,
+            geometry_budget=result.geometry_budget,
+            version=version - 1,
+        )
+
+    logger.info(
+        "=== EDIT COMPLETE: %s v%d (%s) | cost=$%.4f ===",
+        session_id, version, edit_mode, cost_summary.total_usd,
+    )
+    glb_ref: Any = await upload_file(str(glb_path), mime="model/gltf-binary")
+    return GenerateResult(
+        success=True,
+        session_id=session_id,
+        glb_path=glb_ref,
+        code=new_code,
+        modules=modules,
+        spatial_report=result.spatial_report,
+        retry_log=retry_log,
+        cost_summary=cost_summary,
+        needs_validation=not session.get("skip_validation", False),
+        llm_used=llm_name,
+        blender_elapsed=result.elapsed,
+        glb_size=result.glb_size,
+        timings=timings,
+        geometry_budget=result.geometry_budget,
+        version=version,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Reuse — requests served from a near-duplicate earlier session
+# ---------------------------------------------------------------------------
+
+def _clone_session(source_session_id: str, request: GenerateRequest, sessions_dir: Path, prompt: str) -> dict[str, Any]:
+    """New session holding the source's current code (as v1) and GLB."""
+    source_dir = sessions_dir / source_session_id
+    source = load_session(source_dir)
+    code = source.get("code") or ""
+    if not code.strip() or not (source_dir / "model.glb").is_file():
+        raise FileNotFoundError(f"Reuse source session incomplete: {source_session_id}")
+
+    session_id = request.request_id or f"s_{uuid.uuid4().hex[:10]}_{int(time.time())}"
+    session_dir = sessions_dir / session_id
+    session_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source_dir / "model.glb", session_dir / "model.glb")
+    modules = source.get("modules") or extract_modules(code)
+    session = {
+        "session_id": session_id,
+        "prompt": prompt,
+        "llm_name": source.get("llm_name") or request.llm_name,
+        "modules": modules,
+        "edits": [],
+        "created": datetime.now().isoformat(),
+        "cost": 0.0,
+        "reused_from": source_session_id,
+        "spatial_report": source.get("spatial_report", ""),
+        "geometry_budget": source.get("geometry_budget", {}),
+        "skip_validation": source.get("skip_validation", False),
+    }
+    init_history(
+        session_dir, session, code,
+        modules=modules,
+        timestamp=session["created"],
+        description=f"Reused from {source_session_id}",
+        cost=0.0,
+    )
+    save_session(session_dir, session)
+    return session
+
+
+async def reuse_session(source_session_id: str, request: GenerateRequest, sessions_dir: Path) -> GenerateResult:
+    """Answer ``request`` with a copy of an earlier session — no LLM or Blender call."""
+    started = time.perf_counter()
+    session = _clone_session(source_session_id, request, sessions_dir, request.prompt or "")
+    session_id = session["session_id"]
+    glb_path = sessions_dir / session_id / "model.glb"
+    logger.info("=== REUSED: %s from %s ===", session_id, source_session_id)
+    glb_ref: Any = await upload_file(str(glb_path), mime="model/gltf-binary")
+    return GenerateResult(
+        success=True,
+        session_id=session_id,
+        glb_path=glb_ref,
+        code=session["code"],
+        modules=session["modules"],
+        spatial_report=session["spatial_report"],
+        needs_validation=not session["skip_validation"],
+        llm_used=session["llm_name"],
+        glb_size=glb_path.stat().st_size,
+        timings={"total_seconds": round(time.perf_counter() - started, 2)},
+        geometry_budget=session["geometry_budget"],
+    )
+
+
+async def seed_edit(
+    source_session_id: str,
+    request: GenerateRequest,
+    sessions_dir: Path,
+    max_retries: int = 3,
+    max_cost_usd: float = 5.0,
+    **options: Any,
+) -> GenerateResult:
+    """
+    Answer ``request`` by editing a copy of a similar earlier session.
+
+    The copy keeps the source prompt for the edit thread (the code answers
+    it) and gets the new prompt once the edit succeeded; a failed copy is
+    removed so the caller can fall back to a fresh generation.
+    """
+    source_prompt = load_session(sessions_dir / source_session_id).get("prompt") or ""
+    session = _clone_session(source_session_id, request, sessions_dir, source_prompt)
+    session_id = session["session_id"]
+    edit = EditRequest(
+        instruction=build_reuse_instruction(request.prompt or ""),
+        llm_name=request.llm_name,
+        max_retries=request.max_retries if request.max_retries is not None else max_retries,
+        max_cost_usd=request.max_cost_usd if request.max_cost_usd is not None else max_cost_usd,
+    )
+    try:
+        result = await edit_ring(session_id, edit, sessions_dir=sessions_dir, **options)
+    except Exception:
+        shutil.rmtree(sessions_dir / session_id, ignore_errors=True)
+        raise
+    if not result.success:
+        shutil.rmtree(sessions_dir / session_id, ignore_errors=True)
+        return result
+
+    session_dir = sessions_dir / session_id
+    session = load_session(session_dir)
+    session["prompt"] = request.prompt or ""
+    save_session(session_dir, session)
+    return result
@@ -0,0 +1,182 @@
+"""
+Blender-side profiling of generated scripts.
+
+When a run is slow or hits the timeout, the retry log only shows the
+total elapsed time.  In profiling mode the injected export code also
+times:
+
+  - every component function (``build_*``): calls and inclusive seconds
+  - the phases ``build`` / ``modifier_eval`` (forced depsgraph evaluation
+    of every mesh) / ``spatial_report`` / ``export``
+  - optionally the cProfile top-N of ``build()`` by cumulative time, with
+    ``ring_script.py`` lines mapped back to the original code
+
+Every function / phase start and end is also printed (flushed) as a
+``[PROFILE]`` line, so after a timeout the partial stdout still shows
+what finished and which function was running when Blender was killed.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from .source_map import SourceMap
+
+_EVENT_RE = re.compile(r"^\[PROFILE\] ([<>]) (\S+) ([\d.]+)$", re.MULTILINE)
+_SCRIPT_FRAME_RE = re.compile(r"ring_script\.py:(\d+)\((\S+)\)$")
+
+
+def profile_code(functions: list[str], top_n: int = 0) -> str:
+    """Injected before build(): timing wrappers, phase helpers, optional cProfile."""
+    return f"""
+# ========================= PROFILING =========================
+import functools as _ft, json as _json, time as _time
+_PROF_T0 = _time.perf_counter()
+_PROFILE = {{"functions": {{}}, "phases": {{}}, "top": []}}
+_PROF_OPEN = {{}}
+_PROF_TOP_N = {top_n}
+
+def _prof_begin(_name):
+    _PROF_OPEN[_name] = _time.perf_counter()
+    print(f"[PROFILE] > {{_name}} {{_PROF_OPEN[_name] - _PROF_T0:.3f}}", flush=True)
+
+def _prof_end(_name):
+    _s = _time.perf_counter() - _PROF_OPEN.pop(_name)
+    print(f"[PROFILE] < {{_name}} {{_s:.3f}}", flush=True)
+    return _s
+
+def _profiled(_name, _fn):
+    @_ft.wraps(_fn)
+    def _timed(*_a, **_kw):
+        _prof_begin(_name)
+        try:
+            return _fn(*_a, **_kw)
+        finally:
+            _entry = _PROFILE["functions"].setdefault(_name, {{"calls": 0, "seconds": 0.0}})
+            _entry["calls"] += 1
+            _entry["seconds"] = round(_entry["seconds"] + _prof_end(_name), 4)
+    return _timed
+
+for _fn_name in {functions!r}:
+    if callable(globals().get(_fn_name)):
+        globals()[_fn_name] = _profiled(_fn_name, globals()[_fn_name])
+
+if _PROF_TOP_N:
+    import cProfile as _cprofile, pstats as _pstats
+    _CPROF = _cprofile.Profile()
+"""
+
+
+def profile_begin(phase: str) -> str:
+    if phase == "build":
+        return '_prof_begin("build")\nif _PROF_TOP_N:\n    _CPROF.enable()'
+    return f'_prof_begin("{phase}")'
+
+
+def profile_end(phase: str) -> str:
+    if phase == "build":
+        return (
+            'if _PROF_TOP_N:\n    _CPROF.disable()\n'
+            '_PROFILE["phases"]["build"] = round(_prof_end("build"), 4)'
+        )
+    return f'_PROFILE["phases"]["{phase}"] = round(_prof_end("{phase}"), 4)'
+
+
+def modifier_eval_code() -> str:
+    """Force evaluation of every mesh so modifier cost is timed apart from the export."""
+    return f"""
+{profile_begin("modifier_eval")}
+try:
+    _prof_dg = bpy.context.evaluated_depsgraph_get()
+    for _o in bpy.data.objects:
+        if _o.type == 'MESH':
+            _oe = _o.evaluated_get(_prof_dg)
+            _oe.to_mesh()
+            _oe.to_mesh_clear()
+except Exception as _pe:
+    print(f"[PIPELINE] Modifier evaluation timing failed: {{_pe}}")
+{profile_end("modifier_eval")}
+"""
+
+
+def profile_report() -> str:
+    """Injected at the very end: cProfile top-N and the PROFILE block."""
+    return """
+if _PROF_TOP_N:
+    try:
+        _pst = _pstats.Stats(_CPROF)
+        _pst.sort_stats("cumulative")
+        for _f in _pst.fcn_list[:_PROF_TOP_N]:
+            _cc, _nc, _tt, _ct, _callers = _pst.stats[_f]
+            _PROFILE["top"].append({
+                "function": f"{os.path.basename(_f[0])}:{_f[1]}({_f[2]})",
+                "calls": _nc, "tottime": round(_tt, 4), "cumtime": round(_ct, 4),
+            })
+    except Exception as _pe:
+        print(f"[PIPELINE] cProfile summary failed: {_pe}")
+_PROFILE["total"] = round(_time.perf_counter() - _PROF_T0, 4)
+print("===PROFILE_START===")
+print(_json.dumps(_PROFILE))
+print("===PROFILE_END===")
+"""
+
+
+def map_profile(profile: dict[str, Any], source_map: SourceMap) -> dict[str, Any]:
+    """Map cProfile entries in ring_script.py to original-code lines; drop the injected wrappers."""
+    top = []
+    for entry in profile.get("top", []):
+        m = _SCRIPT_FRAME_RE.search(entry.get("function", ""))
+        if m:
+            entry["line"] = source_map.code_line(int(m.group(1)))
+            if entry["line"] is None:
+                continue
+        top.append(entry)
+    if "top" in profile:
+        profile["top"] = top
+    return profile
+
+
+def profile_from_stream(stdout: str) -> dict[str, Any]:
+    """Rebuild a partial profile from ``[PROFILE]`` lines (the run was killed)."""
+    functions: dict[str, dict[str, Any]] = {}
+    phases: dict[str, float] = {}
+    running: list[dict[str, Any]] = []
+    for kind, name, value in _EVENT_RE.findall(stdout):
+        if kind == ">":
+            running.append({"name": name, "started_at": float(value)})
+            continue
+        for i in range(len(running) - 1, -1, -1):
+            if running[i]["name"] == name:
+                del running[i]
+                break
+        if name in ("build", "modifier_eval", "spatial_report", "export"):
+            phases[name] = float(value)
+        else:
+            entry = functions.setdefault(name, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] = round(entry["seconds"] + float(value), 4)
+    return {"functions": functions, "phases": phases, "top": [], "running": running, "timed_out": True}
+
+
+def format_profile(profile: dict[str, Any], limit: int = 5) -> str:
+    """Short profile summary for fix prompts."""
+    lines: list[str] = []
+    running = [r for r in profile.get("running", []) if r["name"] != "build"]
+    if profile.get("timed_out"):
+        if running:
+            lines.append(
+                f"TIMEOUT while running {running[-1]['name']}() "
+                f"(started {running[-1]['started_at']:.1f}s into the script)"
+            )
+        else:
+            lines.append("TIMEOUT before any component function was running")
+    slowest = sorted(profile.get("functions", {}).items(), key=lambda kv: -kv[1]["seconds"])[:limit]
+    if slowest:
+        lines.append("SLOWEST FUNCTIONS (inclusive): " + ", ".join(
+            f"{name}() {info['seconds']:.2f}s/{info['calls']} call(s)" for name, info in slowest
+        ))
+    phases = profile.get("phases", {})
+    if phases:
+        lines.append("PHASES: " + ", ".join(f"{name} {sec:.2f}s" for name, sec in phases.items()))
+    return "\n".join(lines)
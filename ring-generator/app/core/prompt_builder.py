@@ -7,6 +7,11 @@ to ensure identical LLM behaviour and output quality.
 
 from __future__ import annotations
 
+import ast
+
+from .blender_runner import BLENDER_LIB_DIR
+from .fix_context import FixContext
+
 
 def build_generation_prompt(user_prompt: str) -> str:
     return f"""{user_prompt}
@@ -19,10 +24,73 @@ REMINDERS:
 - No materials, no cameras, no lights. Output ONLY geometry code."""
 
 
+def build_variant_note(index: int, count: int) -> str:
+    """Appended to the generation prompt of variant ``index`` (0-based; variant 0 gets none)."""
+    if index == 0:
+        return ""
+    return f"""
+
+VARIANT {index + 1} OF {count}: the other variants of this request are generated in parallel.
+Produce a DISTINCT interpretation, not the most obvious one — vary the band profile, setting
+style, stone arrangement or proportions — while still meeting every requirement stated above."""
+
+
+_COMPONENTS_NOTE = """Prefer gem() / prongs() / basket_head() over hand-built gems and prong sets: they
+instance precomputed meshes (unit size, scaled by diameter). Positions are the gem's girdle centre;
+the table faces +Z. Build only custom parts (shank, gallery, halo) with bmesh."""
+
+
+def _library_listing(module: str) -> tuple[str, list[str]]:
+    """(version, "name(args)  — doc" lines) for the exported functions of a blender_lib module."""
+    tree = ast.parse((BLENDER_LIB_DIR / f"{module}.py").read_text())
+    version = "?"
+    exported: list[str] = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id == "__version__":
+                version = ast.literal_eval(node.value)
+            elif node.targets[0].id == "__all__":
+                exported = ast.literal_eval(node.value)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in exported:
+            doc = (ast.get_docstring(node) or "").split("\n")[0]
+            lines.append(f"  {node.name}({ast.unparse(node.args)})  — {doc}")
+    return version, lines
+
+
+def build_helper_library_prompt() -> str:
+    """System-prompt section listing the preloaded ``blender_lib`` functions (read from the modules)."""
+    helpers_version, helpers = _library_listing("ring_helpers")
+    components_version, components = _library_listing("ring_components")
+    return "\n".join([
+        f"PRELOADED HELPERS (ring_helpers {helpers_version}, ring_components {components_version}):",
+        "These functions are ALREADY imported into every script. Call them directly —",
+        "do NOT re-implement them (a function you define with the same name replaces the preloaded one).",
+        "",
+        *helpers,
+        "",
+        "COMPONENT LIBRARY (cut: round_brilliant | oval | princess):",
+        *components,
+        _COMPONENTS_NOTE,
+    ])
+
+
+PATCH_OUTPUT_RULES = """OUTPUT FORMAT (PATCH MODE):
+Do NOT return the whole script. Return ONLY what you changed, in ONE of these forms:
+  A) Every top-level function you changed or added, each COMPLETE from its `def` line to
+     its last line, inside a single ```python fence. Include changed top-level constants
+     (e.g. `BAND_WIDTH = ...`) and any new imports in the same fence.
+  B) A unified diff against the script inside a ```diff fence, with at least 3 lines of
+     unchanged context around every hunk.
+Unchanged functions must NOT be repeated. No explanations."""
+
+
 def build_fix_prompt(
     code: str,
     error_text: str,
     spatial_report: str | None = None,
+    patch_mode: bool = False,
 ) -> str:
     base_prompt = f"""This Blender Python script crashed. Your job: find the ROOT CAUSE and fix it in ONE attempt.
 
@@ -61,7 +129,121 @@ FIX RULES:
 3. Preserve the exact same ring geometry — only fix what's broken.
 4. ONLY bmesh geometry (no bpy.ops.mesh, no bpy.ops.transform).
 5. NO materials, NO lighting, NO scene setup.
-6. Verify your fix: mentally trace the execution to confirm the error is resolved.
-7. Return ONLY Python code. No explanations. No markdown fences."""
+6. Verify your fix: mentally trace the execution to confirm the error is resolved."""
+
+    if patch_mode:
+        base_prompt += "\n\n" + PATCH_OUTPUT_RULES
+    else:
+        base_prompt += "\n7. Return ONLY Python code. No explanations. No markdown fences."
+
+    return base_prompt
+
+
+def build_edit_prompt(instruction: str) -> str:
+    """Edit turn for ``POST /sessions/{id}/edit`` — the current script is the previous assistant turn."""
+    return f"""Modify the script above (the current version of this ring) as requested.
+
+EDIT REQUEST:
+{instruction}
+
+EDIT RULES:
+1. Change ONLY what the request asks for. Every other part of the ring stays identical.
+2. Keep ALL function signatures identical. Keep shared dimension variables consistent so parts still line up.
+3. ONLY bmesh geometry (no bpy.ops.mesh, no bpy.ops.transform).
+4. NO materials, NO lighting, NO scene setup.
+
+""" + PATCH_OUTPUT_RULES
+
+
+def build_reuse_instruction(prompt: str) -> str:
+    """Edit instruction that adapts a near-duplicate earlier generation to a new request."""
+    return (
+        "The script above was generated for a very similar request. Change it so the ring "
+        f"matches this request instead:\n{prompt}"
+    )
+
+
+SCOPED_OUTPUT_RULES = """OUTPUT FORMAT:
+Return ONLY the functions you changed (or added), each COMPLETE from its `def` line to its
+last line, inside a single ```python fence. Include a top-level variable or import only if
+you changed or added it. Do NOT return the rest of the script. No explanations."""
+
+
+def build_scoped_fix_prompt(
+    context: FixContext,
+    error_text: str,
+    spatial_report: str | None = None,
+) -> str:
+    base_prompt = f"""This Blender Python script crashed in `{context.failing_function}()` (line {context.failing_line}). Your job: find the ROOT CAUSE and fix it in ONE attempt.
+
+RELEVANT CODE (the failing function, the functions it calls or is called from, the
+top-level variables they use, and the imports — line numbers refer to the full script):
+```python
+{context.slice_code}
+```
+
+REST OF THE SCRIPT (outline only — these definitions exist and are unchanged):
+{context.outline or "(nothing else)"}
+
+ERROR:
+{error_text}
+"""
+
+    if spatial_report:
+        base_prompt += f"""
+SPATIAL CONTEXT (from previous attempt):
+{spatial_report[:3000]}
+"""
+
+    base_prompt += """
+FIX RULES:
+1. Fix ONLY the specific error. Change the MINIMUM number of lines to resolve it.
+2. Keep ALL function signatures identical — other code calls these functions.
+3. Preserve the exact same ring geometry — only fix what's broken.
+4. ONLY bmesh geometry (no bpy.ops.mesh, no bpy.ops.transform).
+5. If the fix needs a function from the outline, call it as-is; do not redefine it.
+
+""" + SCOPED_OUTPUT_RULES
+
+    return base_prompt
+
+
+def build_thread_fix_prompt(
+    error_text: str,
+    spatial_report: str | None = None,
+    patch_mode: bool = False,
+) -> str:
+    """Error turn for the conversational fix mode — the script is already in the thread."""
+    base_prompt = f"""The current script (your code above, with every fix so far applied) crashed in Blender.
+Find the ROOT CAUSE and fix it in ONE attempt.
+
+ERROR:
+{error_text}
+"""
+
+    if spatial_report:
+        base_prompt += f"""
+SPATIAL CONTEXT (from this attempt):
+{spatial_report[:3000]}
+"""
+
+    base_prompt += """
+FIX RULES:
+1. Fix ONLY the specific error. Change the MINIMUM number of lines to resolve it.
+2. Keep ALL function signatures identical. Keep ALL other functions unchanged.
+3. Preserve the exact same ring geometry — only fix what's broken.
+4. ONLY bmesh geometry (no bpy.ops.mesh, no bpy.ops.transform).
+5. NO materials, NO lighting, NO scene setup.
+
+"""
+
+    if patch_mode:
+        base_prompt += PATCH_OUTPUT_RULES
+    else:
+        base_prompt += "Return the COMPLETE corrected script inside a single ```python fence. No explanations."
 
     return base_prompt
+
+
+THREAD_FULL_CODE_PROMPT = """That change could not be applied to the script ({error}).
+Return the COMPLETE corrected script (every function, with your fix) inside a single ```python fence. No explanations."""
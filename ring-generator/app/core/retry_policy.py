@@ -0,0 +1,145 @@
+"""
+Retry strategy for the Blender fix loop.
+
+After every failed attempt the pipeline asks a ``RetryPolicy`` what the
+next fix round should look like — which model, how much context, or
+whether to stop.  Each decision is stored on the attempt's ``RetryEntry``
+so the trace is visible in ``retry_log``.
+
+  - ``static``    legacy behaviour: same model, scoped context when
+                  available, until ``max_retries`` or the budget runs out
+  - ``adaptive``  reacts to what the attempts show:
+      * first fix of a new error → scoped context (smallest prompt)
+      * same error signature again → expand to the whole script
+      * ``escalate_after`` failures, or the same error twice, on a
+        Sonnet / Gemini run → escalate the fix model to Opus
+      * fixed code identical to an earlier attempt (the loop is cycling),
+        or the same error ``abort_after`` times in a row once nothing is
+        left to escalate → abort
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .auto_fixer import error_signature
+from .llm_client import claude_model_for
+
+
+@dataclass
+class AttemptOutcome:
+    attempt: int
+    error_signature: str
+    code_hash: str
+    llm_name: str
+    context: str
+
+
+@dataclass
+class RetryDecision:
+    action: str                 # "fix" | "abort"
+    llm_name: str
+    context: str                # "scoped" | "full"
+    reasons: list[str] = field(default_factory=list)
+    policy: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def make_outcome(attempt: int, code: str, error_text: str, llm_name: str, context: str) -> AttemptOutcome:
+    return AttemptOutcome(
+        attempt=attempt,
+        error_signature=error_signature(error_text) or error_text.strip().split("\n")[-1][:200],
+        code_hash=code_hash(code),
+        llm_name=llm_name,
+        context=context,
+    )
+
+
+def is_top_model(llm_name: str) -> bool:
+    return llm_name != "gemini" and "opus" in claude_model_for(llm_name)
+
+
+class RetryPolicy:
+    name = "static"
+
+    def decide(
+        self,
+        history: list[AttemptOutcome],
+        llm_name: str,
+        can_escalate: bool = True,
+    ) -> RetryDecision:
+        return RetryDecision("fix", llm_name, "scoped", policy=self.name)
+
+
+class AdaptiveRetryPolicy(RetryPolicy):
+    name = "adaptive"
+
+    def __init__(self, escalate_after: int = 2, escalation_llm: str = "claude-opus", abort_after: int = 3):
+        self.escalate_after = escalate_after
+        self.escalation_llm = escalation_llm
+        self.abort_after = abort_after
+
+    def decide(
+        self,
+        history: list[AttemptOutcome],
+        llm_name: str,
+        can_escalate: bool = True,
+    ) -> RetryDecision:
+        current = history[-1]
+        earlier = history[:-1]
+        reasons: list[str] = []
+
+        repeats = 1
+        for outcome in reversed(earlier):
+            if outcome.error_signature != current.error_signature:
+                break
+            repeats += 1
+        cycling = any(o.code_hash == current.code_hash for o in earlier)
+
+        context = "scoped"
+        if repeats > 1:
+            context = "full"
+            reasons.append(f"same error {repeats}x in a row → full context")
+        if cycling:
+            context = "full"
+            reasons.append("code identical to an earlier attempt")
+
+        next_llm = llm_name
+        escalation_open = can_escalate and not is_top_model(llm_name)
+        if escalation_open and (len(history) >= self.escalate_after or repeats > 1 or cycling):
+            next_llm = self.escalation_llm
+            reasons.append(f"escalate {llm_name} → {next_llm} after {len(history)} failure(s)")
+
+        if next_llm == llm_name and not escalation_open:
+            if cycling and current.context == "full":
+                return RetryDecision("abort", llm_name, context, reasons + ["no strategy left"], self.name)
+            if repeats >= self.abort_after:
+                return RetryDecision(
+                    "abort", llm_name, context,
+                    reasons + [f"error repeated {repeats}x with nothing left to escalate"], self.name,
+                )
+
+        if not reasons:
+            reasons.append("new error → scoped context")
+        return RetryDecision("fix", next_llm, context, reasons, self.name)
+
+
+def make_retry_policy(
+    name: str,
+    escalate_after: int = 2,
+    escalation_llm: str = "claude-opus",
+    abort_after: int = 3,
+) -> RetryPolicy:
+    if name == "static":
+        return RetryPolicy()
+    if name == "adaptive":
+        return AdaptiveRetryPolicy(escalate_after, escalation_llm, abort_after)
+    raise ValueError(f"Unknown retry policy: {name!r} (expected 'static' or 'adaptive')")
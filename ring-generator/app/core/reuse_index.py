@@ -0,0 +1,199 @@
+"""
+Lexical reuse cache of successful generations.
+
+Many production prompts are near-duplicates ("classic solitaire diamond
+ring, platinum" and its rewordings).  Every successful text-only
+generation is indexed by its normalised prompt:
+
+  - lower-cased, stemmed, stopwords removed (same rules as the master
+    prompt index), numbers kept ("1.5", "6")
+  - stored in SQLite (``reuse_index.sqlite3`` under the storage dir) with
+    an FTS5 table for candidate lookup; without FTS5 every entry is scanned
+
+A new prompt is scored against the candidates by TF-IDF cosine
+similarity.  Prompts whose numbers differ (carat, size, stone count)
+never match.  The job manager returns the cached session above the reuse
+threshold, or seeds an edit from it above the lower edit threshold, and
+reports the reuse rate and the estimated cost / time saved.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from .prompt_index import _STOPWORDS, _stem
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9]{2,}|\d+(?:\.\d+)?")
+_NUMBER_RE = re.compile(r"^\d")
+_CANDIDATES = 20
+
+
+def normalize_prompt(prompt: str) -> list[str]:
+    """Normalised tokens of a prompt (order kept, duplicates kept)."""
+    tokens = [t if _NUMBER_RE.match(t) else _stem(t) for t in _TOKEN_RE.findall((prompt or "").lower())]
+    return [t for t in tokens if t not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class ReuseMatch:
+    session_id: str
+    prompt: str
+    similarity: float
+    llm_name: str
+    cost_usd: float
+    elapsed_seconds: float
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "source_session_id": self.session_id,
+            "source_prompt": self.prompt,
+            "similarity": round(self.similarity, 4),
+        }
+
+
+class ReuseIndex:
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "session_id TEXT PRIMARY KEY, prompt TEXT, normalized TEXT, llm_name TEXT, "
+            "cost_usd REAL, elapsed_seconds REAL, created TEXT)"
+        )
+        try:
+            # "." is a token character so "1.5" stays one term
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5("
+                "normalized, session_id UNINDEXED, tokenize=\"unicode61 tokenchars '.'\")"
+            )
+            self._fts = True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite has no FTS5 — reuse lookups scan every entry")
+            self._fts = False
+        self._db.commit()
+
+        # document frequencies for the IDF weights
+        self._df: Counter[str] = Counter()
+        for (normalized,) in self._db.execute("SELECT normalized FROM entries"):
+            self._df.update(set(normalized.split()))
+        self._count = sum(1 for _ in self._db.execute("SELECT 1 FROM entries"))
+
+        self.lookups = 0
+        self.hits: Counter[str] = Counter()      # "cached" / "edit" / "edit_failed" → count
+        self.saved_cost_usd = 0.0
+        self.saved_seconds = 0.0
+
+    # -- index ----------------------------------------------------------
+
+    def add(self, session_id: str, prompt: str, llm_name: str, cost_usd: float, elapsed_seconds: float) -> None:
+        tokens = normalize_prompt(prompt)
+        if not tokens:
+            return
+        normalized = " ".join(tokens)
+        with self._lock:
+            self._remove(session_id)
+            self._db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session_id, prompt, normalized, llm_name, cost_usd, elapsed_seconds, datetime.now().isoformat()),
+            )
+            if self._fts:
+                self._db.execute("INSERT INTO entries_fts VALUES (?, ?)", (normalized, session_id))
+            self._db.commit()
+            self._df.update(set(tokens))
+            self._count += 1
+
+    def discard(self, session_id: str) -> None:
+        """Drop a session whose code no longer matches its prompt (e.g. after an edit)."""
+        with self._lock:
+            self._remove(session_id)
+            self._db.commit()
+
+    def _remove(self, session_id: str) -> None:
+        row = self._db.execute("SELECT normalized FROM entries WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return
+        self._db.execute("DELETE FROM entries WHERE session_id = ?", (session_id,))
+        if self._fts:
+            self._db.execute("DELETE FROM entries_fts WHERE session_id = ?", (session_id,))
+        self._df.subtract(set(row[0].split()))
+        self._count -= 1
+
+    # -- lookup ---------------------------------------------------------
+
+    def _vector(self, tokens: list[str]) -> dict[str, float]:
+        n = max(self._count, 1)
+        return {
+            t: c * (math.log((n + 1) / (self._df.get(t, 0) + 1)) + 1)
+            for t, c in Counter(tokens).items()
+        }
+
+    @staticmethod
+    def _cosine(a: dict[str, float], b: dict[str, float]) -> float:
+        dot = sum(w * b.get(t, 0.0) for t, w in a.items())
+        norm = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
+
+    def lookup(self, prompt: str, min_similarity: float) -> ReuseMatch | None:
+        """Most similar indexed session at or above ``min_similarity``."""
+        tokens = normalize_prompt(prompt)
+        with self._lock:
+            self.lookups += 1
+            if not tokens or not self._count:
+                return None
+            if self._fts:
+                query = " OR ".join('"' + t + '"' for t in sorted(set(tokens)))
+                rows = self._db.execute(
+                    "SELECT e.session_id, e.prompt, e.normalized, e.llm_name, e.cost_usd, e.elapsed_seconds "
+                    "FROM entries_fts f JOIN entries e ON e.session_id = f.session_id "
+                    "WHERE entries_fts MATCH ? ORDER BY bm25(entries_fts) LIMIT ?",
+                    (query, _CANDIDATES),
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT session_id, prompt, normalized, llm_name, cost_usd, elapsed_seconds FROM entries"
+                ).fetchall()
+            query_vector = self._vector(tokens)
+            numbers = {t for t in tokens if _NUMBER_RE.match(t)}
+
+            best: ReuseMatch | None = None
+            for session_id, source_prompt, normalized, llm_name, cost, elapsed in rows:
+                candidate = normalized.split()
+                if {t for t in candidate if _NUMBER_RE.match(t)} != numbers:
+                    continue
+                similarity = self._cosine(query_vector, self._vector(candidate))
+                if similarity >= min_similarity and (best is None or similarity > best.similarity):
+                    best = ReuseMatch(session_id, source_prompt, similarity, llm_name, cost, elapsed)
+            return best
+
+    # -- stats ----------------------------------------------------------
+
+    def record_hit(self, mode: str, saved_cost_usd: float, saved_seconds: float) -> None:
+        """Savings are negative for a failed seeded edit (its cost is spent on top of the generation)."""
+        with self._lock:
+            self.hits[mode] += 1
+            self.saved_cost_usd += saved_cost_usd
+            self.saved_seconds += saved_seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        hits = self.hits["cached"] + self.hits["edit"]
+        return {
+            "entries": self._count,
+            "fts5": self._fts,
+            "lookups": self.lookups,
+            "hits": dict(self.hits),
+            "reuse_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+            "saved_cost_usd": round(self.saved_cost_usd, 4),
+            "saved_seconds": round(self.saved_seconds, 2),
+        }
@@ -0,0 +1,243 @@
+"""
+Source map for the assembled Blender script and a structured traceback parser.
+
+``ring_script.py`` is not the code the LLM wrote:
+
+    prelude          SCENE_PRELUDE (scene clear + preloaded helpers)
+    code             the LLM code, with _SAFE_HELPER inserted after the last
+                     import and the ``__main__`` guard collapsed to one line
+    injected         build() + export, isolation / budget / incremental code
+
+``assemble`` records the origin of every script line while building it, so
+a traceback frame maps back to the original line (or to the injected part
+it came from) without re-deriving offsets.  ``parse_blender_error`` turns
+Blender's output into one ``BlenderError``: exception, mapped frames, the
+innermost frame in the LLM code with its source line and enclosing
+function, and the remaining error output de-duplicated and stripped of
+Blender noise.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from .code_processor import (
+    _MAIN_GUARD_RE,
+    _SAFE_HELPER,
+    preprocess_code,
+    safety_insert_index,
+    strip_main_guard,
+)
+
+_FRAME_RE = re.compile(r'^\s*File "([^"]+)", line (\d+)(?:, in (\S+))?\s*$')
+_EXCEPTION_LINE_RE = re.compile(r"^(\w+(?:\.\w+)*(?:Error|Exception|Interrupt|Exit|Warning))(?::\s?(.*))?$")
+_MAX_OTHER_LINES = 12
+
+# Blender / driver chatter that matches the old "error" heuristic but never helps a fix
+_NOISE_RE = re.compile(
+    r"not freed memory blocks|color management|read prefs|read blend|blender quit|"
+    r"^\s*fra:|^al lib|alsa|unable to open a display|gpu|warning: .*deprecated|"
+    r"===\w+_(START|END)===|^\[\{\"function\"|saved \"|^\s*\^+\s*$|location: <unknown location>",
+    re.IGNORECASE,
+)
+
+
+# ---------------------------------------------------------------------------
+# Source map
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class SourceMap:
+    # per script line (index = line - 1): (segment, 1-based line in the original code or None)
+    origins: tuple[tuple[str, int | None], ...]
+
+    def lookup(self, script_line: int) -> tuple[str, int | None]:
+        if 1 <= script_line <= len(self.origins):
+            return self.origins[script_line - 1]
+        return "injected", None
+
+    def code_line(self, script_line: int) -> int | None:
+        segment, line = self.lookup(script_line)
+        return line if segment == "code" else None
+
+
+def assemble(code: str, prelude: str) -> tuple[str, SourceMap]:
+    """``prelude`` + preprocessed code (safety helper, main guard stripped), with its source map."""
+    origins: list[tuple[str, int | None]] = [("prelude", None)] * prelude.count("\n")
+
+    code_origins: list[tuple[str, int | None]] = [("code", i + 1) for i in range(len(code.split("\n")))]
+    insert_at = safety_insert_index(code)
+    helper_lines = _SAFE_HELPER.count("\n") + 1
+    code_origins[insert_at:insert_at] = [("safety_helper", None)] * helper_lines
+    processed = preprocess_code(code)
+
+    # strip_main_guard: the guard + build() call collapse into one comment line
+    for match in reversed(list(_MAIN_GUARD_RE.finditer(processed))):
+        start = processed.count("\n", 0, match.start())
+        removed = match.group(0).count("\n")
+        del code_origins[start + 1:start + 1 + removed]
+    processed = strip_main_guard(processed)
+
+    return prelude + processed, SourceMap(tuple(origins + code_origins))
+
+
+# ---------------------------------------------------------------------------
+# Traceback parsing
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ErrorFrame:
+    script_line: int
+    segment: str                # "code" | "prelude" | "safety_helper" | "injected" | "external"
+    line: int | None            # original code line (segment == "code")
+    function: str = ""
+    source: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "script_line": self.script_line, "segment": self.segment,
+            "line": self.line, "function": self.function, "source": self.source,
+        }
+
+
+@dataclass
+class BlenderError:
+    exc_type: str
+    message: str
+    frames: list[ErrorFrame] = field(default_factory=list)
+    other_lines: list[str] = field(default_factory=list)
+
+    @property
+    def headline(self) -> str:
+        return f"{self.exc_type}: {self.message}" if self.message else self.exc_type
+
+    @property
+    def location(self) -> ErrorFrame | None:
+        """Innermost frame in the LLM's code."""
+        return next((f for f in reversed(self.frames) if f.segment == "code"), None)
+
+    def frame_lines(self) -> list[str]:
+        """``line N in fn(): source`` per frame in the LLM's code, outermost first."""
+        lines: list[str] = []
+        for frame in self.frames:
+            if frame.segment == "code":
+                where = f" in {frame.function}()" if frame.function else ""
+                lines.append(f"  line {frame.line}{where}: {frame.source}")
+        return lines
+
+    def format(self) -> str:
+        """Error block for fix prompts; the exception line comes last."""
+        parts: list[str] = []
+        if self.other_lines:
+            parts.append("OTHER BLENDER OUTPUT (deduplicated):")
+            parts.extend(f"  {line}" for line in self.other_lines)
+        frame_lines = self.frame_lines()
+        if frame_lines:
+            parts.append("TRACEBACK (your script's line numbers, outermost first):")
+            parts.extend(frame_lines)
+        location = self.location
+        if location is not None:
+            where = f" in {location.function}()" if location.function else ""
+            parts.append(f"LOCATION: line {location.line}{where}: {location.source}")
+        elif self.frames:
+            parts.append(f"LOCATION: outside your code ({self.frames[-1].segment})")
+        parts.append(self.headline)
+        return "\n".join(parts)
+
+    def to_dict(self) -> dict[str, Any]:
+        location = self.location
+        return {
+            "exc_type": self.exc_type,
+            "message": self.message,
+            "location": location.to_dict() if location else None,
+            "frames": [f.to_dict() for f in self.frames],
+        }
+
+
+def _enclosing_functions(code: str) -> list[tuple[int, int, str]]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    return [
+        (node.lineno, node.end_lineno or node.lineno, node.name)
+        for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+
+
+def _tracebacks(text: str) -> list[tuple[list[tuple[str, int, str]], str, str]]:
+    """(frames, exc_type, message) per traceback block in ``text``."""
+    blocks: list[tuple[list[tuple[str, int, str]], str, str]] = []
+    frames: list[tuple[str, int, str]] = []
+    in_block = False
+    for raw in text.split("\n"):
+        line = raw.rstrip()
+        # Blender prefixes uncaught script errors with "Error: Python: "
+        if "Traceback (most recent call last)" in line:
+            frames, in_block = [], True
+            continue
+        frame = _FRAME_RE.match(line)
+        if frame:
+            if not in_block:            # SyntaxError reports start with a bare File line
+                frames, in_block = [], True
+            frames.append((frame.group(1), int(frame.group(2)), frame.group(3) or ""))
+            continue
+        if in_block and line and not line.startswith(" "):
+            exc = _EXCEPTION_LINE_RE.match(line)
+            if exc:
+                blocks.append((frames, exc.group(1), (exc.group(2) or "").strip()))
+                in_block = False
+            elif not line.startswith("During handling") and not line.startswith("The above exception"):
+                in_block = False
+    return blocks
+
+
+def clean_error_lines(text: str, limit: int = 20) -> list[str]:
+    """Error-looking output lines, de-duplicated, without traceback frames or Blender noise."""
+    seen: set[str] = set()
+    lines: list[str] = []
+    for raw in text.split("\n"):
+        line = raw.strip()
+        if not line or line in seen:
+            continue
+        if not ("Error" in line or "Traceback" in line or "error" in line.lower()):
+            continue
+        if "Traceback (most recent" in line or _FRAME_RE.match(raw) or _NOISE_RE.search(line):
+            continue
+        seen.add(line)
+        lines.append(line)
+        if len(lines) >= limit:
+            break
+    return lines
+
+
+def parse_blender_error(output: str, code: str, source_map: SourceMap) -> BlenderError | None:
+    """Structured error for the last traceback in ``output`` (stdout + stderr); None if there is none."""
+    blocks = _tracebacks(output)
+    if not blocks:
+        return None
+    raw_frames, exc_type, message = blocks[-1]
+
+    code_lines = code.split("\n")
+    functions = _enclosing_functions(code)
+    frames: list[ErrorFrame] = []
+    for filename, script_line, function in raw_frames:
+        if not filename.endswith("ring_script.py"):
+            frames.append(ErrorFrame(script_line, "external", None, function))
+            continue
+        segment, line = source_map.lookup(script_line)
+        frame = ErrorFrame(script_line, segment, line, function)
+        if line is not None and 1 <= line <= len(code_lines):
+            frame.source = code_lines[line - 1].strip()
+            frame.function = next((name for start, end, name in functions if start <= line <= end), "")
+        frames.append(frame)
+
+    headline = f"{exc_type}: {message}" if message else exc_type
+    other = [
+        line for line in clean_error_lines(output)
+        if line != headline and not line.startswith(f"{exc_type}:")
+    ][:_MAX_OTHER_LINES]
+    return BlenderError(exc_type, message, frames, other)
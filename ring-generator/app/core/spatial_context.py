@@ -0,0 +1,210 @@
+"""
+Relevance-ranked spatial context for fix prompts.
+
+The spatial report is one multi-line block per mesh in scene order, so
+``spatial_report[:3000]`` showed the first dozen meshes of a big ring and
+cut off the rest — usually not the ones the failing function builds.
+``select_spatial_context`` parses the report and ranks meshes by:
+
+  - ``fn``        named by a string literal / f-string prefix in a failing
+                  function or one of its direct callees (``"Prong_{i}"``)
+  - ``no_faces``  mesh with zero faces (failed face creation)
+  - ``outlier``   bbox centre far from the rest of the ring
+  - ``detached``  bbox touches no other mesh's bbox
+
+then serialises them as one table row each until ``max_chars`` is reached.
+Unflagged meshes fill any remaining room.
+"""
+
+from __future__ import annotations
+
+import ast
+import re
+from dataclasses import dataclass, field
+from statistics import median
+
+_NUMBERS_RE = re.compile(r"-?\d+(?:\.\d+)?(?:e-?\d+)?")
+_BLENDER_SUFFIX_RE = re.compile(r"\.\d{3}$")
+_MIN_PREFIX = 3
+_OUTLIER_FACTOR = 3.0
+# floor of the typical distance (fraction of the scene diagonal): concentric
+# parts put the median distance near zero
+_OUTLIER_MIN_SPREAD = 0.25
+_TOUCH_TOLERANCE = 0.02      # fraction of the scene diagonal
+
+_SCORES = {"fn": 8, "no_faces": 6, "outlier": 4, "detached": 3}
+
+
+@dataclass
+class MeshInfo:
+    name: str
+    verts: int = 0
+    faces: int = 0
+    bbox_min: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    bbox_max: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    modifiers: str = ""
+    flags: list[str] = field(default_factory=list)
+
+    @property
+    def center(self) -> tuple[float, ...]:
+        return tuple((a + b) / 2 for a, b in zip(self.bbox_min, self.bbox_max))
+
+    @property
+    def size(self) -> tuple[float, ...]:
+        return tuple(b - a for a, b in zip(self.bbox_min, self.bbox_max))
+
+    @property
+    def score(self) -> int:
+        return sum(_SCORES[f] for f in self.flags)
+
+    def row(self) -> str:
+        center = ",".join(f"{v:.3f}" for v in self.center)
+        size = ",".join(f"{v:.3f}" for v in self.size)
+        return (
+            f"{self.name} | {self.verts}/{self.faces} | {center} | {size} | "
+            f"{self.modifiers or '-'} | {' '.join(self.flags) or '-'}"
+        )
+
+
+def _triple(text: str) -> tuple[float, float, float]:
+    values = [float(v) for v in _NUMBERS_RE.findall(text)[:3]]
+    return tuple(values + [0.0] * (3 - len(values)))  # type: ignore[return-value]
+
+
+def parse_spatial_report(report: str) -> tuple[list[MeshInfo], list[str]]:
+    """(meshes, other report lines such as the geometry budget summary)."""
+    meshes: list[MeshInfo] = []
+    other: list[str] = []
+    current: MeshInfo | None = None
+    for raw in report.split("\n"):
+        line = raw.strip()
+        if line.startswith("MESH: "):
+            current = MeshInfo(name=line[len("MESH: "):])
+            meshes.append(current)
+        elif line == "---":
+            current = None
+        elif current is not None and ":" in line:
+            key, _, value = line.partition(":")
+            if key == "Geometry":
+                counts = [int(float(v)) for v in _NUMBERS_RE.findall(value)]
+                if len(counts) >= 3:
+                    current.verts, current.faces = counts[0], counts[2]
+            elif key == "BBox Min":
+                current.bbox_min = _triple(value)
+            elif key == "BBox Max":
+                current.bbox_max = _triple(value)
+            elif key == "Modifiers":
+                current.modifiers = ",".join(re.findall(r"'(\w+)'", value))
+        elif line and not line.startswith(("Location", "Rotation", "Scale", "Parent")):
+            other.append(line)
+    return meshes, other
+
+
+def function_name_patterns(code: str, functions: list[str]) -> tuple[set[str], set[str]]:
+    """(exact names, f-string prefixes) used in ``functions`` and their direct callees."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set(), set()
+    defs = {n.name: n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))}
+    scope = [defs[f] for f in functions if f in defs]
+    callees = {
+        n.func.id for fn in scope for n in ast.walk(fn)
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in defs
+    }
+    scope += [defs[c] for c in callees - set(functions)]
+
+    exact: set[str] = set()
+    prefixes: set[str] = set()
+    for fn in scope:
+        for node in ast.walk(fn):
+            if isinstance(node, ast.JoinedStr):
+                head = node.values[0] if node.values else None
+                if isinstance(head, ast.Constant) and isinstance(head.value, str):
+                    if len(head.value) >= _MIN_PREFIX:
+                        prefixes.add(head.value)
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                if len(node.value) >= _MIN_PREFIX and "\n" not in node.value:
+                    exact.add(node.value)
+    return exact, prefixes
+
+
+def _touches(a: MeshInfo, b: MeshInfo, tol: float) -> bool:
+    return all(
+        a.bbox_min[i] - tol <= b.bbox_max[i] and b.bbox_min[i] - tol <= a.bbox_max[i]
+        for i in range(3)
+    )
+
+
+def _flag(meshes: list[MeshInfo], exact: set[str], prefixes: set[str]) -> None:
+    for mesh in meshes:
+        base = _BLENDER_SUFFIX_RE.sub("", mesh.name)
+        # mk("Band", ...) names the mesh datablock "Band_mesh" — both forms count
+        if base in exact or any(base.startswith(p) for p in prefixes) or (
+            base.endswith("_mesh") and base[:-5] in exact
+        ):
+            mesh.flags.append("fn")
+        if mesh.faces == 0:
+            mesh.flags.append("no_faces")
+
+    if len(meshes) < 3:
+        return
+    lo = [min(m.bbox_min[i] for m in meshes) for i in range(3)]
+    hi = [max(m.bbox_max[i] for m in meshes) for i in range(3)]
+    diagonal = sum((h - l) ** 2 for l, h in zip(lo, hi)) ** 0.5
+    mid = [median(m.center[i] for m in meshes) for i in range(3)]
+    distances = [sum((m.center[i] - mid[i]) ** 2 for i in range(3)) ** 0.5 for m in meshes]
+    typical = max(median(distances), _OUTLIER_MIN_SPREAD * diagonal)
+    tol = _TOUCH_TOLERANCE * diagonal
+    for mesh, distance in zip(meshes, distances):
+        if typical > 0 and distance > _OUTLIER_FACTOR * typical:
+            mesh.flags.append("outlier")
+        if not any(_touches(mesh, other, tol) for other in meshes if other is not mesh):
+            mesh.flags.append("detached")
+
+
+def select_spatial_context(
+    report: str,
+    code: str = "",
+    failing_functions: list[str] | None = None,
+    max_chars: int = 1500,
+) -> str:
+    """Compact table of the most relevant meshes in ``report`` (plain truncation if it has none)."""
+    meshes, other = parse_spatial_report(report)
+    if not meshes:
+        return report[:max_chars]
+
+    functions = [f for f in failing_functions or [] if f]
+    exact, prefixes = function_name_patterns(code, functions) if code and functions else (set(), set())
+    _flag(meshes, exact, prefixes)
+    ranked = sorted(meshes, key=lambda m: -m.score)
+
+    focus = f"{', '.join(f + '()' for f in functions)}, then anomalies" if functions else "anomalies"
+
+    def _summary(shown: int) -> str:
+        return (
+            f"{len(meshes)} meshes, {shown} shown (ranked by relation to {focus}); flags: "
+            f"fn=built by the failing code, no_faces, outlier=far from the ring, detached=touches nothing"
+        )
+
+    header = [_summary(len(meshes)), "name | verts/faces | bbox center x,y,z | bbox size x,y,z | modifiers | flags"]
+    # geometry budget summary / reductions, not the per-object evaluated counts
+    footer = [line for line in other if not line.endswith("faces evaluated")][:4]
+    # room for the "... N more meshes omitted" line
+    budget = max_chars - sum(len(line) + 1 for line in header + footer) - 50
+
+    rows: list[str] = []
+    for mesh in ranked:
+        row = mesh.row()
+        if budget - len(row) - 1 < 0:
+            break
+        rows.append(row)
+        budget -= len(row) + 1
+
+    omitted = len(meshes) - len(rows)
+    header[0] = _summary(len(rows))
+    lines = header + rows
+    if omitted:
+        flagged = sum(1 for m in ranked[len(rows):] if m.flags)
+        lines.append(f"... {omitted} more meshes omitted ({flagged} flagged)")
+    return "\n".join(lines + footer)
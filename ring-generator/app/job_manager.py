@@ -6,24 +6,49 @@ Provides:
   - Per-job progress tracking (compatible with Temporal polling)
   - TTL-based cleanup of completed job records
   - Thread-safe submit / get / cancel / wait operations
+  - Batch tier: priority="batch" jobs are grouped into batch LLM requests
+    and run by dedicated batch workers once their results arrive
+  - Session edits (one at a time per session) with the same pipeline settings
+  - Reuse cache: near-duplicate text prompts are served from (or seeded by)
+    an earlier successful session
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
+import time
 import uuid
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Callable
 
+from shared.artifact_resolver import prune_cache
+
 from .config import RingGenSettings
-from .core.pipeline import generate_ring
-from .schemas import GenerateJobStatus, GenerateRequest, GenerateResult, JobRecordView
+from .core.batch_client import BatchBackend, BatchItem, make_batch_backend
+from .core.image_normalizer import ImageNormalizer
+from .core.llm_client import LLMResponse, claude_model_for
+from .core.pipeline import (
+    edit_ring,
+    generate_ring,
+    generate_variants,
+    prepare_generation_call,
+    reuse_session,
+    seed_edit,
+)
+from .core.prompt_index import MasterPromptIndex
+from .core.reuse_index import ReuseIndex, ReuseMatch
+from .core.retry_policy import make_retry_policy
+from .schemas import EditRequest, GenerateJobStatus, GenerateRequest, GenerateResult, JobRecordView
 
 logger = logging.getLogger(__name__)
 
+# reads of an ended batch's results before its jobs fall back to interactive
+_BATCH_READ_ATTEMPTS = 3
+
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
@@ -42,6 +67,8 @@ class JobRecord:
     result: GenerateResult | None = None
     error: dict[str, Any] | None = None
     done_event: asyncio.Event = field(default_factory=asyncio.Event)
+    batch_id: str | None = None
+    prefetched_response: LLMResponse | None = None
 
     def as_view(self) -> JobRecordView:
         return JobRecordView(
@@ -55,7 +82,10 @@ class JobRecord:
             request_summary={
                 "prompt": (self.request.prompt or "")[:100],
                 "llm_name": self.request.llm_name,
-                "has_image": bool(self.request.image_b64),
+                "has_image": self.request.has_image,
+                "priority": self.request.priority,
+                "batch_id": self.batch_id,
+                "variants": self.request.variants,
             },
             result=self.result,
             error=self.error,
@@ -66,35 +96,79 @@ class GenerateJobManager:
     def __init__(self, settings: RingGenSettings, system_prompt: str):
         self.settings = settings
         self.system_prompt = system_prompt
+        self.prompt_index = MasterPromptIndex(system_prompt) if settings.filter_master_prompt else None
+        self.image_normalizer = (
+            ImageNormalizer(settings.image_cache_dir, settings.image_jpeg_quality)
+            if settings.normalize_images else None
+        )
+        self.reuse_index = ReuseIndex(settings.reuse_index_path) if settings.reuse_cache else None
+        self.retry_policy = make_retry_policy(
+            settings.retry_policy,
+            escalate_after=settings.retry_escalate_after,
+            escalation_llm=settings.retry_escalation_llm,
+            abort_after=settings.retry_abort_after,
+        )
         self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.max_queue_size)
         self.jobs: dict[str, JobRecord] = {}
         self._workers: list[asyncio.Task] = []
         self._cleanup_task: asyncio.Task | None = None
         self._lock = asyncio.Lock()
+        # per-session edit lock and the number of edits holding / awaiting it
+        self._edit_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+        # interactive workers and session edits share max_concurrent_jobs slots
+        self._job_slots = asyncio.Semaphore(settings.max_concurrent_jobs)
+        self._edits_waiting = 0
+
+        # Batch tier
+        self.batch_ready: asyncio.Queue[str] = asyncio.Queue()
+        self._batch_backend: BatchBackend | None = None
+        self._batch_pending: list[str] = []
+        self._batch_pending_since = 0.0
+        self._batch_inflight: dict[str, dict[str, str]] = {}   # batch_id → custom_id → job_id
+        self._batch_read_failures: dict[str, int] = {}
+        self._batch_task: asyncio.Task | None = None
 
     async def startup(self) -> None:
         worker_count = self.settings.max_concurrent_jobs
         for idx in range(worker_count):
             self._workers.append(
-                asyncio.create_task(self._worker_loop(idx), name=f"ring-gen-worker-{idx}")
+                asyncio.create_task(self._worker_loop(idx, self.queue), name=f"ring-gen-worker-{idx}")
+            )
+        for idx in range(self.settings.batch_workers):
+            self._workers.append(
+                asyncio.create_task(
+                    self._worker_loop(worker_count + idx, self.batch_ready),
+                    name=f"ring-gen-batch-worker-{idx}",
+                )
             )
         self._cleanup_task = asyncio.create_task(self._cleanup_loop(), name="ring-gen-cleanup")
-        logger.info("ring_gen_job_manager_started workers=%s", worker_count)
+        self._batch_task = asyncio.create_task(self._batch_loop(), name="ring-gen-batch")
+        logger.info(
+            "ring_gen_job_manager_started workers=%s batch_workers=%s",
+            worker_count, self.settings.batch_workers,
+        )
 
     async def shutdown(self) -> None:
         for task in self._workers:
             task.cancel()
         await asyncio.gather(*self._workers, return_exceptions=True)
         self._workers.clear()
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            await asyncio.gather(self._cleanup_task, return_exceptions=True)
-            self._cleanup_task = None
+        for attr in ("_cleanup_task", "_batch_task"):
+            task = getattr(self, attr)
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                setattr(self, attr, None)
 
     async def submit(self, request: GenerateRequest, job_id: str | None = None) -> JobRecord:
         async with self._lock:
-            if self.queue.full():
+            batch = request.priority == "batch"
+            if batch and len(self._batch_pending) >= self.settings.batch_max_pending:
+                raise RuntimeError("Batch queue is full, retry later")
+            if not batch and self.queue.full():
                 raise RuntimeError("Job queue is full, retry later")
+            if request.variants > self.settings.max_variants:
+                raise RuntimeError(f"At most {self.settings.max_variants} variants per job")
 
             _id = job_id or request.request_id or str(uuid.uuid4())
             if _id in self.jobs:
@@ -107,7 +181,13 @@ class GenerateJobManager:
                 created_at=_utc_now(),
             )
             self.jobs[_id] = record
-            self.queue.put_nowait(_id)
+            if batch:
+                if not self._batch_pending:
+                    self._batch_pending_since = time.monotonic()
+                self._batch_pending.append(_id)
+                record.detail = "Waiting for batch submission"
+            else:
+                self.queue.put_nowait(_id)
             return record
 
     async def wait_for_completion(self, job_id: str, timeout_seconds: int) -> JobRecord:
@@ -139,8 +219,168 @@ class GenerateJobManager:
             return record
         raise RuntimeError("Running jobs cannot be force-cancelled safely")
 
+    def batch_snapshot(self) -> dict[str, Any]:
+        return {
+            "backend": self.settings.batch_backend,
+            "pending": len(self._batch_pending),
+            "in_flight_batches": len(self._batch_inflight),
+            "in_flight_jobs": sum(len(m) for m in self._batch_inflight.values()),
+            "ready": self.batch_ready.qsize(),
+        }
+
+    def _pipeline_options(self) -> dict[str, Any]:
+        """Settings-derived pipeline arguments shared by generation jobs and edits."""
+        return dict(
+            system_prompt=self.system_prompt,
+            sessions_dir=self.settings.sessions_dir,
+            blender_executable=str(self.settings.blender_executable),
+            blender_timeout=self.settings.blender_timeout_seconds,
+            anthropic_api_key=self.settings.anthropic_key_pool,
+            gemini_api_key=self.settings.gemini_key_pool,
+            gemini_model=self.settings.gemini_model,
+            max_retries=self.settings.max_error_retries,
+            max_cost_usd=self.settings.max_cost_per_request_usd,
+            patch_mode=self.settings.patch_fixes,
+            prompt_index=self.prompt_index,
+            scoped_fixes=self.settings.scoped_fixes,
+            conversational_fixes=self.settings.conversational_fixes,
+            auto_fixes=self.settings.auto_fixes,
+            retry_policy=self.retry_policy,
+            isolate_functions=self.settings.isolate_functions,
+            max_polygons=self.settings.max_scene_polygons,
+            incremental=self.settings.incremental_builds,
+            spatial_context_chars=self.settings.spatial_context_chars,
+            profile=self.settings.profile_blender,
+            profile_top_n=self.settings.profile_top_n,
+        )
+
+    async def edit_session(self, session_id: str, request: EditRequest) -> GenerateResult:
+        """
+        Apply an edit to a stored session.  Edits take a job slot like queued
+        generations (so they count against ``max_concurrent_jobs``), are
+        refused while the queue is full and fail after
+        ``sync_wait_timeout_seconds``; edits of one session run one at a time.
+        """
+        if self.queue.qsize() + self._edits_waiting >= self.settings.max_queue_size:
+            raise RuntimeError("Job queue is full, retry later")
+        try:
+            return await asyncio.wait_for(
+                self._run_edit(session_id, request),
+                timeout=self.settings.sync_wait_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(
+                f"Edit of '{session_id}' did not finish within {self.settings.sync_wait_timeout_seconds}s"
+            )
+
+    async def _run_edit(self, session_id: str, request: EditRequest) -> GenerateResult:
+        lock, users = self._edit_locks.get(session_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._edit_locks[session_id] = (lock, users + 1)
+        self._edits_waiting += 1
+        waiting = True
+        try:
+            async with lock, self._job_slots:
+                self._edits_waiting -= 1
+                waiting = False
+                options = dict(self._pipeline_options())
+                # edits always return changed functions only (the point of the endpoint)
+                options["patch_mode"] = True
+                result = await edit_ring(session_id, request, **options)
+        finally:
+            if waiting:
+                self._edits_waiting -= 1
+            lock, users = self._edit_locks[session_id]
+            if users > 1:
+                self._edit_locks[session_id] = (lock, users - 1)
+            else:
+                del self._edit_locks[session_id]
+        if result.success and self.reuse_index is not None:
+            # the session's code no longer answers its prompt
+            self.reuse_index.discard(session_id)
+        return result
+
+    def reuse_snapshot(self) -> dict[str, Any]:
+        if self.reuse_index is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.reuse_index.snapshot()}
+
+    # ------------------------------------------------------------------
+    # Generation (with the reuse cache in front)
+    # ------------------------------------------------------------------
+
+    async def _generate(self, record: JobRecord, options: dict[str, Any]) -> GenerateResult:
+        if record.request.variants > 1:
+            return await generate_variants(**options)
+        match = self._reuse_candidate(record)
+        if match is not None:
+            result = await self._reuse(record, match, options)
+            if result is not None:
+                return result
+        result = await generate_ring(**options, prefetched_response=record.prefetched_response)
+        self._index_result(record.request, result)
+        return result
+
+    def _reuse_candidate(self, record: JobRecord) -> ReuseMatch | None:
+        request = record.request
+        if (
+            self.reuse_index is None or not request.reuse or not request.prompt
+            or request.has_image or record.prefetched_response is not None
+        ):
+            return None
+        thresholds = [self.settings.reuse_threshold, self.settings.reuse_edit_threshold]
+        return self.reuse_index.lookup(request.prompt, min(t for t in thresholds if t > 0))
+
+    async def _reuse(self, record: JobRecord, match: ReuseMatch, options: dict[str, Any]) -> GenerateResult | None:
+        """Result served from ``match``, or None to generate normally."""
+        assert self.reuse_index is not None
+        mode = "cached" if match.similarity >= self.settings.reuse_threshold else "edit"
+        record.detail = f"Reusing session {match.session_id} ({mode}, similarity {match.similarity:.2f})"
+        logger.info("Job %s: %s", record.id, record.detail)
+        try:
+            if mode == "cached":
+                result = await reuse_session(match.session_id, record.request, self.settings.sessions_dir)
+            else:
+                edit_options = {
+                    k: v for k, v in options.items()
+                    if k not in ("request", "image_normalizer", "artifact_cache_dir")
+                }
+                edit_options["patch_mode"] = True
+                result = await seed_edit(match.session_id, record.request, **edit_options)
+        except FileNotFoundError as e:
+            logger.warning("Reuse source unusable (%s) — dropping it from the index", e)
+            self.reuse_index.discard(match.session_id)
+            return None
+
+        if not result.success:
+            logger.warning("Job %s: edit seeded from %s failed — generating", record.id, match.session_id)
+            self.reuse_index.record_hit(
+                "edit_failed", -result.cost_summary.total_usd, -result.timings.get("total_seconds", 0.0),
+            )
+            return None
+
+        saved_cost = match.cost_usd - result.cost_summary.total_usd
+        saved_seconds = match.elapsed_seconds - result.timings.get("total_seconds", 0.0)
+        self.reuse_index.record_hit(mode, saved_cost, saved_seconds)
+        result.reuse = {
+            "mode": mode,
+            **match.to_dict(),
+            "saved_cost_usd": round(saved_cost, 4),
+            "saved_seconds": round(saved_seconds, 2),
+        }
+        if mode == "edit":
+            self._index_result(record.request, result)
+        return result
+
+    def _index_result(self, request: GenerateRequest, result: GenerateResult) -> None:
+        if self.reuse_index is None or not result.success or not request.prompt or request.has_image:
+            return
+        self.reuse_index.add(
+            result.session_id, request.prompt, result.llm_used,
+            result.cost_summary.total_usd, result.timings.get("total_seconds", 0.0),
+        )
+
     def _make_progress_callback(self, record: JobRecord) -> Callable[[str, int, int], None]:
-        import time
         _llm_start = [0.0]
 
         def _cb(stage: str, attempt: int, max_attempts: int) -> None:
@@ -162,64 +402,200 @@ class GenerateJobManager:
                 record.detail = stage
         return _cb
 
-    async def _worker_loop(self, idx: int) -> None:
+    async def _worker_loop(self, idx: int, queue: asyncio.Queue[str]) -> None:
+        # batch workers are extra capacity; interactive ones share slots with edits
+        slots = self._job_slots if queue is self.queue else contextlib.nullcontext()
         while True:
-            job_id = await self.queue.get()
+            job_id = await queue.get()
             try:
-                record = self.jobs.get(job_id)
-                if not record or record.status == GenerateJobStatus.cancelled:
-                    continue
+                async with slots:
+                    await self._run_job(idx, job_id)
+            finally:
+                queue.task_done()
 
-                record.status = GenerateJobStatus.running
-                record.started_at = _utc_now()
-                record.progress = 5
-                record.detail = "Starting pipeline..."
-
-                try:
-                    result = await generate_ring(
-                        request=record.request,
-                        system_prompt=self.system_prompt,
-                        sessions_dir=self.settings.sessions_dir,
-                        blender_executable=str(self.settings.blender_executable),
-                        blender_timeout=self.settings.blender_timeout_seconds,
-                        anthropic_api_key=self.settings.anthropic_api_key,
-                        gemini_api_key=self.settings.gemini_api_key,
-                        gemini_model=self.settings.gemini_model,
-                        max_retries=self.settings.max_error_retries,
-                        max_cost_usd=self.settings.max_cost_per_request_usd,
-                        progress_callback=self._make_progress_callback(record),
-                    )
-                    record.result = result
-                    if result.success:
-                        record.status = GenerateJobStatus.succeeded
-                        record.progress = 100
-                        record.detail = "Generation complete"
-                    else:
-                        record.status = GenerateJobStatus.failed
-                        record.error = {
-                            "message": "Ring generation failed after all retries",
-                            "status_code": 500,
-                        }
-                        record.progress = 100
-                        record.detail = "Failed after retries"
-
-                except Exception as exc:
-                    record.status = GenerateJobStatus.failed
-                    record.error = {"message": str(exc), "status_code": 500}
-                    record.progress = 100
-                    record.detail = f"Error: {str(exc)[:200]}"
-                    logger.exception("Worker %d: job %s failed", idx, job_id)
-
-                finally:
-                    record.finished_at = _utc_now()
-                    record.done_event.set()
+    async def _run_job(self, idx: int, job_id: str) -> None:
+        record = self.jobs.get(job_id)
+        if not record or record.status == GenerateJobStatus.cancelled:
+            return
 
-            finally:
-                self.queue.task_done()
+        record.status = GenerateJobStatus.running
+        record.started_at = _utc_now()
+        record.progress = 5
+        record.detail = "Starting pipeline..."
+
+        try:
+            options = dict(
+                self._pipeline_options(),
+                request=record.request,
+                progress_callback=self._make_progress_callback(record),
+                image_normalizer=self.image_normalizer,
+                artifact_cache_dir=self.settings.artifact_cache_dir,
+            )
+            result = await self._generate(record, options)
+            # Time spent waiting for a worker (includes the batch round-trip for batch jobs).
+            result.timings["queue_seconds"] = round(
+                (record.started_at - record.created_at).total_seconds(), 2,
+            )
+            record.result = result
+            if result.success:
+                record.status = GenerateJobStatus.succeeded
+                record.progress = 100
+                record.detail = "Generation complete"
+            else:
+                record.status = GenerateJobStatus.failed
+                record.error = {
+                    "message": "Ring generation failed after all retries",
+                    "status_code": 500,
+                }
+                record.progress = 100
+                record.detail = "Failed after retries"
+
+        except Exception as exc:
+            record.status = GenerateJobStatus.failed
+            record.error = {"message": str(exc), "status_code": 500}
+            record.progress = 100
+            record.detail = f"Error: {str(exc)[:200]}"
+            logger.exception("Worker %d: job %s failed", idx, job_id)
+
+        finally:
+            record.finished_at = _utc_now()
+            record.prefetched_response = None
+            record.done_event.set()
+
+    # ------------------------------------------------------------------
+    # Batch tier
+    # ------------------------------------------------------------------
+
+    def _get_batch_backend(self) -> BatchBackend:
+        if self._batch_backend is None:
+            self._batch_backend = make_batch_backend(
+                self.settings.batch_backend,
+                self.settings.anthropic_key_pool,
+                local_latency=self.settings.batch_local_latency_seconds,
+            )
+        return self._batch_backend
+
+    async def _batch_loop(self) -> None:
+        last_poll = 0.0
+        while True:
+            await asyncio.sleep(1.0)
+            try:
+                now = time.monotonic()
+                if self._batch_pending and (
+                    len(self._batch_pending) >= self.settings.batch_max_size
+                    or now - self._batch_pending_since >= self.settings.batch_flush_seconds
+                ):
+                    await self._flush_batch()
+                if self._batch_inflight and now - last_poll >= self.settings.batch_poll_interval_seconds:
+                    last_poll = now
+                    await self._poll_batches()
+            except Exception:
+                logger.exception("Batch loop iteration failed")
+
+    def _release_to_workers(self, record: JobRecord, response: LLMResponse | None, detail: str) -> None:
+        record.prefetched_response = response
+        record.detail = detail
+        self.batch_ready.put_nowait(record.id)
+
+    async def _flush_batch(self) -> None:
+        async with self._lock:
+            job_ids = self._batch_pending[:self.settings.batch_max_size]
+            del self._batch_pending[:len(job_ids)]
+            self._batch_pending_since = time.monotonic()
+
+        records = [
+            r for r in (self.jobs.get(j) for j in job_ids)
+            if r and r.status == GenerateJobStatus.queued
+        ]
+        if not records:
+            return
+
+        items: list[BatchItem] = []
+        mapping: dict[str, str] = {}
+        for i, record in enumerate(records):
+            try:
+                call = await prepare_generation_call(
+                    record.request, self.system_prompt, self.prompt_index, self.image_normalizer,
+                    self.settings.artifact_cache_dir,
+                )
+            except Exception as e:
+                logger.warning("[BATCH] Job %s could not be prepared (%s) — generating interactively", record.id, e)
+                self._release_to_workers(record, None, "Batch preparation failed; generating interactively")
+                continue
+            custom_id = f"job-{i:05d}"
+            items.append(BatchItem(
+                custom_id=custom_id,
+                model=claude_model_for(record.request.llm_name),
+                system=call.system,
+                prompt=call.prompt,
+                image_data=call.image_data,
+                image_mime=call.image_mime,
+            ))
+            mapping[custom_id] = record.id
+
+        if not items:
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            batch_id = await loop.run_in_executor(None, self._get_batch_backend().submit, items)
+        except Exception as e:
+            logger.error("[BATCH] Submission of %d jobs failed (%s) — running them interactively", len(items), e)
+            for job_id in mapping.values():
+                self._release_to_workers(self.jobs[job_id], None, "Batch submission failed; generating interactively")
+            return
+
+        self._batch_inflight[batch_id] = mapping
+        for job_id in mapping.values():
+            self.jobs[job_id].batch_id = batch_id
+            self.jobs[job_id].detail = f"Waiting for batch {batch_id}"
+
+    async def _poll_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        backend = self._get_batch_backend()
+        for batch_id, mapping in list(self._batch_inflight.items()):
+            try:
+                done = await loop.run_in_executor(None, backend.is_done, batch_id)
+            except Exception as e:
+                logger.warning("[BATCH] Status check for %s failed: %s", batch_id, e)
+                continue
+            if not done:
+                continue
+
+            try:
+                results = await loop.run_in_executor(None, backend.results, batch_id)
+            except Exception as e:
+                failures = self._batch_read_failures.get(batch_id, 0) + 1
+                if failures < _BATCH_READ_ATTEMPTS:
+                    self._batch_read_failures[batch_id] = failures
+                    logger.warning("[BATCH] Reading results of %s failed (%s) — retrying next poll", batch_id, e)
+                    continue
+                logger.error("[BATCH] Reading results of %s failed %d times: %s", batch_id, failures, e)
+                results = []
+            del self._batch_inflight[batch_id]
+            self._batch_read_failures.pop(batch_id, None)
+            by_id = {r.custom_id: r for r in results}
+            logger.info("[BATCH] %s ended: %d/%d results", batch_id, len(results), len(mapping))
+
+            for custom_id, job_id in mapping.items():
+                record = self.jobs.get(job_id)
+                if not record or record.status != GenerateJobStatus.queued:
+                    continue
+                result = by_id.get(custom_id)
+                if result is not None and result.response is not None:
+                    self._release_to_workers(record, result.response, "Batch result received; queued for Blender")
+                else:
+                    reason = result.error if result is not None else "missing from results"
+                    logger.warning("[BATCH] Job %s: %s — generating interactively", job_id, reason)
+                    self._release_to_workers(record, None, "Batch request failed; generating interactively")
 
     async def _cleanup_loop(self) -> None:
         while True:
             await asyncio.sleep(self.settings.cleanup_interval_seconds)
+            await asyncio.get_running_loop().run_in_executor(
+                None, prune_cache, self.settings.artifact_cache_dir,
+                self.settings.artifact_cache_max_mb * 1024 * 1024,
+            )
             now = _utc_now()
             ttl = timedelta(seconds=self.settings.finished_job_ttl_seconds)
 
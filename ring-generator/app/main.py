@@ -7,31 +7,53 @@ Endpoints:
   GET  /jobs/{id}    Job status (for Temporal heartbeat polling)
   GET  /jobs/{id}/result   Final result
   DELETE /jobs/{id}  Cancel queued job
+  POST /sessions/{id}/edit  Natural-language edit of a session (new version)
+  GET  /sessions/{id}/versions/{n}  Code of one session version
   GET  /health       Service health check
+  GET  /metrics/llm  Per-model LLM latency (TTFT, tok/s, stalls, retries)
+  GET  /metrics/reuse  Reuse cache hits and estimated savings
   GET  /tool/schema  Tool schema for registry
   GET  /ui           Test console UI
+
+/run and /jobs accept JSON or multipart/form-data (reference image as a
+binary ``image`` part).
 """
 
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 import logging
 import os
+import re
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any
 
 from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 
+from shared.artifact_resolver import configure_remote_artifacts, store_artifact
 from shared.files import ensure_dir
 from shared.logging import configure_logging
 from shared.payloads import unwrap_tool_payload
+from shared.session_store import read_version
 
 from .config import settings
+from .core.blender_runner import configure_blender_slots
+from .core.key_pool import pools_snapshot
+from .core.llm_connections import ConnectionWarmer, configure_connection_pool
+from .core.llm_metrics import llm_metrics
+from .core.pipeline import REFERENCE_IMAGE_SUFFIX
+from .core.prompt_builder import build_helper_library_prompt
 from .job_manager import GenerateJobManager
 from .schemas import (
     AsyncJobAccepted,
+    EditRequest,
     GenerateJobStatus,
     GenerateRequest,
     GenerateResult,
@@ -51,6 +73,8 @@ if not settings.master_prompt_path.exists():
         "Copy it from vibe-designing-3d/master_prompt.txt into prompts/"
     )
 SYSTEM_PROMPT = settings.master_prompt_path.read_text()
+if settings.helper_library_prompt:
+    SYSTEM_PROMPT += "\n\n" + build_helper_library_prompt() + "\n"
 logger.info("Loaded master prompt: %d chars", len(SYSTEM_PROMPT))
 
 
@@ -59,6 +83,15 @@ logger.info("Loaded master prompt: %d chars", len(SYSTEM_PROMPT))
 # ---------------------------------------------------------------------------
 
 jobs = GenerateJobManager(settings, SYSTEM_PROMPT)
+configure_connection_pool(settings.max_concurrent_jobs)
+configure_blender_slots(settings.max_concurrent_jobs)
+configure_remote_artifacts(settings.artifact_allowed_host_list, settings.max_reference_image_mb * 1024 * 1024)
+warmer = ConnectionWarmer(
+    anthropic_keys=settings.anthropic_key_pool if settings.llm_warmup else [],
+    gemini_keys=settings.gemini_key_pool if settings.llm_warmup else [],
+    gemini_model=settings.gemini_model,
+    interval_seconds=settings.llm_keepalive_interval_seconds,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -77,8 +110,11 @@ def _require_api_key(x_api_key: str | None) -> None:
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     ensure_dir(settings.sessions_dir)
+    ensure_dir(settings.artifact_cache_dir)
     await jobs.startup()
+    await warmer.start()
     yield
+    await warmer.stop()
     await jobs.shutdown()
 
 
@@ -136,10 +172,26 @@ async def health():
         "master_prompt_loaded": len(SYSTEM_PROMPT) > 0,
         "claude_available": settings.claude_available,
         "gemini_available": settings.gemini_available,
+        "anthropic_keys": len(settings.anthropic_key_pool),
+        "gemini_keys": len(settings.gemini_key_pool),
+        "key_pools": pools_snapshot(),
+        "llm_connections": warmer.snapshot(),
         "max_concurrent_jobs": settings.max_concurrent_jobs,
+        "batch": jobs.batch_snapshot(),
+        "reuse": jobs.reuse_snapshot(),
     }
 
 
+@app.get("/metrics/llm")
+async def metrics_llm():
+    return llm_metrics.snapshot()
+
+
+@app.get("/metrics/reuse")
+async def metrics_reuse():
+    return jobs.reuse_snapshot()
+
+
 # ---------------------------------------------------------------------------
 # Tool schema (for temporal-agentic-pipeline registry)
 # ---------------------------------------------------------------------------
@@ -157,6 +209,73 @@ async def tool_schema():
     }
 
 
+# ---------------------------------------------------------------------------
+# Generate request bodies — JSON or multipart (reference image as a binary part)
+# ---------------------------------------------------------------------------
+
+async def _store_image(source: bytes | Any, mime: str | None) -> dict[str, Any]:
+    """Reference image into the artifact cache; returns its ``image_ref``."""
+    try:
+        ref = await run_in_threadpool(
+            store_artifact, source, settings.artifact_cache_dir, REFERENCE_IMAGE_SUFFIX,
+            settings.max_reference_image_mb * 1024 * 1024,
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=413, detail=f"Reference image exceeds {settings.max_reference_image_mb} MB",
+        )
+    ref["type"] = mime or "image/jpeg"
+    return ref
+
+
+async def _read_generate_request(request: Request) -> tuple[GenerateRequest, bool]:
+    """
+    (GenerateRequest, envelope-wrapped) from the body.
+
+    multipart/form-data: the ``image`` part is streamed into the artifact
+    cache and becomes ``image_ref``; the rest of the request is a JSON
+    ``request`` field (plain or envelope) or plain form fields.  An inline
+    ``image_b64`` is moved to the cache as well, so the job record only
+    holds the reference.
+    """
+    ref: dict[str, Any] | None = None
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        try:
+            if "request" in form:
+                try:
+                    raw = json.loads(str(form["request"]))
+                except json.JSONDecodeError:
+                    raise HTTPException(status_code=400, detail="'request' form field is not valid JSON")
+            else:
+                raw = {k: v for k, v in form.items() if isinstance(v, str)}
+            upload = form.get("image")
+            if upload is not None and not isinstance(upload, str):
+                ref = await _store_image(upload.file, upload.content_type)
+        finally:
+            await form.close()
+    else:
+        raw = await request.json()
+
+    data, meta, wrapped = unwrap_tool_payload(raw)
+    # Allow meta overrides for llm_name
+    if "llm_name" in meta and "llm_name" not in data:
+        data["llm_name"] = meta["llm_name"]
+    if ref is not None:
+        data["image_ref"] = ref
+    gen_request = GenerateRequest.model_validate(data)
+
+    if gen_request.image_b64:
+        try:
+            # MIME-wrapped base64 (line breaks) is accepted; other stray characters are not
+            image = base64.b64decode("".join(gen_request.image_b64.split()), validate=True)
+        except binascii.Error:
+            raise HTTPException(status_code=400, detail="image_b64 is not valid base64")
+        gen_request.image_ref = await _store_image(image, gen_request.image_mime)
+        gen_request.image_b64 = None
+    return gen_request, wrapped
+
+
 # ---------------------------------------------------------------------------
 # POST /run — Temporal-compatible sync endpoint
 # ---------------------------------------------------------------------------
@@ -168,16 +287,10 @@ async def run_sync(request: Request, x_api_key: str | None = Header(default=None
     Accepts either:
       - plain GenerateRequest JSON
       - envelope shape: { "data": { ... }, "meta": { ... } }
+      - multipart/form-data with an ``image`` file part
     """
     _require_api_key(x_api_key)
-    raw = await request.json()
-    data, meta, wrapped = unwrap_tool_payload(raw)
-
-    # Allow meta overrides for llm_name
-    if "llm_name" in meta and "llm_name" not in data:
-        data["llm_name"] = meta["llm_name"]
-
-    gen_request = GenerateRequest.model_validate(data)
+    gen_request, wrapped = await _read_generate_request(request)
 
     record = await jobs.submit(gen_request)
     finished = await jobs.wait_for_completion(record.id, timeout_seconds=settings.sync_wait_timeout_seconds)
@@ -210,13 +323,7 @@ async def enqueue_job(request: Request, x_api_key: str | None = Header(default=N
       GET /jobs/{job_id}  → poll status
     """
     _require_api_key(x_api_key)
-    raw = await request.json()
-    data, meta, _ = unwrap_tool_payload(raw)
-
-    if "llm_name" in meta and "llm_name" not in data:
-        data["llm_name"] = meta["llm_name"]
-
-    gen_request = GenerateRequest.model_validate(data)
+    gen_request, _ = await _read_generate_request(request)
     record = await jobs.submit(gen_request)
 
     return AsyncJobAccepted(
@@ -305,13 +412,70 @@ async def serve_glb(session_id: str):
 
 @app.get("/sessions/{session_id}")
 async def get_session(session_id: str):
-    import json
     session_json = settings.sessions_dir / session_id / "session.json"
     if not session_json.exists():
         raise HTTPException(status_code=404, detail="Session not found")
     return JSONResponse(content=json.loads(session_json.read_text()))
 
 
+# ---------------------------------------------------------------------------
+# POST /sessions/{session_id}/edit — Natural-language edit (new version)
+# ---------------------------------------------------------------------------
+
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+@app.post("/sessions/{session_id}/edit")
+async def edit_session(session_id: str, request: Request, x_api_key: str | None = Header(default=None)):
+    """
+    Apply a change ("make the band thinner") to the session's current code.
+    The model returns only the changed functions; the result is rebuilt,
+    appended as a new version and returned like a generation result.
+    """
+    _require_api_key(x_api_key)
+    if not _SESSION_ID_RE.fullmatch(session_id) or session_id.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid session id")
+    raw = await request.json()
+    data, _, wrapped = unwrap_tool_payload(raw)
+    edit = EditRequest.model_validate(data)
+
+    try:
+        result = await jobs.edit_session(session_id, edit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Session not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RuntimeError as e:
+        # queue full / sync wait timeout
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if not result.success:
+        raise HTTPException(status_code=500, detail="Edit failed after all retries; session unchanged")
+    result_dict = result.model_dump()
+    if wrapped:
+        return {"result": result_dict}
+    return result_dict
+
+
+# ---------------------------------------------------------------------------
+# GET /sessions/{session_id}/versions/{version} — Code of one version
+# ---------------------------------------------------------------------------
+
+@app.get("/sessions/{session_id}/versions/{version}")
+async def get_session_version(session_id: str, version: int):
+    """Rebuilt from the delta-encoded version log (``session.json`` only lists metadata)."""
+    if not _SESSION_ID_RE.fullmatch(session_id) or session_id.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid session id")
+    session_dir = settings.sessions_dir / session_id
+    if not (session_dir / "session.json").exists():
+        raise HTTPException(status_code=404, detail="Session not found")
+    try:
+        code = read_version(session_dir, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Version {version} not found")
+    return {"session_id": session_id, "version": version, "code": code}
+
+
 # ---------------------------------------------------------------------------
 # UI — Test Console
 # ---------------------------------------------------------------------------
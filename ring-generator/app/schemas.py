@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import Enum
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
@@ -25,10 +25,18 @@ class GenerateRequest(BaseModel):
     prompt: str | None = None
     image_b64: str | None = None
     image_mime: str | None = None
+    # reference image as a CAS artifact reference {"uri", "sha256", "type"} or an http(s)/azure:// URL
+    image_ref: dict[str, Any] | str | None = None
 
     llm_name: str = "claude"
     max_retries: int | None = None
     max_cost_usd: float | None = None
+    # "batch": initial generation goes through the discounted batch API (Claude only)
+    priority: Literal["interactive", "batch"] = "interactive"
+    # > 1: that many concurrent generations of this request under one job (shared cached prompt)
+    variants: int = Field(default=1, ge=1, le=8)
+    # False: always generate, even when the reuse cache has a near-duplicate prompt
+    reuse: bool = True
 
     request_id: str | None = None
     metadata: dict[str, Any] = Field(default_factory=dict)
@@ -37,10 +45,40 @@ class GenerateRequest(BaseModel):
 
     @model_validator(mode="after")
     def _require_input(self) -> "GenerateRequest":
-        if not self.prompt and not self.image_b64:
-            raise ValueError("Provide a text prompt or a base64-encoded reference image.")
+        if not self.prompt and not self.has_image:
+            raise ValueError("Provide a text prompt or a reference image (image_b64 or image_ref).")
+        if self.image_b64 and self.image_ref is not None:
+            raise ValueError("Provide either image_b64 or image_ref, not both.")
+        if isinstance(self.image_ref, str) and not self.image_ref.startswith(("http://", "https://", "azure://")):
+            raise ValueError("image_ref must be an artifact reference or an http(s)/azure:// URL")
+        if isinstance(self.image_ref, dict) and not (self.image_ref.get("uri") or self.image_ref.get("sha256")):
+            raise ValueError("image_ref needs a 'uri' or 'sha256'")
         if self.llm_name not in ("claude", "claude-sonnet", "claude-opus", "gemini"):
             raise ValueError("llm_name must be one of: claude, claude-sonnet, claude-opus, gemini")
+        if self.priority == "batch" and self.llm_name == "gemini":
+            raise ValueError("priority='batch' is only available for Claude models")
+        if self.priority == "batch" and self.variants > 1:
+            raise ValueError("variants > 1 is only available for priority='interactive'")
+        return self
+
+    @property
+    def has_image(self) -> bool:
+        return bool(self.image_b64) or self.image_ref is not None
+
+
+class EditRequest(BaseModel):
+    """Natural-language change to an existing session (``POST /sessions/{id}/edit``)."""
+
+    instruction: str = Field(min_length=1)
+    # default: the model that generated the session
+    llm_name: str | None = None
+    max_retries: int | None = None
+    max_cost_usd: float | None = None
+
+    @model_validator(mode="after")
+    def _check_llm(self) -> "EditRequest":
+        if self.llm_name is not None and self.llm_name not in ("claude", "claude-sonnet", "claude-opus", "gemini"):
+            raise ValueError("llm_name must be one of: claude, claude-sonnet, claude-opus, gemini")
         return self
 
 
@@ -54,13 +92,31 @@ class RetryEntry(BaseModel):
     code_length: int
     error_text: str = ""
     timestamp: str = ""
+    fix_mode: str = ""
+    blender_seconds: float = 0.0
+    # local rule-based fixes applied (and re-run) before the LLM fix
+    auto_fix_rules: list[str] = Field(default_factory=list)
+    # retry policy decision for the fix round after this attempt (model, context, reasons)
+    decision: dict[str, Any] = Field(default_factory=dict)
+    # isolation mode: every component function that failed in this run
+    function_errors: list[dict[str, str]] = Field(default_factory=list)
+    # profiling mode: per-function / per-phase seconds of this attempt (partial after a timeout)
+    profile: dict[str, Any] = Field(default_factory=dict)
+    # innermost traceback frame in the LLM code: line, function, source (original numbering)
+    error_location: dict[str, Any] = Field(default_factory=dict)
+    # incremental mode: component functions appended from the session library, not re-run
+    reused_functions: list[str] = Field(default_factory=list)
 
 
 class CostSummary(BaseModel):
     total_input_tokens: int = 0
     total_output_tokens: int = 0
+    # prompt-cache tokens, billed separately from total_input_tokens
+    total_cache_read_tokens: int = 0
+    total_cache_write_tokens: int = 0
     total_usd: float = 0.0
     calls: int = 0
+    prompt_tokens_saved: int = 0
     details: list[dict[str, Any]] = Field(default_factory=list)
 
 
@@ -77,6 +133,17 @@ class GenerateResult(BaseModel):
     llm_used: str = ""
     blender_elapsed: float = 0.0
     glb_size: int = 0
+    # wall-time breakdown: total / llm / llm_retry_wait / blender (+ queue for jobs)
+    timings: dict[str, float] = Field(default_factory=dict)
+    # evaluated polygon budget: polygons_before / polygons_after and the modifier caps applied
+    geometry_budget: dict[str, Any] = Field(default_factory=dict)
+    # session version this result produced (1 = generation, > 1 = edits)
+    version: int = 1
+    # variants jobs: 1-based index of this variant; the job result also lists every variant
+    variant: int = 0
+    variants: list["GenerateResult"] = Field(default_factory=list)
+    # reuse cache hit: mode ("cached" | "edit"), source session, similarity, estimated savings
+    reuse: dict[str, Any] = Field(default_factory=dict)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,325 @@
+"""
+Precomputed parametric ring components: gems, prong sets, basket heads.
+
+Generated scripts used to rebuild brilliant-cut gems and prong sets vertex
+by vertex in bmesh on every ring.  Here each shape is built once at unit
+size (gem diameter = 1) from its shape parameters, stored as a NumPy mesh
+asset (``<cache>/<kind>-<key>.npz``: vertices + flat face loops) and
+reused:
+
+  - on disk across runs — the cache dir is ``$RING_COMPONENTS_CACHE`` or
+    ``blender_lib/cache``; ``python ring_components.py`` precomputes the
+    standard variants
+  - in memory within a run — every object of the same shape shares one
+    mesh datablock (an instance), sized and placed by its object transform
+
+Callable from generated code (preloaded by ``blender_runner``)::
+
+    g = gem("round_brilliant", 0.0065, (0, 0, 0.011))
+    p = prongs(0.0065, (0, 0, 0.011), count=6)
+    h = basket_head(0.0065, (0, 0, 0.011), count=4, rails=2)
+
+Mesh building is plain NumPy (runs outside Blender too); only object
+creation touches ``bpy``.  Bump ``__version__`` when any builder changes —
+it is part of the cache key.
+"""
+
+import hashlib
+import json
+import os
+from math import cos, pi, sin
+
+import numpy as np
+
+__version__ = "1.0"
+
+__all__ = ["gem", "prongs", "basket_head", "GEM_CUTS"]
+
+GEM_CUTS = ("round_brilliant", "oval", "princess")
+
+_CACHE_DIR = os.environ.get("RING_COMPONENTS_CACHE") or os.path.join(os.path.dirname(__file__), "cache")
+_MESHES = {}            # (kind, key) -> bpy mesh, shared within one Blender run
+
+
+# ---------------------------------------------------------------------------
+# Unit-size mesh builders (NumPy only)
+# ---------------------------------------------------------------------------
+
+class _MeshBuilder:
+    def __init__(self):
+        self.verts = []
+        self.faces = []
+        self.refs = []      # per face: a point on the inside, to orient the face outward
+
+    def vert(self, co):
+        self.verts.append(tuple(co))
+        return len(self.verts) - 1
+
+    def ring(self, radius, z, n, phase=0.0, center=(0.0, 0.0)):
+        cx, cy = center
+        return [
+            self.vert((cx + radius * cos(phase + 2 * pi * i / n), cy + radius * sin(phase + 2 * pi * i / n), z))
+            for i in range(n)
+        ]
+
+    def face(self, idx, ref):
+        self.faces.append(list(idx))
+        self.refs.append(tuple(ref))
+
+    def bridge(self, upper, lower, ref):
+        """Quads between two aligned rings of equal length."""
+        n = len(upper)
+        for i in range(n):
+            j = (i + 1) % n
+            self.face([upper[i], lower[i], lower[j], upper[j]], ref)
+
+    def zigzag(self, upper, lower, ref):
+        """Triangles between two rings where ``lower`` is rotated half a step."""
+        n = len(upper)
+        for i in range(n):
+            j = (i + 1) % n
+            self.face([upper[i], lower[i], upper[j]], ref)
+            self.face([upper[j], lower[i], lower[j]], ref)
+
+    def fan(self, ring, apex, ref):
+        n = len(ring)
+        for i in range(n):
+            self.face([ring[i], apex, ring[(i + 1) % n]], ref)
+
+    def tube(self, path, radius, m=8, closed=False, cap_end=False):
+        """Tube of ``m`` sides along a polyline; ``cap_end`` closes the last ring with a dome."""
+        path = [np.asarray(p, dtype=float) for p in path]
+        rings = []
+        for k, p in enumerate(path):
+            if closed:
+                t = path[(k + 1) % len(path)] - path[k - 1]
+            else:
+                t = path[min(k + 1, len(path) - 1)] - path[max(k - 1, 0)]
+            t /= np.linalg.norm(t)
+            a = np.array((0.0, 0.0, 1.0)) if abs(t[2]) < 0.9 else np.array((1.0, 0.0, 0.0))
+            u = np.cross(t, a)
+            u /= np.linalg.norm(u)
+            v = np.cross(t, u)
+            rings.append([self.vert(p + radius * (cos(2 * pi * i / m) * u + sin(2 * pi * i / m) * v)) for i in range(m)])
+        segments = len(path) if closed else len(path) - 1
+        for k in range(segments):
+            k2 = (k + 1) % len(path)
+            ref = (path[k] + path[k2]) / 2
+            for i in range(m):
+                j = (i + 1) % m
+                self.face([rings[k][i], rings[k][j], rings[k2][j], rings[k2][i]], ref)
+        if cap_end:
+            direction = path[-1] - path[-2]
+            direction /= np.linalg.norm(direction)
+            apex = self.vert(path[-1] + direction * radius)
+            self.fan(rings[-1], apex, path[-1] - direction * radius)
+
+    def arrays(self):
+        verts = np.asarray(self.verts, dtype=np.float32)
+        loops, sizes = [], []
+        for face, ref in zip(self.faces, self.refs):
+            pts = verts[face].astype(float)
+            normal = np.sum(np.cross(pts, np.roll(pts, -1, axis=0)), axis=0)      # Newell
+            if np.dot(normal, pts.mean(axis=0) - np.asarray(ref)) < 0:
+                face = face[::-1]
+            loops.extend(face)
+            sizes.append(len(face))
+        return verts, np.asarray(loops, dtype=np.int32), np.asarray(sizes, dtype=np.int32)
+
+
+def _build_round_brilliant(table=0.57, crown=0.162, girdle=0.03, pavilion=0.431, n=16):
+    b = _MeshBuilder()
+    center = (0.0, 0.0, 0.0)
+    zt = girdle / 2 + crown
+    table_ring = b.ring(table / 2, zt, n)
+    crown_ring = b.ring(0.5 * (table / 2 + 0.5) + 0.02, girdle / 2 + crown * 0.45, n, phase=pi / n)
+    girdle_top = b.ring(0.5, girdle / 2, n)
+    girdle_bot = b.ring(0.5, -girdle / 2, n)
+    pav_ring = b.ring(0.3, -girdle / 2 - pavilion * 0.45, n, phase=pi / n)
+    culet = b.vert((0.0, 0.0, -girdle / 2 - pavilion))
+    b.face(table_ring, center)
+    b.zigzag(table_ring, crown_ring, center)
+    b.zigzag(girdle_top, crown_ring, center)
+    b.bridge(girdle_top, girdle_bot, center)
+    b.zigzag(girdle_bot, pav_ring, center)
+    b.fan(pav_ring, culet, center)
+    return b
+
+
+def _square_ring(b, half, z, per_side=2):
+    pts = []
+    corners = [(half, half), (-half, half), (-half, -half), (half, -half)]
+    for c in range(4):
+        (x0, y0), (x1, y1) = corners[c], corners[(c + 1) % 4]
+        for s in range(per_side):
+            t = s / per_side
+            pts.append(b.vert((x0 + (x1 - x0) * t, y0 + (y1 - y0) * t, z)))
+    return pts
+
+
+def _build_princess(table=0.7, crown=0.1, girdle=0.03, pavilion=0.7):
+    b = _MeshBuilder()
+    center = (0.0, 0.0, 0.0)
+    table_ring = _square_ring(b, table / 2, girdle / 2 + crown)
+    girdle_top = _square_ring(b, 0.5, girdle / 2)
+    girdle_bot = _square_ring(b, 0.5, -girdle / 2)
+    pav_ring = _square_ring(b, 0.25, -girdle / 2 - pavilion * 0.55)
+    culet = b.vert((0.0, 0.0, -girdle / 2 - pavilion))
+    b.face(table_ring, center)
+    b.bridge(table_ring, girdle_top, center)
+    b.bridge(girdle_top, girdle_bot, center)
+    b.bridge(girdle_bot, pav_ring, center)
+    b.fan(pav_ring, culet, center)
+    return b
+
+
+def _prong_paths(count, height, girdle_z=0.0, phase=None):
+    """Base → tip polylines; tips lean in over the girdle to grip the stone."""
+    phase = (pi / count) if phase is None else phase
+    paths = []
+    for k in range(count):
+        a = phase + 2 * pi * k / count
+        d = np.array((cos(a), sin(a), 0.0))
+        base = d * 0.38 + np.array((0.0, 0.0, -height))
+        mid = d * 0.53 + np.array((0.0, 0.0, girdle_z))
+        tip = d * 0.47 + np.array((0.0, 0.0, girdle_z + 0.1))
+        paths.append([base, (base + mid) / 2 + d * 0.04, mid, tip])
+    return paths
+
+
+def _build_prongs(count=4, height=0.6, wire=0.12):
+    b = _MeshBuilder()
+    for path in _prong_paths(count, height):
+        b.tube(path, wire / 2, cap_end=True)
+    return b
+
+
+def _build_basket_head(count=4, height=0.6, wire=0.12, rails=2):
+    b = _build_prongs(count, height, wire)
+    for r in range(rails):
+        # rails sit between the prong base and the girdle, following the prongs' radius
+        t = (r + 1) / (rails + 1)
+        z = -height * (1 - t)
+        radius = 0.38 + (0.53 - 0.38) * t
+        path = [(radius * cos(2 * pi * i / 48), radius * sin(2 * pi * i / 48), z) for i in range(48)]
+        b.tube(path, wire * 0.35, m=6, closed=True)
+    return b
+
+
+_BUILDERS = {
+    "gem:round_brilliant": _build_round_brilliant,
+    "gem:oval": _build_round_brilliant,           # oval = round brilliant stretched on X
+    "gem:princess": _build_princess,
+    "prongs": _build_prongs,
+    "basket_head": _build_basket_head,
+}
+
+
+# ---------------------------------------------------------------------------
+# Asset cache (.npz)
+# ---------------------------------------------------------------------------
+
+def _asset_key(kind, params):
+    blob = json.dumps([__version__, kind, params], sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+
+def load_asset(kind, **params):
+    """(verts, loops, sizes) for a unit-size component, built and cached on first use."""
+    params = {k: round(v, 4) if isinstance(v, float) else v for k, v in params.items()}
+    path = os.path.join(_CACHE_DIR, f"{kind.replace(':', '-')}-{_asset_key(kind, params)}.npz")
+    if os.path.isfile(path):
+        data = np.load(path)
+        return data["verts"], data["loops"], data["sizes"]
+    verts, loops, sizes = _BUILDERS[kind](**params).arrays()
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, verts=verts, loops=loops, sizes=sizes)
+        os.replace(tmp, path)
+    except OSError:
+        pass                # read-only cache dir: rebuild next run
+    return verts, loops, sizes
+
+
+def precompute():
+    """Build the standard variants into the cache dir."""
+    for cut in GEM_CUTS:
+        load_asset(f"gem:{cut}")
+    for count in (3, 4, 6, 8):
+        load_asset("prongs", count=count)
+        load_asset("basket_head", count=count)
+    return _CACHE_DIR
+
+
+# ---------------------------------------------------------------------------
+# Blender objects
+# ---------------------------------------------------------------------------
+
+def _mesh(kind, smooth, **params):
+    import bpy
+
+    key = (kind, json.dumps(params, sort_keys=True))
+    mesh = _MESHES.get(key)
+    try:
+        if mesh is not None and mesh.name in bpy.data.meshes:
+            return mesh
+    except ReferenceError:      # removed by a scene clear inside the script
+        pass
+    verts, loops, sizes = load_asset(kind, **params)
+    mesh = bpy.data.meshes.new(kind.replace(":", "_") + "_asset")
+    mesh.vertices.add(len(verts))
+    mesh.vertices.foreach_set("co", verts.ravel())
+    mesh.loops.add(len(loops))
+    mesh.loops.foreach_set("vertex_index", loops)
+    mesh.polygons.add(len(sizes))
+    mesh.polygons.foreach_set("loop_start", np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int32))
+    try:
+        mesh.polygons.foreach_set("loop_total", sizes)      # read-only (derived) since Blender 4.0
+    except (AttributeError, RuntimeError, TypeError):
+        pass
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    if smooth:
+        mesh.polygons.foreach_set("use_smooth", [True] * len(sizes))
+    _MESHES[key] = mesh
+    return mesh
+
+
+def _place(mesh, name, position, rotation, scale, collection):
+    import bpy
+
+    obj = bpy.data.objects.new(name, mesh)
+    obj.location = position
+    obj.rotation_euler = rotation
+    obj.scale = scale
+    (collection or bpy.context.scene.collection).objects.link(obj)
+    return obj
+
+
+def gem(cut="round_brilliant", diameter=0.0065, position=(0.0, 0.0, 0.0), rotation=(0.0, 0.0, 0.0),
+        aspect=1.35, name=None, collection=None):
+    """Faceted gem (round_brilliant / oval / princess), girdle centred on position; aspect = oval length/width."""
+    if cut not in GEM_CUTS:
+        raise ValueError(f"gem: unknown cut {cut!r} (expected one of {GEM_CUTS})")
+    sx = diameter * aspect if cut == "oval" else diameter
+    return _place(_mesh(f"gem:{cut}", False), name or f"Gem_{cut}", position, rotation,
+                  (sx, diameter, diameter), collection)
+
+
+def prongs(gem_diameter, position=(0.0, 0.0, 0.0), count=4, height=0.6, wire=0.12,
+           rotation=(0.0, 0.0, 0.0), name=None, collection=None):
+    """Prong set gripping a gem at position (its girdle centre); height and wire are fractions of gem_diameter."""
+    mesh = _mesh("prongs", True, count=count, height=height, wire=wire)
+    return _place(mesh, name or f"Prongs_{count}", position, rotation, (gem_diameter,) * 3, collection)
+
+
+def basket_head(gem_diameter, position=(0.0, 0.0, 0.0), count=4, height=0.6, wire=0.12, rails=2,
+                rotation=(0.0, 0.0, 0.0), name=None, collection=None):
+    """Prongs plus ``rails`` horizontal rings below the girdle; sizes are fractions of gem_diameter."""
+    mesh = _mesh("basket_head", True, count=count, height=height, wire=wire, rails=rails)
+    return _place(mesh, name or f"BasketHead_{count}", position, rotation, (gem_diameter,) * 3, collection)
+
+
+if __name__ == "__main__":
+    print(f"ring_components {__version__}: assets in {precompute()}")
@@ -0,0 +1,131 @@
+"""
+Ring geometry helpers preloaded into every generated script.
+
+``blender_runner`` puts this directory on ``sys.path`` and runs
+``from ring_helpers import *`` before the script body, so generated code
+can call these instead of re-implementing them.  A script that still
+defines its own ``mk`` / ``quad_bridge`` / ... simply shadows the
+preloaded version (its definition comes later), so older scripts run
+unchanged.
+
+Runs inside Blender — bpy / mathutils only.  Bump ``__version__``
+on any signature change; the prompt advertises the version it documents.
+"""
+
+import bpy
+from math import cos, pi, radians, sin
+from mathutils import Vector
+
+__version__ = "1.0"
+
+__all__ = [
+    "nuke", "safe_set", "set_smooth", "mk", "ngon", "quad_bridge",
+    "make_circle_verts", "add_subsurf", "add_bevel", "add_solidify",
+]
+
+
+def nuke():
+    """Remove every object, mesh and collection from the scene."""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    for mesh in list(bpy.data.meshes):
+        bpy.data.meshes.remove(mesh)
+    for col in list(bpy.data.collections):
+        bpy.data.collections.remove(col)
+
+
+def safe_set(target, attr, value):
+    """setattr that ignores attributes missing in this Blender version; returns True if set."""
+    try:
+        setattr(target, attr, value)
+        return True
+    except (AttributeError, TypeError, ValueError):
+        return False
+
+
+def set_smooth(obj, smooth=True):
+    """Smooth (or flat) shade every polygon of a mesh object."""
+    for poly in obj.data.polygons:
+        poly.use_smooth = smooth
+    return obj
+
+
+def mk(name, verts, faces, collection=None, smooth=True):
+    """Mesh object from vertex tuples and face index lists, linked to collection (default: scene)."""
+    mesh = bpy.data.meshes.new(name + "_mesh")
+    mesh.from_pydata([tuple(v) for v in verts], [], [tuple(f) for f in faces])
+    mesh.validate()
+    mesh.update()
+    obj = bpy.data.objects.new(name, mesh)
+    (collection or bpy.context.scene.collection).objects.link(obj)
+    return set_smooth(obj, smooth)
+
+
+def ngon(bm, verts):
+    """Face from BMVerts; None for degenerate input (fewer than 3 / repeated verts / existing face)."""
+    if len(verts) < 3 or len(set(verts)) != len(verts):
+        return None
+    try:
+        return bm.faces.new(verts)
+    except ValueError:
+        return None
+
+
+def quad_bridge(bm, loop_a, loop_b, closed=True, flip=False):
+    """Quads between two vertex loops of equal length; closed=True also joins last to first."""
+    if len(loop_a) != len(loop_b):
+        raise ValueError(f"quad_bridge: loops differ in length ({len(loop_a)} vs {len(loop_b)})")
+    n = len(loop_a)
+    faces = []
+    for i in range(n if closed else n - 1):
+        j = (i + 1) % n
+        quad = [loop_a[i], loop_a[j], loop_b[j], loop_b[i]]
+        face = ngon(bm, quad[::-1] if flip else quad)
+        if face is not None:
+            faces.append(face)
+    return faces
+
+
+def make_circle_verts(bm, radius, n, center=(0.0, 0.0, 0.0), normal=(0.0, 0.0, 1.0), phase=0.0):
+    """n BMVerts on a circle of radius around center, in the plane perpendicular to normal."""
+    axis = Vector(normal).normalized()
+    u = axis.orthogonal().normalized()
+    v = axis.cross(u)
+    c = Vector(center)
+    verts = []
+    for i in range(n):
+        a = phase + 2.0 * pi * i / n
+        verts.append(bm.verts.new(c + radius * (cos(a) * u + sin(a) * v)))
+    bm.verts.ensure_lookup_table()
+    return verts
+
+
+def add_subsurf(obj, levels=2, render_levels=None, quality=3):
+    """Append a Subdivision Surface modifier."""
+    mod = obj.modifiers.new("Subsurf", 'SUBSURF')
+    mod.levels = levels
+    mod.render_levels = levels if render_levels is None else render_levels
+    safe_set(mod, "quality", quality)
+    safe_set(mod, "boundary_smooth", 'ALL')
+    return mod
+
+
+def add_bevel(obj, width, segments=3, angle_limit=radians(30), harden_normals=True):
+    """Append an angle-limited Bevel modifier on edges."""
+    mod = obj.modifiers.new("Bevel", 'BEVEL')
+    mod.width = width
+    mod.segments = segments
+    mod.limit_method = 'ANGLE'
+    mod.angle_limit = angle_limit
+    safe_set(mod, "affect", 'EDGES')
+    safe_set(mod, "harden_normals", harden_normals)
+    return mod
+
+
+def add_solidify(obj, thickness, offset=-1.0, even=True):
+    """Append a Solidify modifier (offset -1 grows inward, 1 outward)."""
+    mod = obj.modifiers.new("Solidify", 'SOLIDIFY')
+    mod.thickness = thickness
+    mod.offset = offset
+    safe_set(mod, "use_even_offset", even)
+    return mod
@@ -0,0 +1,252 @@
+"""
+Session storage with delta-encoded version history.
+
+``session.json`` used to carry the full script twice (``code`` and
+``version_history[i].code`` per version), pretty-printed, and was
+rewritten whole on every change.  Now:
+
+    session.json     metadata, the current ``code`` and a code-free
+                     ``version_history`` (version, timestamp, description,
+                     cost, modules); written compactly and atomically
+    versions.jsonl   append-only log, one record per version:
+                       {"v": 1, "t": "s", "code": "..."}                 snapshot
+                       {"v": 2, "t": "d", "base": 1, "ops": [...]}       line delta
+
+A delta holds ``[start, end, new_lines]`` replacements of the base's
+lines.  A full snapshot is written every ``SNAPSHOT_EVERY`` versions (or
+when the delta would not be much smaller than the code), which bounds
+how many deltas ``read_version`` applies.  ``compact`` rewrites the log
+with fresh snapshot spacing and migrates sessions written in the old
+full-copy format.  Each record carries a short hash of the code it
+encodes, checked on reconstruction.
+
+Shared by ring-generator and ring-validator (identical copies).
+"""
+
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+SESSION_FILE = "session.json"
+VERSIONS_FILE = "versions.jsonl"
+SNAPSHOT_EVERY = 10
+# store a snapshot instead when the delta is at least this fraction of the code
+_DELTA_MAX_RATIO = 0.5
+
+
+def _digest(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()[:12]
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Line deltas
+# ---------------------------------------------------------------------------
+
+def make_delta(base: str, code: str) -> list[list[Any]]:
+    """``[start, end, new_lines]`` replacements turning ``base`` into ``code``."""
+    a, b = base.split("\n"), code.split("\n")
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return [
+        [i1, i2, b[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+    ]
+
+
+def apply_delta(base: str, ops: list[list[Any]]) -> str:
+    lines = base.split("\n")
+    out: list[str] = []
+    pos = 0
+    for start, end, new in ops:
+        out.extend(lines[pos:start])
+        out.extend(new)
+        pos = end
+    out.extend(lines[pos:])
+    return "\n".join(out)
+
+
+# ---------------------------------------------------------------------------
+# Session file
+# ---------------------------------------------------------------------------
+
+def load_session(session_dir: Path) -> dict[str, Any]:
+    path = session_dir / SESSION_FILE
+    if not path.is_file():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_session(session_dir: Path, session: dict[str, Any]) -> None:
+    session_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(session_dir / SESSION_FILE, _dumps(session))
+
+
+# ---------------------------------------------------------------------------
+# Version log
+# ---------------------------------------------------------------------------
+
+def _read_log(session_dir: Path) -> list[dict[str, Any]]:
+    path = session_dir / VERSIONS_FILE
+    if not path.is_file():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def _encode(version: int, code: str, previous: tuple[int, str] | None, last_snapshot: int) -> dict[str, Any]:
+    if previous is not None and version - last_snapshot < SNAPSHOT_EVERY:
+        base_version, base_code = previous
+        ops = make_delta(base_code, code)
+        if len(_dumps(ops)) < _DELTA_MAX_RATIO * len(code):
+            return {"v": version, "t": "d", "base": base_version, "ops": ops, "sha": _digest(code)}
+    return {"v": version, "t": "s", "code": code, "sha": _digest(code)}
+
+
+def _reconstruct(records: list[dict[str, Any]], version: int) -> str:
+    by_version = {r["v"]: r for r in records}
+    chain: list[dict[str, Any]] = []
+    record = by_version.get(version)
+    while record is not None and record["t"] == "d":
+        chain.append(record)
+        record = by_version.get(record["base"])
+    if record is None:
+        raise KeyError(f"Version {version} is not in the version log")
+    code = record["code"]
+    for delta in reversed(chain):
+        code = apply_delta(code, delta["ops"])
+    if _digest(code) != by_version[version]["sha"]:
+        raise ValueError(f"Version {version} does not reconstruct to its recorded hash")
+    return code
+
+
+def _legacy_versions(session: dict[str, Any]) -> list[tuple[int, str]]:
+    """(version, code) from a session written before the version log existed."""
+    versions = [
+        (int(h["version"]), h["code"]) for h in session.get("version_history", [])
+        if isinstance(h, dict) and "code" in h
+    ]
+    current = session.get("code")
+    latest = int(session.get("current_version") or session.get("version") or 1)
+    if current and all(v != latest for v, _ in versions):
+        versions.append((latest, current))
+    return sorted(versions)
+
+
+def _write_log(session_dir: Path, versions: list[tuple[int, str]]) -> None:
+    lines: list[str] = []
+    previous: tuple[int, str] | None = None
+    last_snapshot = 0
+    for version, code in versions:
+        record = _encode(version, code, previous, last_snapshot)
+        if record["t"] == "s":
+            last_snapshot = version
+        lines.append(_dumps(record))
+        previous = (version, code)
+    _write_atomic(session_dir / VERSIONS_FILE, "".join(line + "\n" for line in lines))
+
+
+def _strip_history_code(session: dict[str, Any]) -> None:
+    session["version_history"] = [
+        {k: v for k, v in h.items() if k != "code"} for h in session.get("version_history", [])
+    ]
+
+
+def init_history(session_dir: Path, session: dict[str, Any], code: str, **meta: Any) -> None:
+    """Start a new log with ``code`` as version 1 (replacing any previous log)."""
+    session_dir.mkdir(parents=True, exist_ok=True)
+    _write_log(session_dir, [(1, code)])
+    session.update(code=code, version=1, current_version=1)
+    session["version_history"] = [{"version": 1, **meta}]
+
+
+def append_version(session_dir: Path, session: dict[str, Any], code: str, **meta: Any) -> int:
+    """
+    Append ``code`` as the next version; updates ``code`` / ``version`` /
+    ``version_history`` in ``session`` (the caller saves it).  A session in
+    the old full-copy format is migrated first.  Returns the new version.
+    """
+    records = _read_log(session_dir)
+    if not records:
+        legacy = _legacy_versions(session)
+        if legacy:
+            _write_log(session_dir, legacy)
+            records = _read_log(session_dir)
+    _strip_history_code(session)
+
+    previous = None
+    last_snapshot = 0
+    if records:
+        latest = max(r["v"] for r in records)
+        previous = (latest, _reconstruct(records, latest))
+        last_snapshot = max(r["v"] for r in records if r["t"] == "s")
+    version = previous[0] + 1 if previous else 1
+
+    record = _encode(version, code, previous, last_snapshot)
+    with (session_dir / VERSIONS_FILE).open("a") as f:
+        f.write(_dumps(record) + "\n")
+
+    session.update(code=code, version=version, current_version=version)
+    session.setdefault("version_history", []).append({"version": version, **meta})
+    return version
+
+
+def read_version(session_dir: Path, version: int | None = None) -> str:
+    """Code of ``version`` (default: latest), rebuilt from the nearest snapshot."""
+    records = _read_log(session_dir)
+    if not records:
+        legacy = dict(_legacy_versions(load_session(session_dir)))
+        if version is None and legacy:
+            version = max(legacy)
+        if version not in legacy:
+            raise KeyError(f"Version {version} not found")
+        return legacy[version]
+    return _reconstruct(records, version if version is not None else max(r["v"] for r in records))
+
+
+def compact(session_dir: Path) -> dict[str, int]:
+    """
+    Rewrite the version log (snapshot spacing restored, duplicates dropped)
+    and the session file without embedded code copies.  Migrates legacy
+    sessions.  Returns byte sizes before / after.
+    """
+    session = load_session(session_dir)
+    log_path = session_dir / VERSIONS_FILE
+    session_path = session_dir / SESSION_FILE
+    before = sum(p.stat().st_size for p in (log_path, session_path) if p.is_file())
+
+    records = _read_log(session_dir)
+    if records:
+        versions = [(v, _reconstruct(records, v)) for v in sorted({r["v"] for r in records})]
+    else:
+        versions = _legacy_versions(session)
+    if versions:
+        _write_log(session_dir, versions)
+    if session:
+        _strip_history_code(session)
+        save_session(session_dir, session)
+
+    after = sum(p.stat().st_size for p in (log_path, session_path) if p.is_file())
+    return {"bytes_before": before, "bytes_after": after, "versions": len(versions)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m shared.session_store <sessions_dir> — compact every session
+    root = Path(sys.argv[1] if len(sys.argv) > 1 else "data/sessions")
+    for directory in sorted(p for p in root.iterdir() if (p / SESSION_FILE).is_file()):
+        stats = compact(directory)
+        print(f"{directory.name}: {stats['versions']} versions, {stats['bytes_before']} -> {stats['bytes_after']} bytes")
@@ -37,6 +37,11 @@ def _default_blender_executable() -> Path:
     return Path("/usr/bin/blender")
 
 
+def _merge_keys(single: str, pool: str) -> list[str]:
+    keys = [single.strip()] + [k.strip() for k in pool.split(",")]
+    return list(dict.fromkeys(k for k in keys if k))
+
+
 class ValidatorSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_prefix="RING_VAL_",
@@ -55,6 +60,14 @@ class ValidatorSettings(BaseSettings):
     gemini_api_key: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEY", ""))
     gemini_model: str = Field(default_factory=lambda: os.getenv("GEMINI_MODEL", "gemini-3-pro-preview"))
 
+    # Optional key pools (comma-separated). Calls are spread across every key
+    # by least-loaded selection; throttled keys cool down out of rotation.
+    anthropic_api_keys: str = Field(default_factory=lambda: os.getenv("ANTHROPIC_API_KEYS", ""))
+    gemini_api_keys: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEYS", ""))
+
+    # Corrections return only changed functions / a diff (falls back to full code)
+    patch_corrections: bool = True
+
     # Blender (needed for re-rendering corrected code)
     blender_executable: Path = Field(default_factory=_default_blender_executable)
     blender_timeout_seconds: int = Field(default=300, ge=10, le=600)
@@ -63,17 +76,27 @@ class ValidatorSettings(BaseSettings):
     master_prompt_path: Path = Field(
         default_factory=lambda: SERVICE_ROOT / "prompts" / "master_prompt.txt"
     )
+    # Send only core + request-relevant master prompt sections per call
+    filter_master_prompt: bool = True
 
     # Storage
     storage_dir: Path = Field(default_factory=lambda: SERVICE_ROOT / "data")
     sessions_subdir: str = "sessions"
     artifact_cache_subdir: str = "artifact_cache"
+    # least recently used cached artifacts are pruned beyond this size
+    artifact_cache_max_mb: int = Field(default=2048, ge=16, le=1_000_000)
 
     # Concurrency
     max_concurrent_jobs: int = Field(default_factory=_default_concurrency, ge=1, le=32)
+
     max_queue_size: int = Field(default=64, ge=1, le=10000)
     sync_wait_timeout_seconds: int = Field(default=300, ge=30, le=600)
 
+    # LLM connections: pre-create clients at startup and keep them warm with
+    # periodic lightweight pings (0 = warm once at startup only)
+    llm_warmup: bool = True
+    llm_keepalive_interval_seconds: int = Field(default=45, ge=0, le=3600)
+
     # Job lifecycle
     finished_job_ttl_seconds: int = Field(default=1800, ge=60, le=86400)
     cleanup_interval_seconds: int = Field(default=30, ge=5, le=3600)
@@ -95,13 +118,21 @@ class ValidatorSettings(BaseSettings):
     def artifact_cache_dir(self) -> Path:
         return self.storage_dir / self.artifact_cache_subdir
 
+    @property
+    def anthropic_key_pool(self) -> list[str]:
+        return _merge_keys(self.anthropic_api_key, self.anthropic_api_keys)
+
+    @property
+    def gemini_key_pool(self) -> list[str]:
+        return _merge_keys(self.gemini_api_key, self.gemini_api_keys)
+
     @property
     def claude_available(self) -> bool:
-        return bool(self.anthropic_api_key)
+        return bool(self.anthropic_key_pool)
 
     @property
     def gemini_available(self) -> bool:
-        return bool(self.gemini_api_key)
+        return bool(self.gemini_key_pool)
 
 
 settings = ValidatorSettings()
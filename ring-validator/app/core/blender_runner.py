@@ -1,8 +1,9 @@
 """
 Blender headless execution for re-rendering corrected code.
 
-Identical to ring-generator's blender_runner — scene clear, safety
-preprocessing, auto build() + export, spatial report, GLB export.
+Identical to ring-generator's blender_runner — scene clear, preloaded
+helper library (blender_lib/ring_helpers.py), safety preprocessing, auto
+build() + export, spatial report, GLB export.
 
 Used when the validation LLM returns corrected code that needs to be
 compiled into a new GLB.
@@ -16,6 +17,7 @@ import os
 import re
 import time
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -85,7 +87,10 @@ def _strip_main_guard(code: str) -> str:
 # Scene clear — prepended to every script
 # ---------------------------------------------------------------------------
 
-_SCENE_CLEAR = """
+# Blender-side helper module directory (service root / blender_lib)
+BLENDER_LIB_DIR = Path(__file__).resolve().parents[2] / "blender_lib"
+
+_SCENE_CLEAR = f"""
 # ========================= AUTO SCENE CLEAR =========================
 import bpy
 bpy.ops.object.select_all(action='SELECT')
@@ -98,6 +103,24 @@ for mat in list(bpy.data.materials):
     bpy.data.materials.remove(mat)
 print("[PIPELINE] Scene cleared")
 # ========================= END SCENE CLEAR =========================
+# ========================= PRELOADED HELPERS =========================
+import sys as _sys
+_sys.path.insert(0, r"{BLENDER_LIB_DIR}")
+try:
+    import ring_helpers as _rh
+    from ring_helpers import *
+    print(f"[PIPELINE] ring_helpers {{_rh.__version__}} preloaded")
+except ImportError as _he:
+    _rh = None
+    print(f"[PIPELINE] ring_helpers not available: {{_he}}")
+try:
+    import ring_components as _rc
+    from ring_components import *
+    print(f"[PIPELINE] ring_components {{_rc.__version__}} preloaded")
+except ImportError as _ce:
+    _rc = None
+    print(f"[PIPELINE] ring_components not available: {{_ce}}")
+# ========================= END PRELOADED HELPERS =========================
 
 """
 
@@ -109,6 +132,14 @@ def _build_export_code(glb_output_path: str) -> str:
 import bpy, os, traceback as _tb
 from mathutils import Vector
 
+# Compatibility shim: helpers the script defines itself shadow the preloaded ones.
+_own_helpers = [
+    _n for _m in (_rh, _rc) if _m is not None
+    for _n in _m.__all__ if globals().get(_n) is not getattr(_m, _n)
+]
+if _own_helpers:
+    print(f"[PIPELINE] Script defines its own helpers (preloaded versions shadowed): {{_own_helpers}}")
+
 _output = r"{glb_output_path}"
 os.makedirs(os.path.dirname(_output), exist_ok=True)
 
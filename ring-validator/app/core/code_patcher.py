@@ -0,0 +1,364 @@
+"""
+Patch application for fix rounds and validator corrections.
+
+In patch mode the LLM returns only what changed instead of the whole
+script, in one of two shapes:
+
+  - function-level replacements: complete top-level ``def`` blocks (and
+    optionally top-level constant assignments / imports) inside
+    ```python fences — each replaces the same-named definition
+  - a unified diff inside a ```diff fence
+
+Diff hunks are located fuzzily (exact → whitespace-insensitive →
+similarity-ratio window) so small context drift in the model's output
+does not reject an otherwise-correct patch.  A patch that cannot be
+applied cleanly, or that leaves the script uncompilable, is reported as
+failed and callers fall back to full-code mode.
+
+All functions here are pure/stateless.
+"""
+
+from __future__ import annotations
+
+import ast
+import difflib
+import re
+from dataclasses import dataclass, field
+
+_FENCE_RE = re.compile(r"```(\w*)[ \t]*\n(.*?)(?:\n```|\Z)", re.DOTALL)
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_FUZZY_MIN_RATIO = 0.85
+
+
+@dataclass
+class PatchResult:
+    success: bool
+    code: str = ""
+    mode: str = ""                      # "functions" | "diff" | "full"
+    replaced: list[str] = field(default_factory=list)
+    added: list[str] = field(default_factory=list)
+    hunks_applied: int = 0
+    error: str = ""
+
+
+# ---------------------------------------------------------------------------
+# Public entry point
+# ---------------------------------------------------------------------------
+
+def apply_patch(code: str, raw_response: str) -> PatchResult:
+    """Apply an LLM patch response to ``code``."""
+    fences = _FENCE_RE.findall(raw_response)
+    diff_blocks = [body for lang, body in fences if lang.lower() in ("diff", "patch")]
+    python_blocks = [body for lang, body in fences if lang.lower() in ("python", "py", "")]
+
+    if not diff_blocks and not python_blocks and _looks_like_diff(raw_response):
+        diff_blocks = [raw_response]
+
+    if diff_blocks:
+        result = apply_unified_diff(code, "\n".join(diff_blocks))
+    elif python_blocks:
+        result = apply_function_patch(code, "\n\n".join(python_blocks))
+    else:
+        return PatchResult(success=False, error="No patch found in response")
+
+    if result.success:
+        error = _compile_error(result.code)
+        if error:
+            return PatchResult(success=False, mode=result.mode, error=f"Patched code does not compile: {error}")
+    return result
+
+
+def _looks_like_diff(text: str) -> bool:
+    return bool(re.search(r"^@@ -\d+", text, re.MULTILINE))
+
+
+def _compile_error(code: str) -> str:
+    try:
+        compile(code, "<patched>", "exec")
+    except SyntaxError as e:
+        return f"{e.msg} (line {e.lineno})"
+    return ""
+
+
+# ---------------------------------------------------------------------------
+# Function-level replacement
+# ---------------------------------------------------------------------------
+
+def _node_span(node: ast.stmt) -> tuple[int, int]:
+    """0-based [start, end) line span including decorators."""
+    start = node.lineno
+    for deco in getattr(node, "decorator_list", []):
+        start = min(start, deco.lineno)
+    return start - 1, node.end_lineno or node.lineno
+
+
+def _assign_name(node: ast.stmt) -> str | None:
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return node.targets[0].id
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return node.target.id
+    return None
+
+
+def top_level_definitions(code: str) -> dict[str, tuple[int, int]]:
+    """Map top-level function/class/constant names to their 0-based line spans."""
+    tree = ast.parse(code)
+    spans: dict[str, tuple[int, int]] = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            spans[node.name] = _node_span(node)
+        else:
+            name = _assign_name(node)
+            if name:
+                spans[name] = _node_span(node)
+    return spans
+
+
+def _is_full_script(code_tree: ast.Module, patch_tree: ast.Module) -> bool:
+    original = {
+        n.name for n in code_tree.body
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    patched = {
+        n.name for n in patch_tree.body
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    return bool(original) and original <= patched
+
+
+def apply_function_patch(code: str, patch_code: str) -> PatchResult:
+    try:
+        code_tree = ast.parse(code)
+    except SyntaxError:
+        code_tree = None
+    try:
+        patch_tree = ast.parse(patch_code)
+    except SyntaxError as e:
+        return PatchResult(success=False, mode="functions", error=f"Patch is not valid Python: {e.msg}")
+
+    if code_tree is None or _is_full_script(code_tree, patch_tree):
+        # The model ignored patch mode and returned the whole script.
+        return PatchResult(success=True, code=patch_code.strip(), mode="full")
+
+    code_lines = code.split("\n")
+    patch_lines = patch_code.split("\n")
+    spans = top_level_definitions(code)
+
+    replacements: list[tuple[int, int, list[str]]] = []
+    new_defs: list[list[str]] = []
+    new_assigns: list[list[str]] = []
+    new_imports: list[str] = []
+    replaced: list[str] = []
+    added: list[str] = []
+
+    existing_imports = {
+        line.strip() for line in code_lines
+        if line.startswith(("import ", "from "))
+    }
+
+    for node in patch_tree.body:
+        start, end = _node_span(node)
+        block = patch_lines[start:end]
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for line in block:
+                if line.strip() and line.strip() not in existing_imports:
+                    new_imports.append(line)
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            name = node.name
+        else:
+            name = _assign_name(node)
+            if not name:
+                continue
+        if name in spans:
+            o_start, o_end = spans[name]
+            replacements.append((o_start, o_end, block))
+            replaced.append(name)
+        else:
+            (new_assigns if isinstance(node, (ast.Assign, ast.AnnAssign)) else new_defs).append(block)
+            added.append(name)
+
+    if not replacements and not new_defs and not new_assigns:
+        return PatchResult(success=False, mode="functions", error="Patch contains no top-level definitions")
+
+    # Replace bottom-up so earlier spans stay valid.
+    lines = list(code_lines)
+    for start, end, block in sorted(replacements, key=lambda r: r[0], reverse=True):
+        lines[start:end] = block
+
+    if new_defs or new_assigns:
+        spans = top_level_definitions("\n".join(lines))
+        if new_defs:
+            insert_at = spans["build"][0] if "build" in spans else len(lines)
+            insertion: list[str] = []
+            for block in new_defs:
+                insertion.extend(block + ["", ""])
+            lines[insert_at:insert_at] = insertion
+        if new_assigns:
+            first_def = min(
+                (
+                    _node_span(n)[0] for n in ast.parse("\n".join(lines)).body
+                    if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+                ),
+                default=len(lines),
+            )
+            lines[first_def:first_def] = [l for block in new_assigns for l in block] + [""]
+
+    if new_imports:
+        last_import = max(
+            (i for i, line in enumerate(lines) if line.startswith(("import ", "from "))),
+            default=-1,
+        )
+        lines[last_import + 1:last_import + 1] = new_imports
+
+    return PatchResult(
+        success=True,
+        code="\n".join(lines),
+        mode="functions",
+        replaced=replaced,
+        added=added,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Unified diff with fuzzy hunk location
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Hunk:
+    old_start: int | None
+    ops: list[tuple[str, str]] = field(default_factory=list)   # (" " | "-" | "+", text)
+
+    @property
+    def old(self) -> list[str]:
+        return [text for tag, text in self.ops if tag != "+"]
+
+    @property
+    def new(self) -> list[str]:
+        return [text for tag, text in self.ops if tag != "-"]
+
+
+def _parse_hunks(diff_text: str) -> list[_Hunk]:
+    hunks: list[_Hunk] = []
+    current: _Hunk | None = None
+    for line in diff_text.split("\n"):
+        if line.startswith(("--- ", "+++ ", "diff ", "index ")):
+            continue
+        header = _HUNK_HEADER_RE.match(line)
+        if header:
+            current = _Hunk(old_start=int(header.group(1)))
+            hunks.append(current)
+            continue
+        if line.startswith("@@"):
+            current = _Hunk(old_start=None)
+            hunks.append(current)
+            continue
+        if current is None or line.startswith("\\"):
+            continue
+        if line.startswith(("-", "+", " ")):
+            current.ops.append((line[0], line[1:]))
+        elif line == "":
+            current.ops.append((" ", ""))
+    for hunk in hunks:
+        while hunk.ops and hunk.ops[-1] == (" ", ""):
+            hunk.ops.pop()
+    return [h for h in hunks if h.ops]
+
+
+def _find_block(lines: list[str], block: list[str], hint: int) -> tuple[int, bool] | None:
+    """Locate ``block`` in ``lines``; returns (index, exact) nearest to ``hint``."""
+    n = len(block)
+    if n == 0 or n > len(lines):
+        return None
+    candidates = range(len(lines) - n + 1)
+
+    def nearest(matches: list[int]) -> int:
+        return min(matches, key=lambda i: abs(i - hint))
+
+    exact = [i for i in candidates if lines[i:i + n] == block]
+    if exact:
+        return nearest(exact), True
+
+    stripped_block = [l.strip() for l in block]
+    loose = [i for i in candidates if [l.strip() for l in lines[i:i + n]] == stripped_block]
+    if loose:
+        return nearest(loose), False
+
+    target = "\n".join(stripped_block)
+    best: tuple[float, int] | None = None
+    for i in candidates:
+        window = "\n".join(l.strip() for l in lines[i:i + n])
+        matcher = difflib.SequenceMatcher(None, window, target, autojunk=False)
+        if matcher.real_quick_ratio() < _FUZZY_MIN_RATIO or matcher.quick_ratio() < _FUZZY_MIN_RATIO:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= _FUZZY_MIN_RATIO and (
+            best is None or ratio > best[0] or (ratio == best[0] and abs(i - hint) < abs(best[1] - hint))
+        ):
+            best = (ratio, i)
+    if best:
+        return best[1], False
+    return None
+
+
+def _indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip(" "))
+
+
+def _merge_hunk(hunk: _Hunk, matched: list[str]) -> list[str]:
+    """
+    Produce the replacement for a loosely matched region: context lines keep
+    the file's own text, added lines are shifted by the indentation drift
+    observed on the nearest preceding context/removed line.
+    """
+    out: list[str] = []
+    j = 0
+    delta = 0
+    for tag, text in hunk.ops:
+        if tag == "+":
+            if not text.strip():
+                out.append(text)
+            elif delta >= 0:
+                out.append(" " * delta + text)
+            else:
+                out.append(text[min(-delta, _indent_of(text)):])
+            continue
+        original = matched[j] if j < len(matched) else text
+        j += 1
+        if text.strip() and original.strip():
+            delta = _indent_of(original) - _indent_of(text)
+        if tag == " ":
+            out.append(original)
+    return out
+
+
+def apply_unified_diff(code: str, diff_text: str) -> PatchResult:
+    hunks = _parse_hunks(diff_text)
+    if not hunks:
+        return PatchResult(success=False, mode="diff", error="Diff contains no hunks")
+
+    lines = code.split("\n")
+    offset = 0
+    for idx, hunk in enumerate(hunks, 1):
+        hint = (hunk.old_start - 1 + offset) if hunk.old_start else 0
+        if not hunk.old:
+            if hunk.old_start is None:
+                return PatchResult(success=False, mode="diff", error=f"Hunk {idx}: pure insertion without position")
+            pos = max(0, min(len(lines), hint + 1))
+            lines[pos:pos] = hunk.new
+            offset += len(hunk.new)
+            continue
+
+        found = _find_block(lines, hunk.old, max(0, hint))
+        if found is None:
+            return PatchResult(
+                success=False, mode="diff", hunks_applied=idx - 1,
+                error=f"Hunk {idx} does not match the current code",
+            )
+        pos, exact = found
+        matched = lines[pos:pos + len(hunk.old)]
+        new_lines = hunk.new if exact else _merge_hunk(hunk, matched)
+        lines[pos:pos + len(hunk.old)] = new_lines
+        offset += len(new_lines) - len(hunk.old)
+
+    return PatchResult(success=True, code="\n".join(lines), mode="diff", hunks_applied=len(hunks))
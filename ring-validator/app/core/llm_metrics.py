@@ -0,0 +1,179 @@
+"""
+LLM call latency instrumentation.
+
+Every provider call is streamed and timed with a ``StreamTimer``:
+
+  - ttft          time from the start of the successful attempt to the first
+                  streamed text chunk
+  - total         wall time of the whole call, including failed attempts
+  - retry_wait    time spent before the successful attempt started
+                  (throttled attempts + backoff sleeps)
+  - max_gap       longest gap between consecutive chunks — a stall detector
+  - output_tps    output tokens / time from first chunk to end (decode speed)
+
+The resulting ``CallTiming`` travels with the call's usage record (cost
+details, session.json) and is aggregated per model in a process-wide
+``LLMMetricsRegistry`` served by ``GET /metrics/llm``.
+"""
+
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+STALL_THRESHOLD_SECONDS = 20.0
+_WINDOW = 500
+
+
+@dataclass(frozen=True)
+class CallTiming:
+    ttft_seconds: float | None = None
+    total_seconds: float = 0.0
+    retry_wait_seconds: float = 0.0
+    max_gap_seconds: float = 0.0
+    output_tokens_per_second: float | None = None
+    attempts: int = 1
+    chunks: int = 0
+
+    @property
+    def stalled(self) -> bool:
+        return self.max_gap_seconds >= STALL_THRESHOLD_SECONDS
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "ttft_seconds": self.ttft_seconds,
+            "total_seconds": self.total_seconds,
+            "retry_wait_seconds": self.retry_wait_seconds,
+            "max_gap_seconds": self.max_gap_seconds,
+            "output_tokens_per_second": self.output_tokens_per_second,
+            "attempts": self.attempts,
+            "chunks": self.chunks,
+            "stalled": self.stalled,
+        }
+
+
+class StreamTimer:
+    """Timer for one logical LLM call (possibly several attempts)."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.attempts = 0
+        self._attempt_start = self.t0
+        self._first: float | None = None
+        self._last: float | None = None
+        self._max_gap = 0.0
+        self._chunks = 0
+
+    def begin_attempt(self) -> None:
+        self.attempts += 1
+        self._attempt_start = time.perf_counter()
+        self._first = self._last = None
+        self._max_gap = 0.0
+        self._chunks = 0
+
+    def chunk(self) -> None:
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+        else:
+            self._max_gap = max(self._max_gap, now - (self._last or now))
+        self._last = now
+        self._chunks += 1
+
+    def finish(self, output_tokens: int = 0) -> CallTiming:
+        end = time.perf_counter()
+        total = end - self.t0
+        retry_wait = self._attempt_start - self.t0
+        ttft = (self._first - self._attempt_start) if self._first is not None else None
+        decode = end - (self._first if self._first is not None else self._attempt_start)
+        tps = output_tokens / decode if output_tokens and decode > 0 else None
+        return CallTiming(
+            ttft_seconds=round(ttft, 3) if ttft is not None else None,
+            total_seconds=round(total, 3),
+            retry_wait_seconds=round(retry_wait, 3),
+            max_gap_seconds=round(self._max_gap, 3),
+            output_tokens_per_second=round(tps, 1) if tps is not None else None,
+            attempts=max(1, self.attempts),
+            chunks=self._chunks,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Per-model aggregation
+# ---------------------------------------------------------------------------
+
+def _summary(values: deque[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class _ModelStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.stalls = 0
+        self.retried = 0
+        self.ttft: deque[float] = deque(maxlen=_WINDOW)
+        self.total: deque[float] = deque(maxlen=_WINDOW)
+        self.tps: deque[float] = deque(maxlen=_WINDOW)
+        self.retry_wait: deque[float] = deque(maxlen=_WINDOW)
+        self.max_gap: deque[float] = deque(maxlen=_WINDOW)
+
+
+class LLMMetricsRegistry:
+    def __init__(self) -> None:
+        self._models: dict[str, _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, timing: CallTiming) -> None:
+        with self._lock:
+            stats = self._models.setdefault(model, _ModelStats())
+            stats.calls += 1
+            stats.stalls += int(timing.stalled)
+            stats.retried += int(timing.attempts > 1)
+            if timing.ttft_seconds is not None:
+                stats.ttft.append(timing.ttft_seconds)
+            if timing.output_tokens_per_second is not None:
+                stats.tps.append(timing.output_tokens_per_second)
+            stats.total.append(timing.total_seconds)
+            stats.retry_wait.append(timing.retry_wait_seconds)
+            stats.max_gap.append(timing.max_gap_seconds)
+
+    def record_error(self, model: str) -> None:
+        with self._lock:
+            self._models.setdefault(model, _ModelStats()).errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "window": _WINDOW,
+                "stall_threshold_seconds": STALL_THRESHOLD_SECONDS,
+                "models": {
+                    model: {
+                        "calls": s.calls,
+                        "errors": s.errors,
+                        "retried_calls": s.retried,
+                        "stalled_calls": s.stalls,
+                        "ttft_seconds": _summary(s.ttft),
+                        "total_seconds": _summary(s.total),
+                        "output_tokens_per_second": _summary(s.tps),
+                        "retry_wait_seconds": _summary(s.retry_wait),
+                        "max_gap_seconds": _summary(s.max_gap),
+                    }
+                    for model, s in self._models.items()
+                },
+            }
+
+
+llm_metrics = LLMMetricsRegistry()
@@ -18,34 +18,17 @@ import base64
 import logging
 import re
 import time
-from dataclasses import dataclass
-from typing import Any
+from dataclasses import dataclass, field
+from typing import Any, Sequence
 
-import anthropic
-from google import genai
 from google.genai import types as genai_types
 
-logger = logging.getLogger(__name__)
-
-
-# ---------------------------------------------------------------------------
-# Client pool — lazy singleton per API key
-# ---------------------------------------------------------------------------
-
-_claude_clients: dict[str, anthropic.Anthropic] = {}
-_gemini_clients: dict[str, genai.Client] = {}
-
+from .code_patcher import apply_patch
+from .key_pool import KeyPool, get_key_pool, is_throttle_error, retry_after_seconds
+from .llm_connections import get_claude_client, get_gemini_client
+from .llm_metrics import CallTiming, StreamTimer, llm_metrics
 
-def _get_claude_client(api_key: str) -> anthropic.Anthropic:
-    if api_key not in _claude_clients:
-        _claude_clients[api_key] = anthropic.Anthropic(api_key=api_key)
-    return _claude_clients[api_key]
-
-
-def _get_gemini_client(api_key: str) -> genai.Client:
-    if api_key not in _gemini_clients:
-        _gemini_clients[api_key] = genai.Client(api_key=api_key)
-    return _gemini_clients[api_key]
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
@@ -61,17 +44,33 @@ class ValidationLLMResult:
     tokens_in: int = 0
     tokens_out: int = 0
     full_response: str = ""
+    # One CallTiming.to_dict() per provider request (two when a patch falls back to full code)
+    timings: list[dict[str, Any]] = field(default_factory=list)
 
 
 # ---------------------------------------------------------------------------
 # Validation prompt — identical to original
 # ---------------------------------------------------------------------------
 
+_PATCH_OUTPUT_RULES = """Return ONLY what you changed — do NOT repeat the whole script. Either:
+  A) every top-level function you changed or added, each COMPLETE from its `def` line to its
+     last line, inside ```python ... ``` fences (include changed top-level constants and new
+     imports in the same fence), or
+  B) a unified diff against the code above inside a ```diff fence, with at least 3 lines of
+     unchanged context around every hunk.
+Unchanged functions must NOT be repeated. Your changes must leave the code immediately runnable in Blender."""
+
+_FULL_OUTPUT_RULES = """Return the COMPLETE corrected Python code inside ```python ... ``` fences.
+The code must be immediately runnable in Blender."""
+
+
 def _build_validation_prompt(
     code: str,
     user_prompt: str,
     master_prompt: str,
+    patch_mode: bool = False,
 ) -> str:
+    output_rules = _PATCH_OUTPUT_RULES if patch_mode else _FULL_OUTPUT_RULES
     return f"""You are a senior 3D jewelry geometry engineer. You are reviewing a ring that was just generated.
 
 MASTER PROMPT (the rules this code must follow):
@@ -128,8 +127,7 @@ CORRECTION RULES:
 11. The code MUST still call build() and produce valid geometry
 12. Every distinct object (each diamond, each prong, band, head, etc.) MUST be a separate mesh
 
-Return the COMPLETE corrected Python code inside ```python ... ``` fences.
-The code must be immediately runnable in Blender."""
+{output_rules}"""
 
 
 # ---------------------------------------------------------------------------
@@ -160,6 +158,143 @@ def resolve_model_name(llm_name: str) -> str:
     return "claude-sonnet-4-6"
 
 
+# ---------------------------------------------------------------------------
+# Key rotation — retry a throttled call on another pooled key
+# ---------------------------------------------------------------------------
+
+def _with_key_rotation(key_pool: KeyPool, call: Any, timer: StreamTimer | None = None) -> Any:
+    for attempt in range(1, len(key_pool) + 1):
+        api_key = key_pool.acquire()
+        if timer:
+            timer.begin_attempt()
+        try:
+            return call(api_key)
+        except Exception as e:
+            if is_throttle_error(e):
+                key_pool.mark_throttled(api_key, retry_after_seconds(e))
+                if attempt < len(key_pool) and key_pool.has_alternative(api_key):
+                    logger.warning("Validation call throttled (attempt %d), switching key...", attempt)
+                    continue
+            raise
+        finally:
+            key_pool.release(api_key)
+    raise RuntimeError("No API key available")
+
+
+# ---------------------------------------------------------------------------
+# Provider request — returns (response_text, tokens_in, tokens_out, timing)
+# ---------------------------------------------------------------------------
+
+def _stream_gemini(client: Any, gemini_model: str, contents: Any, timer: StreamTimer) -> tuple[str, Any]:
+    text = ""
+    usage = None
+    for chunk in client.models.generate_content_stream(model=gemini_model, contents=contents):
+        if chunk.text:
+            timer.chunk()
+            text += chunk.text
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+    return text, usage
+
+
+def _stream_claude(client: Any, content: list[dict[str, Any]], timer: StreamTimer) -> tuple[str, Any]:
+    text = ""
+    with client.messages.stream(
+        model="claude-opus-4-6",
+        max_tokens=20000,
+        messages=[{"role": "user", "content": content}],
+    ) as stream:
+        for chunk in stream.text_stream:
+            timer.chunk()
+            text += chunk
+        return text, stream.get_final_message().usage
+
+
+def _request_validation(
+    validation_prompt: str,
+    images_data: list[dict[str, str]],
+    model_name: str,
+    anthropic_api_key: str | Sequence[str],
+    gemini_api_key: str | Sequence[str],
+    gemini_model: str,
+) -> tuple[str, int, int, CallTiming]:
+    timer = StreamTimer()
+    metrics_model = gemini_model if model_name == "gemini-3-pro-preview" else "claude-opus-4-6"
+    try:
+        text, tokens_in, tokens_out = _request_validation_streamed(
+            validation_prompt, images_data, model_name,
+            anthropic_api_key, gemini_api_key, gemini_model, timer,
+        )
+    except Exception:
+        llm_metrics.record_error(metrics_model)
+        raise
+    timing = timer.finish(tokens_out)
+    llm_metrics.record(metrics_model, timing)
+    logger.info(
+        "Validation response: ttft=%ss, %s tok/s, total %.1fs, max gap %.1fs",
+        timing.ttft_seconds, timing.output_tokens_per_second, timing.total_seconds, timing.max_gap_seconds,
+    )
+    return text, tokens_in, tokens_out, timing
+
+
+def _request_validation_streamed(
+    validation_prompt: str,
+    images_data: list[dict[str, str]],
+    model_name: str,
+    anthropic_api_key: str | Sequence[str],
+    gemini_api_key: str | Sequence[str],
+    gemini_model: str,
+    timer: StreamTimer,
+) -> tuple[str, int, int]:
+    if model_name == "gemini-3-pro-preview":
+        key_pool = get_key_pool("gemini", gemini_api_key)
+
+        parts: list[Any] = []
+        for img in images_data:
+            img_bytes = base64.b64decode(img["data"])
+            parts.append(genai_types.Part.from_bytes(data=img_bytes, mime_type=img["mime"]))
+
+        parts.append(genai_types.Part(text=f"You are a luxury jewelry design critic.\n\n{validation_prompt}"))
+
+        text, usage = _with_key_rotation(
+            key_pool,
+            lambda key: _stream_gemini(
+                get_gemini_client(key),
+                gemini_model,
+                genai_types.Content(parts=parts, role="user"),
+                timer,
+            ),
+            timer,
+        )
+
+        return text, usage.prompt_token_count, usage.candidates_token_count
+
+    key_pool = get_key_pool("anthropic", anthropic_api_key)
+
+    content: list[dict[str, Any]] = []
+    for img in images_data:
+        content.append({
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": img["mime"],
+                "data": img["data"],
+            },
+        })
+    content.append({
+        "type": "text",
+        "text": f"You are a luxury jewelry design critic.\\n\\n{validation_prompt}",
+    })
+
+    text, usage = _with_key_rotation(
+        key_pool,
+        lambda key: _stream_claude(get_claude_client(key), content, timer),
+        timer,
+    )
+
+    return text, usage.input_tokens, usage.output_tokens
+
+
 # ---------------------------------------------------------------------------
 # Synchronous validation call (offloaded to thread-pool)
 # ---------------------------------------------------------------------------
@@ -170,66 +305,33 @@ def _validate_with_model_sync(
     user_prompt: str,
     master_prompt: str,
     model_name: str,
-    anthropic_api_key: str,
-    gemini_api_key: str,
+    anthropic_api_key: str | Sequence[str],
+    gemini_api_key: str | Sequence[str],
     gemini_model: str,
+    patch_mode: bool = False,
 ) -> ValidationLLMResult:
     """
     1:1 port of validate_with_model() from vibe-designing-3d/app.py.
     Synchronous — must be called from a thread-pool.
+
+    Keys may be pools; a throttled key is taken out of rotation and the
+    call is retried once per remaining key.
+
+    In patch mode the model returns only the changed functions (or a diff);
+    if that patch cannot be applied the correction is re-requested as
+    complete code (a reply with no code at all carries no correction).
     """
     logger.info("Validating ring with %s (%d screenshots)...", model_name, len(screenshots_b64))
 
-    validation_prompt = _build_validation_prompt(code, user_prompt, master_prompt)
+    validation_prompt = _build_validation_prompt(code, user_prompt, master_prompt, patch_mode=patch_mode)
     images_data = _parse_screenshots(screenshots_b64)
 
     try:
-        if model_name == "gemini-3-pro-preview":
-            client = _get_gemini_client(gemini_api_key)
-
-            parts: list[Any] = []
-            for img in images_data:
-                img_bytes = base64.b64decode(img["data"])
-                parts.append(genai_types.Part.from_bytes(data=img_bytes, mime_type=img["mime"]))
-
-            parts.append(genai_types.Part(text=f"You are a luxury jewelry design critic.\n\n{validation_prompt}"))
-
-            response = client.models.generate_content(
-                model=gemini_model,
-                contents=genai_types.Content(parts=parts, role="user"),
-            )
-
-            response_text = response.text
-            tokens_in = response.usage_metadata.prompt_token_count
-            tokens_out = response.usage_metadata.candidates_token_count
-
-        else:
-            client = _get_claude_client(anthropic_api_key)
-
-            content: list[dict[str, Any]] = []
-            for img in images_data:
-                content.append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": img["mime"],
-                        "data": img["data"],
-                    },
-                })
-            content.append({
-                "type": "text",
-                "text": f"You are a luxury jewelry design critic.\\n\\n{validation_prompt}",
-            })
-
-            response = client.messages.create(
-                model="claude-opus-4-6",
-                max_tokens=20000,
-                messages=[{"role": "user", "content": content}],
-            )
-
-            response_text = response.content[0].text
-            tokens_in = response.usage.input_tokens
-            tokens_out = response.usage.output_tokens
+        response_text, tokens_in, tokens_out, timing = _request_validation(
+            validation_prompt, images_data, model_name,
+            anthropic_api_key, gemini_api_key, gemini_model,
+        )
+        timings = [timing.to_dict()]
 
         # Cost calculation — identical to original
         if model_name == "gemini-3-pro-preview":
@@ -242,7 +344,10 @@ def _validate_with_model_sync(
             input_cost_per_mtok = 3.0
             output_cost_per_mtok = 15.0
 
-        cost = (tokens_in / 1_000_000) * input_cost_per_mtok + (tokens_out / 1_000_000) * output_cost_per_mtok
+        def _cost() -> float:
+            return (tokens_in / 1_000_000) * input_cost_per_mtok + (tokens_out / 1_000_000) * output_cost_per_mtok
+
+        cost = _cost()
 
         logger.info("Validation tokens: in=%d, out=%d, cost=$%.4f", tokens_in, tokens_out, cost)
 
@@ -256,11 +361,48 @@ def _validate_with_model_sync(
                 cost=cost,
                 tokens_in=tokens_in,
                 tokens_out=tokens_out,
+                timings=timings,
             )
 
-        code_match = re.search(r"```python\n(.*?)\n```", response_text, re.DOTALL)
-        if code_match:
-            corrected_code = code_match.group(1)
+        corrected_code: str | None = None
+        if patch_mode:
+            patch = apply_patch(code, response_text)
+            if patch.success:
+                logger.info(
+                    "Validation patch applied (%s): replaced=%s added=%s",
+                    patch.mode, patch.replaced, patch.added,
+                )
+                corrected_code = patch.code
+            elif not patch.mode:
+                # no code block or diff in the reply — nothing to retry in full-code mode
+                logger.info("Validation reply contains no patch — no corrected code")
+            else:
+                logger.warning("Validation patch not applicable (%s) — requesting full code", patch.error)
+                full_prompt = _build_validation_prompt(code, user_prompt, master_prompt)
+                response_text, extra_in, extra_out, timing = _request_validation(
+                    full_prompt, images_data, model_name,
+                    anthropic_api_key, gemini_api_key, gemini_model,
+                )
+                timings.append(timing.to_dict())
+                tokens_in += extra_in
+                tokens_out += extra_out
+                cost = _cost()
+                if response_text.strip().upper().startswith("VALID"):
+                    return ValidationLLMResult(
+                        is_valid=True,
+                        message="Ring design is beautiful!",
+                        cost=cost,
+                        tokens_in=tokens_in,
+                        tokens_out=tokens_out,
+                        timings=timings,
+                    )
+
+        if corrected_code is None:
+            code_match = re.search(r"```python\n(.*?)\n```", response_text, re.DOTALL)
+            if code_match:
+                corrected_code = code_match.group(1)
+
+        if corrected_code:
             return ValidationLLMResult(
                 is_valid=False,
                 message="Generating more beautiful design...",
@@ -269,6 +411,7 @@ def _validate_with_model_sync(
                 tokens_in=tokens_in,
                 tokens_out=tokens_out,
                 full_response=response_text,
+                timings=timings,
             )
 
         return ValidationLLMResult(
@@ -277,6 +420,7 @@ def _validate_with_model_sync(
             cost=cost,
             tokens_in=tokens_in,
             tokens_out=tokens_out,
+            timings=timings,
         )
 
     except Exception as e:
@@ -300,9 +444,10 @@ async def validate_with_model(
     user_prompt: str,
     master_prompt: str,
     model_name: str,
-    anthropic_api_key: str = "",
-    gemini_api_key: str = "",
+    anthropic_api_key: str | Sequence[str] = "",
+    gemini_api_key: str | Sequence[str] = "",
     gemini_model: str = "gemini-3-pro-preview",
+    patch_mode: bool = False,
 ) -> ValidationLLMResult:
     """Async wrapper — offloads blocking LLM call to thread-pool."""
     loop = asyncio.get_running_loop()
@@ -317,4 +462,5 @@ async def validate_with_model(
         anthropic_api_key,
         gemini_api_key,
         gemini_model,
+        patch_mode,
     )
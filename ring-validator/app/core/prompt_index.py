@@ -0,0 +1,205 @@
+"""
+Relevance-filtered master prompt assembly.
+
+The master prompt is split into its headed sections (``## SECTION X`` and
+``### X0`` headings).  Every call always receives the core sections —
+preamble rules, coordinate system, headless/bmesh doctrine, modifier
+stack, API compliance, output safety, template and summary — and only
+the optional sections relevant to the call, chosen by:
+
+  - keyword hits in the user request (e.g. "halo" → head/setting sections)
+  - the error class of a fix call (e.g. AttributeError → API compliance)
+  - the component functions present in the code (``build_prongs`` → prongs)
+  - a BM25-style lexical score of the request against each section
+
+Sections are re-assembled in their original order so the prompt reads
+exactly like the full file with the irrelevant parts removed.  Each
+selection reports an estimate of the input tokens it saved.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+_HEADING_RE = re.compile(r"^(?:## SECTION ([A-Z]):|### ([A-Z]\d+):)", re.MULTILINE)
+_SUMMARY_MARKER = "SUMMARY OF ABSOLUTE RULES:"
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9]+")
+_DEF_RE = re.compile(r"^\s*def\s+(\w+)\s*\(", re.MULTILINE)
+_CHARS_PER_TOKEN = 4
+
+# Call kinds: "generate", "fix", "validate"
+_CORE_ALWAYS = frozenset({"preamble", "A", "A0", "B", "C", "D", "I", "J", "K", "L", "summary"})
+_CORE_BY_KIND: dict[str, frozenset[str]] = {
+    "generate": frozenset({"E"}),
+    "validate": frozenset({"A1", "A3"}),
+}
+
+_HEAD_WORDS = (
+    "head", "setting", "prong", "solitaire", "halo", "cathedral", "basket", "crown",
+    "bezel", "gallery", "shoulder", "center", "centre", "three", "stone", "engagement",
+    "split", "trilogy", "cluster",
+)
+_GEM_WORDS = ("gem", "diamond", "stone", "sapphire", "ruby", "emerald", "brilliant", "carat", "cut")
+
+_SECTION_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "A1": _HEAD_WORDS + _GEM_WORDS,
+    "A2": _HEAD_WORDS + _GEM_WORDS + ("accent", "milgrain", "filigree"),
+    "A3": ("halo", "pave", "accent", "eternity", "cluster", "three", "channel") + _GEM_WORDS,
+    "E": ("aesthetic", "elegant", "luxury", "beautiful", "organic", "flowing", "sculpted"),
+    "F": _HEAD_WORDS,
+    "G": ("channel", "pave", "eternity", "accent", "micro", "baguette", "inset", "flush"),
+    "H": (
+        "milgrain", "filigree", "engraving", "engraved", "scroll", "texture", "textured",
+        "hammered", "brushed", "pattern", "vintage", "deco", "ornate", "bead", "beaded",
+        "twisted", "rope", "braided", "knife", "celtic", "leaf", "floral", "vine", "detail",
+    ),
+    "I": ("modifier", "subsurf", "bevel", "solidify", "subdivision"),
+    "J": ("attributeerror", "attribute", "deprecated", "typeerror", "keyword", "api"),
+    "K": ("syntaxerror", "indentationerror", "syntax", "indent", "unexpected", "eof"),
+}
+
+_STOPWORDS = frozenset({
+    "the", "and", "with", "for", "that", "this", "from", "ring", "into", "are", "not", "must",
+    "use", "all", "each", "its", "has", "have", "but", "make", "like", "very", "want", "please",
+    "should", "will", "can", "one", "two", "only", "any", "per", "you", "your", "bmesh", "mesh",
+})
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN
+
+
+def _stem(token: str) -> str:
+    return token[:-1] if len(token) > 4 and token.endswith("s") and not token.endswith("ss") else token
+
+
+def _tokenize(text: str) -> list[str]:
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass(frozen=True)
+class PromptSection:
+    key: str
+    title: str
+    text: str
+
+
+@dataclass
+class PromptSelection:
+    text: str
+    sections: list[str]
+    full_tokens: int
+    selected_tokens: int
+    reasons: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(0, self.full_tokens - self.selected_tokens)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "sections": self.sections,
+            "full_tokens_est": self.full_tokens,
+            "selected_tokens_est": self.selected_tokens,
+            "saved_tokens_est": self.saved_tokens,
+            "reasons": self.reasons,
+        }
+
+
+class MasterPromptIndex:
+    def __init__(self, master_prompt: str, lexical_threshold: float = 9.0):
+        self.full_text = master_prompt
+        self.full_tokens = estimate_tokens(master_prompt)
+        self.lexical_threshold = lexical_threshold
+        self.sections = _split_sections(master_prompt)
+        self._tf = {s.key: Counter(_tokenize(s.text)) for s in self.sections}
+        n = len(self.sections)
+        df: Counter[str] = Counter()
+        for counts in self._tf.values():
+            df.update(counts.keys())
+        self._idf = {t: math.log(1 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+
+    @property
+    def section_keys(self) -> list[str]:
+        return [s.key for s in self.sections]
+
+    def select(
+        self,
+        kind: str = "generate",
+        request_text: str = "",
+        error_text: str = "",
+        code: str = "",
+    ) -> PromptSelection:
+        """Assemble the master prompt for one call."""
+        core = _CORE_ALWAYS | _CORE_BY_KIND.get(kind, frozenset())
+        module_text = " ".join(n.replace("_", " ") for n in _DEF_RE.findall(code or ""))
+        query_tokens = set(_tokenize(f"{request_text} {module_text} {error_text}"))
+
+        reasons: dict[str, str] = {}
+        for section in self.sections:
+            if section.key in core:
+                reasons[section.key] = "core"
+                continue
+            keywords = {_stem(k) for k in _SECTION_KEYWORDS.get(section.key, ())}
+            hits = sorted(query_tokens.intersection(keywords))
+            if hits:
+                reasons[section.key] = "keywords: " + ", ".join(hits[:5])
+                continue
+            score = self._lexical_score(section.key, query_tokens)
+            if score >= self.lexical_threshold:
+                reasons[section.key] = f"lexical: {score:.1f}"
+
+        if not self.sections or len(reasons) == len(self.sections):
+            return PromptSelection(
+                text=self.full_text,
+                sections=self.section_keys,
+                full_tokens=self.full_tokens,
+                selected_tokens=self.full_tokens,
+                reasons=reasons,
+            )
+
+        chosen = [s for s in self.sections if s.key in reasons]
+        text = "".join(s.text for s in chosen)
+        return PromptSelection(
+            text=text,
+            sections=[s.key for s in chosen],
+            full_tokens=self.full_tokens,
+            selected_tokens=estimate_tokens(text),
+            reasons=reasons,
+        )
+
+    def _lexical_score(self, key: str, query_tokens: set[str], k1: float = 1.2) -> float:
+        counts = self._tf.get(key)
+        if not counts:
+            return 0.0
+        score = 0.0
+        for token in query_tokens:
+            tf = counts.get(token, 0)
+            if tf:
+                score += self._idf.get(token, 0.0) * (tf * (k1 + 1)) / (tf + k1)
+        return score
+
+
+def _split_sections(text: str) -> list[PromptSection]:
+    """Split on section headings; everything before the first one is the preamble."""
+    matches = list(_HEADING_RE.finditer(text))
+    if not matches:
+        return [PromptSection(key="preamble", title="", text=text)]
+
+    sections = [PromptSection(key="preamble", title="", text=text[:matches[0].start()])]
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        key = match.group(1) or match.group(2)
+        title = text[match.start():text.find("\n", match.start())].strip()
+        body = text[match.start():end]
+        if i + 1 == len(matches) and _SUMMARY_MARKER in body:
+            split_at = body.index(_SUMMARY_MARKER)
+            sections.append(PromptSection(key=key, title=title, text=body[:split_at]))
+            sections.append(PromptSection(key="summary", title=_SUMMARY_MARKER, text=body[split_at:]))
+        else:
+            sections.append(PromptSection(key=key, title=title, text=body))
+    return sections
@@ -12,7 +12,6 @@ from vibe-designing-3d/app.py (lines 1513-1610).
 
 from __future__ import annotations
 
-import json
 import logging
 import uuid
 import time
@@ -23,8 +22,10 @@ from typing import Any, Callable
 from ..schemas import TokenUsage, ValidateRequest, ValidateResult
 from .blender_runner import run_blender
 from .llm_validator import resolve_model_name, validate_with_model
+from .prompt_index import MasterPromptIndex
 from .screenshot_resolver import resolve_screenshots
 from shared.artifact_uploader import upload_file
+from shared.session_store import append_version, load_session, save_session
 
 logger = logging.getLogger(__name__)
 
@@ -36,10 +37,12 @@ async def validate_ring(
     artifact_cache_dir: Path,
     blender_executable: str,
     blender_timeout: int,
-    anthropic_api_key: str,
-    gemini_api_key: str,
+    anthropic_api_key: str | list[str],
+    gemini_api_key: str | list[str],
     gemini_model: str,
     progress_callback: Callable[[str, int], None] | None = None,
+    patch_mode: bool = False,
+    prompt_index: MasterPromptIndex | None = None,
 ) -> ValidateResult:
     """
     End-to-end ring validation: screenshots → LLM check → optional Blender re-render.
@@ -82,6 +85,17 @@ async def validate_ring(
     if progress_callback:
         progress_callback("Sending to LLM for validation...", 15)
 
+    # Only the master prompt sections relevant to this ring and its code
+    selection = None
+    if prompt_index is not None:
+        selection = prompt_index.select("validate", request_text=user_prompt, code=code)
+        master_prompt = selection.text
+        logger.info(
+            "[VALIDATION] Master prompt: %d sections, ~%d/%d tokens (saved ~%d)",
+            len(selection.sections), selection.selected_tokens,
+            selection.full_tokens, selection.saved_tokens,
+        )
+
     # Step 1: Validate with LLM
     llm_result = await validate_with_model(
         screenshots_b64=screenshots,
@@ -92,6 +106,7 @@ async def validate_ring(
         anthropic_api_key=anthropic_api_key,
         gemini_api_key=gemini_api_key,
         gemini_model=gemini_model,
+        patch_mode=patch_mode,
     )
 
     if progress_callback:
@@ -102,13 +117,11 @@ async def validate_ring(
     # Load existing session data if available (for state persistence)
     session_dir = sessions_dir / session_id
     session_dir.mkdir(parents=True, exist_ok=True)
-    session_path = session_dir / "session.json"
     session: dict[str, Any] = {}
-    if session_path.exists():
-        try:
-            session = json.loads(session_path.read_text())
-        except Exception:
-            logger.warning("Could not load session.json for %s", session_id)
+    try:
+        session = load_session(session_dir)
+    except Exception:
+        logger.warning("Could not load session.json for %s", session_id)
 
     # Store validation result in session (matches original)
     session["validation"] = {
@@ -118,8 +131,11 @@ async def validate_ring(
             "cost": llm_result.cost,
             "tokens": {"input": llm_result.tokens_in, "output": llm_result.tokens_out},
         },
+        "llm_timing": llm_result.timings,
         "timestamp": datetime.now().isoformat(),
     }
+    if selection is not None:
+        session["validation"]["master_prompt"] = selection.to_dict()
 
     # Step 2: If invalid and corrected code returned, re-render
     if not llm_result.is_valid and llm_result.corrected_code:
@@ -150,12 +166,18 @@ async def validate_ring(
             if progress_callback:
                 progress_callback("Corrected version uploaded", 95)
 
-            session["code"] = llm_result.corrected_code
-            session["version"] = session.get("version", 1) + 1
             session["cost"] = session.get("cost", 0) + llm_result.cost
             session["spatial_report"] = blender_result.spatial_report
+            # the validated code becomes the base version when the session has no history here
+            session.setdefault("code", code)
             try:
-                session_path.write_text(json.dumps(session, indent=2))
+                append_version(
+                    session_dir, session, llm_result.corrected_code,
+                    timestamp=datetime.now().isoformat(),
+                    description="Validation correction",
+                    cost=llm_result.cost,
+                )
+                save_session(session_dir, session)
             except Exception:
                 logger.warning("Could not persist session.json for %s", session_id)
 
@@ -186,7 +208,7 @@ async def validate_ring(
     # Step 3: Valid or no corrected code — persist cost and return
     session["cost"] = session.get("cost", 0) + llm_result.cost
     try:
-        session_path.write_text(json.dumps(session, indent=2))
+        save_session(session_dir, session)
     except Exception:
         logger.warning("Could not persist session.json for %s", session_id)
 
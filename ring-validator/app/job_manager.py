@@ -17,7 +17,10 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from typing import Any, Callable
 
+from shared.artifact_resolver import prune_cache
+
 from .config import ValidatorSettings
+from .core.prompt_index import MasterPromptIndex
 from .core.validation_pipeline import validate_ring
 from .schemas import ValidateJobStatus, ValidateRequest, ValidateResult, JobRecordView
 
@@ -66,6 +69,7 @@ class ValidateJobManager:
     def __init__(self, settings: ValidatorSettings, master_prompt: str):
         self.settings = settings
         self.master_prompt = master_prompt
+        self.prompt_index = MasterPromptIndex(master_prompt) if settings.filter_master_prompt else None
         self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=settings.max_queue_size)
         self.jobs: dict[str, JobRecord] = {}
         self._workers: list[asyncio.Task] = []
@@ -166,10 +170,12 @@ class ValidateJobManager:
                         artifact_cache_dir=self.settings.artifact_cache_dir,
                         blender_executable=str(self.settings.blender_executable),
                         blender_timeout=self.settings.blender_timeout_seconds,
-                        anthropic_api_key=self.settings.anthropic_api_key,
-                        gemini_api_key=self.settings.gemini_api_key,
+                        anthropic_api_key=self.settings.anthropic_key_pool,
+                        gemini_api_key=self.settings.gemini_key_pool,
                         gemini_model=self.settings.gemini_model,
                         progress_callback=self._make_progress_callback(record),
+                        patch_mode=self.settings.patch_corrections,
+                        prompt_index=self.prompt_index,
                     )
                     record.result = result
                     record.status = ValidateJobStatus.succeeded
@@ -196,6 +202,10 @@ class ValidateJobManager:
     async def _cleanup_loop(self) -> None:
         while True:
             await asyncio.sleep(self.settings.cleanup_interval_seconds)
+            await asyncio.get_running_loop().run_in_executor(
+                None, prune_cache, self.settings.artifact_cache_dir,
+                self.settings.artifact_cache_max_mb * 1024 * 1024,
+            )
             now = _utc_now()
             ttl = timedelta(seconds=self.settings.finished_job_ttl_seconds)
 
@@ -8,6 +8,7 @@ Endpoints:
   GET  /jobs/{id}/result   Final result
   DELETE /jobs/{id}  Cancel queued job
   GET  /health       Service health check
+  GET  /metrics/llm  Per-model LLM latency (TTFT, tok/s, stalls, retries)
   GET  /tool/schema  Tool schema for registry
   GET  /test         Test console UI
 """
@@ -29,6 +30,9 @@ from shared.logging import configure_logging
 from shared.payloads import unwrap_tool_payload
 
 from .config import settings
+from .core.key_pool import pools_snapshot
+from .core.llm_connections import ConnectionWarmer, configure_connection_pool
+from .core.llm_metrics import llm_metrics
 from .job_manager import ValidateJobManager
 from .schemas import (
     AsyncJobAccepted,
@@ -60,6 +64,13 @@ logger.info("Loaded master prompt: %d chars", len(MASTER_PROMPT))
 # ---------------------------------------------------------------------------
 
 jobs = ValidateJobManager(settings, MASTER_PROMPT)
+configure_connection_pool(settings.max_concurrent_jobs)
+warmer = ConnectionWarmer(
+    anthropic_keys=settings.anthropic_key_pool if settings.llm_warmup else [],
+    gemini_keys=settings.gemini_key_pool if settings.llm_warmup else [],
+    gemini_model=settings.gemini_model,
+    interval_seconds=settings.llm_keepalive_interval_seconds,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -80,7 +91,9 @@ async def lifespan(_: FastAPI):
     ensure_dir(settings.sessions_dir)
     ensure_dir(settings.artifact_cache_dir)
     await jobs.startup()
+    await warmer.start()
     yield
+    await warmer.stop()
     await jobs.shutdown()
 
 
@@ -139,10 +152,19 @@ async def health():
         "master_prompt_loaded": len(MASTER_PROMPT) > 0,
         "claude_available": settings.claude_available,
         "gemini_available": settings.gemini_available,
+        "anthropic_keys": len(settings.anthropic_key_pool),
+        "gemini_keys": len(settings.gemini_key_pool),
+        "key_pools": pools_snapshot(),
+        "llm_connections": warmer.snapshot(),
         "max_concurrent_jobs": settings.max_concurrent_jobs,
     }
 
 
+@app.get("/metrics/llm")
+async def metrics_llm():
+    return llm_metrics.snapshot()
+
+
 # ---------------------------------------------------------------------------
 # Tool schema (for temporal-agentic-pipeline registry)
 # ---------------------------------------------------------------------------
@@ -7,6 +7,14 @@ artifact references with an ``azure://`` URI scheme:
 
 This module resolves them to local file paths, downloading + caching as needed.
 It converts ``azure://`` URIs to signed HTTPS blob URLs for download.
+``store_artifact`` puts uploaded bytes into the same content-addressed
+cache and returns a reference that resolves without a download.
+
+Downloads are streamed to disk and capped like uploads.  Caller-supplied
+references (``allow_local=False``) may only point at ``azure://`` or at
+``https://`` hosts on the allowlist set by ``configure_remote_artifacts``.
+``prune_cache`` keeps the cache under a size limit, least recently used
+first.
 
 When running standalone, plain file paths pass through unchanged.
 """
@@ -16,10 +24,13 @@ from __future__ import annotations
 import hashlib
 import logging
 import os
+import re
+import shutil
+import tempfile
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
-from typing import Any
-from urllib.parse import quote
+from typing import Any, BinaryIO, Sequence
+from urllib.parse import quote, urlsplit
 
 import httpx
 
@@ -27,10 +38,38 @@ logger = logging.getLogger(__name__)
 
 _AZURE_ACCOUNT = os.getenv("AZURE_ACCOUNT_NAME", "snapwear")
 _AZURE_KEY = os.getenv("AZURE_ACCOUNT_KEY", "")
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+_CHUNK_BYTES = 1024 * 1024
+
+# https hosts caller-supplied references may download from (None = any host);
+# "example.com" matches exactly, ".example.com" matches its subdomains
+_allowed_hosts: tuple[str, ...] | None = None
+_max_download_bytes: int | None = None
+
+
+def configure_remote_artifacts(allowed_hosts: Sequence[str] | None, max_download_bytes: int | None) -> None:
+    """Host allowlist for caller-supplied URLs and the default download size cap."""
+    global _allowed_hosts, _max_download_bytes
+    _allowed_hosts = tuple(h.strip().lower() for h in allowed_hosts if h.strip()) if allowed_hosts is not None else None
+    _max_download_bytes = max_download_bytes
+
 
+def _host_allowed(host: str) -> bool:
+    if _allowed_hosts is None:
+        return True
+    host = host.lower()
+    return any(host == h or (h.startswith(".") and host.endswith(h)) for h in _allowed_hosts)
 
-def _sha256_bytes(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+
+def _check_caller_url(url: str) -> None:
+    """Reject caller-supplied URLs that could reach internal services (SSRF)."""
+    if url.startswith("azure://"):
+        return
+    parts = urlsplit(url)
+    if parts.scheme != "https" or not parts.hostname:
+        raise ValueError("Artifact URLs must be azure:// or https://")
+    if not _host_allowed(parts.hostname):
+        raise ValueError(f"Artifact host not allowed: {parts.hostname}")
 
 
 def _resolve_uri(uri: str) -> str:
@@ -106,34 +145,115 @@ async def resolve_glb_path(
       - str: local file path (returned as-is if exists), or HTTP(S)/azure:// URL
       - dict with "uri" key: CAS artifact reference (downloaded + cached)
     """
-    cache_dir.mkdir(parents=True, exist_ok=True)
+    return await resolve_artifact_path(glb_ref, cache_dir, ".glb", http_timeout)
 
-    if isinstance(glb_ref, str):
-        local = Path(glb_ref)
-        if local.is_file():
-            return local
-        if glb_ref.startswith(("http://", "https://", "azure://")):
-            download_url = _resolve_uri(glb_ref)
-            return await _download_and_cache(download_url, None, cache_dir, http_timeout)
-        raise FileNotFoundError(f"GLB file not found: {glb_ref}")
 
-    if isinstance(glb_ref, dict):
-        uri = glb_ref.get("uri", "")
-        sha256 = glb_ref.get("sha256")
+async def resolve_artifact_path(
+    ref: Any,
+    cache_dir: Path,
+    suffix: str,
+    http_timeout: float = 120.0,
+    allow_local: bool = True,
+    max_bytes: int | None = None,
+) -> Path:
+    """
+    Resolve an artifact reference to a local file path (cached as ``<sha256><suffix>``).
 
-        if not uri:
-            raise ValueError("Artifact reference missing 'uri' field")
+    Same shapes as ``resolve_glb_path``; a dict may omit "uri" when its
+    "sha256" is already cached (``store_artifact`` references).  With
+    ``allow_local=False`` the ref is caller-supplied: plain file paths are
+    rejected and URLs must pass the allowlist.  Downloads larger than
+    ``max_bytes`` (default: the configured cap) raise ``ValueError``.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if max_bytes is None:
+        max_bytes = _max_download_bytes
 
-        if sha256:
-            cached = cache_dir / f"{sha256}.glb"
+    if isinstance(ref, str):
+        local = Path(ref)
+        if allow_local and local.is_file():
+            return local
+        if ref.startswith(("http://", "https://", "azure://")):
+            if not allow_local:
+                _check_caller_url(ref)
+            download_url = _resolve_uri(ref)
+            return await _download_and_cache(download_url, None, cache_dir, http_timeout, suffix, max_bytes)
+        raise FileNotFoundError(f"Artifact not found: {ref}")
+
+    if isinstance(ref, dict):
+        uri = ref.get("uri", "")
+        sha256 = ref.get("sha256")
+
+        if sha256 and _SHA256_RE.fullmatch(sha256):
+            cached = cache_dir / f"{sha256}{suffix}"
             if cached.is_file():
                 logger.info("CAS cache hit: %s", sha256[:12])
+                _touch(cached)
                 return cached
 
+        if not uri:
+            raise ValueError("Artifact reference missing 'uri' field")
+
+        if not allow_local:
+            _check_caller_url(uri)
         download_url = _resolve_uri(uri)
-        return await _download_and_cache(download_url, sha256, cache_dir, http_timeout)
+        return await _download_and_cache(download_url, sha256, cache_dir, http_timeout, suffix, max_bytes)
+
+    raise TypeError(f"Unsupported artifact reference type: {type(ref)}")
 
-    raise TypeError(f"Unsupported glb_path type: {type(glb_ref)}")
+
+def store_artifact(
+    source: bytes | BinaryIO,
+    cache_dir: Path,
+    suffix: str,
+    max_bytes: int | None = None,
+) -> dict[str, Any]:
+    """
+    Copy bytes / a file object into the cache as ``<sha256><suffix>``,
+    hashing while streaming.  Returns ``{"uri": "", "sha256", "bytes"}``.
+    Raises ``ValueError`` when the data exceeds ``max_bytes``.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as tmp:
+        try:
+            if isinstance(source, bytes):
+                chunks: Any = [source]
+            else:
+                chunks = iter(lambda: source.read(_CHUNK_BYTES), b"")
+            for chunk in chunks:
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"Artifact exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    sha256 = digest.hexdigest()
+    _commit(tmp.name, cache_dir / f"{sha256}{suffix}", size)
+    return {"uri": "", "sha256": sha256, "bytes": size}
+
+
+def _commit(tmp_name: str, dest: Path, size: int) -> None:
+    """Move a fully written temp file into place (or drop it if the content is already cached)."""
+    if dest.exists():
+        os.unlink(tmp_name)
+        _touch(dest)
+    else:
+        shutil.move(tmp_name, dest)
+        logger.info("Cached artifact: %s (%d bytes)", dest.stem[:12], size)
+
+
+def _touch(path: Path) -> None:
+    # mtime doubles as last use for prune_cache
+    try:
+        os.utime(path)
+    except OSError:
+        pass
 
 
 async def _download_and_cache(
@@ -141,22 +261,73 @@ async def _download_and_cache(
     expected_sha256: str | None,
     cache_dir: Path,
     timeout: float,
+    suffix: str = ".glb",
+    max_bytes: int | None = None,
 ) -> Path:
-    logger.info("Downloading artifact: %s", url[:120])
-    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout)) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
-        data = resp.content
-
-    actual_sha = _sha256_bytes(data)
+    """Stream ``url`` into the cache, hashing as it goes; aborts past ``max_bytes``."""
+    logger.info("Downloading artifact: %s", url.split("?", 1)[0][:120])
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=cache_dir, delete=False) as tmp:
+        try:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(timeout)) as client:
+                async with client.stream("GET", url) as resp:
+                    resp.raise_for_status()
+                    declared = resp.headers.get("content-length")
+                    if max_bytes is not None and declared and declared.isdigit() and int(declared) > max_bytes:
+                        raise ValueError(f"Artifact exceeds {max_bytes} bytes")
+                    async for chunk in resp.aiter_bytes(_CHUNK_BYTES):
+                        size += len(chunk)
+                        if max_bytes is not None and size > max_bytes:
+                            raise ValueError(f"Artifact exceeds {max_bytes} bytes")
+                        digest.update(chunk)
+                        tmp.write(chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+
+    actual_sha = digest.hexdigest()
     if expected_sha256 and actual_sha != expected_sha256:
+        os.unlink(tmp.name)
         raise ValueError(
             f"SHA-256 mismatch: expected {expected_sha256[:16]}... got {actual_sha[:16]}..."
         )
 
-    dest = cache_dir / f"{actual_sha}.glb"
-    if not dest.exists():
-        dest.write_bytes(data)
-        logger.info("Cached artifact: %s (%d bytes)", actual_sha[:12], len(data))
-
+    dest = cache_dir / f"{actual_sha}{suffix}"
+    _commit(tmp.name, dest, size)
     return dest
+
+
+def prune_cache(cache_dir: Path, max_bytes: int) -> int:
+    """
+    Delete the least recently used cached artifacts until the cache fits
+    ``max_bytes``.  Cache hits refresh a file's mtime; in-flight temp files
+    are left alone.  Returns the number of files removed.
+    """
+    if not cache_dir.is_dir():
+        return 0
+    entries: list[tuple[float, int, Path]] = []
+    for path in cache_dir.iterdir():
+        if not _SHA256_RE.fullmatch(path.stem):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info("Pruned %d cached artifacts from %s", removed, cache_dir)
+    return removed